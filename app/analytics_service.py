@@ -0,0 +1,338 @@
+"""Risk analytics computed locally from the price history cache."""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+import threading
+import time
+import numpy as np
+import logging
+
+from app import config
+from app.database import Position
+from app.price_history_service import PriceHistoryService
+from app.valuation_service import forward_fill
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+ROLLING_VOLATILITY_DAYS = 21
+
+
+def _calendar_lookback(window: int) -> int:
+    """Calendar days to load so that `window` trading days are covered."""
+    return int(window * 1.5) + 14
+
+
+def _last_returns(closes: np.ndarray, dates: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Simple returns between the last window + 1 valid closes, and the dates of those closes."""
+    valid = ~np.isnan(closes)
+    closes, dates = closes[valid][-(window + 1):], dates[valid][-(window + 1):]
+    return closes[1:] / closes[:-1] - 1.0, dates
+
+
+def rolling_volatility(returns: np.ndarray, days: int = ROLLING_VOLATILITY_DAYS) -> np.ndarray:
+    """Annualized standard deviation over each trailing block of `days` returns."""
+    if len(returns) < days:
+        return np.empty(0)
+    sums = np.cumsum(np.concatenate(([0.0], returns)))
+    squares = np.cumsum(np.concatenate(([0.0], returns * returns)))
+    total = sums[days:] - sums[:-days]
+    total_sq = squares[days:] - squares[:-days]
+    variance = np.maximum(total_sq - total * total / days, 0.0) / (days - 1)
+    return np.sqrt(variance * TRADING_DAYS_PER_YEAR)
+
+
+def return_metrics(returns: np.ndarray, dates: np.ndarray, risk_free_rate: float = 0.0) -> Dict:
+    """
+    Return, volatility, drawdown and Sharpe ratio of a daily return series.
+
+    Args:
+        returns: Daily simple returns
+        dates: datetime64[D] dates of the closes, one more than returns
+        risk_free_rate: Annual risk-free rate used by the Sharpe ratio
+
+    Returns:
+        dict: Metrics; values are None when there are fewer than two returns
+    """
+    metrics = {
+        "start_date": None,
+        "end_date": None,
+        "observations": int(len(returns)),
+        "total_return": None,
+        "annualized_return": None,
+        "annualized_volatility": None,
+        "sharpe_ratio": None,
+        "max_drawdown": None,
+        "max_drawdown_peak": None,
+        "max_drawdown_trough": None,
+        "rolling_volatility": {"days": ROLLING_VOLATILITY_DAYS, "dates": [], "values": []},
+    }
+    if len(returns) < 2:
+        return metrics
+
+    equity = np.concatenate(([1.0], np.cumprod(1.0 + returns)))
+    years = len(returns) / TRADING_DAYS_PER_YEAR
+    volatility = float(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR))
+    annualized_return = float(equity[-1] ** (1.0 / years) - 1.0) if equity[-1] > 0 else -1.0
+
+    drawdowns = equity / np.maximum.accumulate(equity) - 1.0
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(equity[:trough + 1]))
+
+    rolling = rolling_volatility(returns)
+    metrics.update({
+        "start_date": str(dates[0]),
+        "end_date": str(dates[-1]),
+        "total_return": round(float(equity[-1] - 1.0), 6),
+        "annualized_return": round(annualized_return, 6),
+        "annualized_volatility": round(volatility, 6),
+        "sharpe_ratio": (
+            round((float(np.mean(returns)) * TRADING_DAYS_PER_YEAR - risk_free_rate) / volatility, 4)
+            if volatility > 0 else None
+        ),
+        "max_drawdown": round(float(drawdowns[trough]), 6),
+        "max_drawdown_peak": str(dates[peak]) if drawdowns[trough] < 0 else None,
+        "max_drawdown_trough": str(dates[trough]) if drawdowns[trough] < 0 else None,
+        "rolling_volatility": {
+            "days": ROLLING_VOLATILITY_DAYS,
+            "dates": np.datetime_as_string(dates[ROLLING_VOLATILITY_DAYS:], unit='D').tolist(),
+            "values": np.round(rolling, 6).tolist(),
+        },
+    })
+    return metrics
+
+
+def beta_metrics(
+    closes: np.ndarray,
+    benchmark_closes: np.ndarray,
+    window: int
+) -> Dict[str, Optional[float]]:
+    """Beta and correlation against a benchmark over the days both have a close."""
+    both = ~np.isnan(closes) & ~np.isnan(benchmark_closes)
+    closes, benchmark_closes = closes[both][-(window + 1):], benchmark_closes[both][-(window + 1):]
+    if len(closes) < 3:
+        return {"beta": None, "correlation": None}
+    returns = closes[1:] / closes[:-1] - 1.0
+    benchmark_returns = benchmark_closes[1:] / benchmark_closes[:-1] - 1.0
+    covariance = np.cov(returns, benchmark_returns, ddof=1)
+    if covariance[1, 1] <= 0 or covariance[0, 0] <= 0:
+        return {"beta": None, "correlation": None}
+    return {
+        "beta": round(float(covariance[0, 1] / covariance[1, 1]), 4),
+        "correlation": round(float(covariance[0, 1] / np.sqrt(covariance[0, 0] * covariance[1, 1])), 4),
+    }
+
+
+class AnalyticsService:
+    """Service for risk metrics over cached price history.
+
+    Everything is computed from the price_history table with NumPy, so no
+    market data provider is called unless a caller asks for a refresh.
+    Results are cached per (ticker, window) for a short TTL and dropped
+    when new bars of the ticker (or the benchmark) are stored; a batch of
+    tickers that are not cached is loaded with a single query.
+    """
+
+    def __init__(
+        self,
+        price_history_service: Optional[PriceHistoryService] = None,
+        benchmark: str = config.ANALYTICS_BENCHMARK,
+        risk_free_rate: float = config.ANALYTICS_RISK_FREE_RATE,
+        cache_size: int = config.ANALYTICS_CACHE_SIZE,
+        cache_ttl: float = config.ANALYTICS_CACHE_TTL
+    ):
+        self.price_history_service = price_history_service or PriceHistoryService()
+        self.benchmark = benchmark
+        self.risk_free_rate = risk_free_rate
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.price_history_service.add_listener(self._prices_stored)
+
+    def get_ticker_analytics(
+        self,
+        db: Session,
+        symbol: str,
+        window: int = TRADING_DAYS_PER_YEAR,
+        refresh: bool = False
+    ) -> Dict:
+        """
+        Get risk metrics for one ticker.
+
+        Args:
+            db: Database session
+            symbol: Ticker symbol
+            window: Number of most recent daily returns to use
+            refresh: Download missing history for the ticker and benchmark first
+
+        Returns:
+            dict: Metrics from return_metrics plus beta, correlation and benchmark
+
+        Raises:
+            ValueError: No cached history for the ticker
+        """
+        symbol = symbol.upper().strip()
+        if refresh:
+            self._refresh(db, [symbol, self.benchmark], window)
+        analytics = self.get_many(db, [symbol], window)[symbol]
+        if not analytics["observations"]:
+            raise ValueError(f"No cached price history for {symbol}")
+        return analytics
+
+    def get_many(self, db: Session, symbols: Iterable[str], window: int = TRADING_DAYS_PER_YEAR) -> Dict[str, Dict]:
+        """Get risk metrics for many tickers, loading all uncached ones in one query."""
+        symbols = list(dict.fromkeys(s.upper().strip() for s in symbols if s and s.strip()))
+        results = {}
+        missing = []
+        for symbol in symbols:
+            cached = self._cache_get((symbol, window))
+            if cached is None:
+                missing.append(symbol)
+            else:
+                results[symbol] = cached
+        if not missing:
+            return results
+
+        dates, closes, columns = self._load(db, missing, window)
+        benchmark_closes = closes[:, columns[self.benchmark]]
+        for symbol in missing:
+            ticker_closes = closes[:, columns[symbol]]
+            returns, return_dates = _last_returns(ticker_closes, dates, window)
+            analytics = {"ticker": symbol, "window": window, "benchmark": self.benchmark}
+            analytics.update(return_metrics(returns, return_dates, self.risk_free_rate))
+            analytics.update(beta_metrics(ticker_closes, benchmark_closes, window))
+            # Nothing cached yet: look again next time instead of serving "no history"
+            if analytics["observations"]:
+                self._cache_put((symbol, window), analytics)
+            results[symbol] = analytics
+        return results
+
+    def get_portfolio_analytics(
+        self,
+        db: Session,
+        window: int = TRADING_DAYS_PER_YEAR,
+        refresh: bool = False
+    ) -> Dict:
+        """
+        Get risk metrics of the current open positions held as one portfolio.
+
+        Each position is weighted by its value at the latest cached close
+        (shares = entry_value_eur / entry_price_per_share). Daily portfolio
+        returns are the weighted sum of the holdings' returns over the
+        window, with prices forward-filled across days a market was closed.
+
+        Returns:
+            dict: Portfolio metrics, weights, and per-ticker metrics
+        """
+        positions = db.query(
+            Position.ticker, Position.entry_value_eur, Position.entry_price_per_share
+        ).filter(Position.status == 'OPEN').all()
+        tickers = sorted({p.ticker for p in positions})
+        if refresh and tickers:
+            self._refresh(db, tickers + [self.benchmark], window)
+
+        result = {"window": window, "benchmark": self.benchmark, "positions": len(positions)}
+        if not tickers:
+            result.update(return_metrics(np.empty(0), np.empty(0, dtype='datetime64[D]')))
+            result.update({"beta": None, "correlation": None, "value_eur": 0.0, "weights": [], "tickers": []})
+            return result
+
+        dates, closes, columns = self._load(db, tickers, window)
+        held = np.array([columns[t] for t in tickers])
+        prices = forward_fill(closes[:, held])
+
+        shares = np.zeros(len(tickers))
+        cost = np.zeros(len(tickers))
+        index = {ticker: i for i, ticker in enumerate(tickers)}
+        for p in positions:
+            shares[index[p.ticker]] += p.entry_value_eur / p.entry_price_per_share
+            cost[index[p.ticker]] += p.entry_value_eur
+        last_prices = prices[-1] if len(prices) else np.full(len(tickers), np.nan)
+        values = np.where(np.isnan(last_prices), cost, shares * np.nan_to_num(last_prices))
+        weights = values / values.sum() if values.sum() > 0 else np.zeros(len(tickers))
+
+        # Days on which any holding traded, from the first day all holdings have a price
+        traded = ~np.isnan(closes[:, held]).all(axis=1)
+        priced = ~np.isnan(prices).any(axis=1)
+        rows = np.flatnonzero(traded & priced)[-(window + 1):]
+        portfolio_returns = np.empty(0)
+        if len(rows) > 1:
+            ticker_returns = prices[rows[1:]] / prices[rows[:-1]] - 1.0
+            portfolio_returns = ticker_returns @ weights
+        result.update(return_metrics(portfolio_returns, dates[rows], self.risk_free_rate))
+
+        # Portfolio index on its trading days against the benchmark on the same days
+        portfolio_index = np.full(len(dates), np.nan)
+        if len(rows):
+            portfolio_index[rows] = np.concatenate(([1.0], np.cumprod(1.0 + portfolio_returns)))
+        result.update(beta_metrics(portfolio_index, closes[:, columns[self.benchmark]], window))
+
+        result.update({
+            "value_eur": round(float(values.sum()), 2),
+            "weights": [
+                {"ticker": ticker, "weight": round(float(weight), 6)}
+                for ticker, weight in sorted(zip(tickers, weights), key=lambda tw: -tw[1])
+            ],
+            "tickers": [
+                {key: value for key, value in analytics.items() if key != "rolling_volatility"}
+                for analytics in self.get_many(db, tickers, window).values()
+            ],
+        })
+        return result
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """Drop cached results for one ticker, or all of them."""
+        with self._lock:
+            if symbol is None:
+                self._cache.clear()
+                return
+            symbol = symbol.upper().strip()
+            for key in [key for key in self._cache if key[0] == symbol]:
+                del self._cache[key]
+
+    def _prices_stored(self, ticker: str) -> None:
+        """Drop results computed from a ticker's bars; every result uses the benchmark."""
+        self.invalidate(None if ticker == self.benchmark else ticker)
+
+    def _load(self, db: Session, symbols: List[str], window: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, int]]:
+        """Cached closes for the symbols plus the benchmark over the lookback."""
+        columns = list(dict.fromkeys(symbols + [self.benchmark]))
+        end = datetime.now().date()
+        start = end - timedelta(days=_calendar_lookback(window))
+        dates, closes = self.price_history_service.get_price_matrix(db, columns, start, end)
+        if not len(dates):
+            closes = np.empty((0, len(columns)))
+        return dates, closes, {symbol: i for i, symbol in enumerate(columns)}
+
+    def _refresh(self, db: Session, symbols: List[str], window: int) -> None:
+        """Fill cache gaps for the lookback of each symbol and drop stale results."""
+        end = datetime.now().date()
+        start = end - timedelta(days=_calendar_lookback(window))
+        for symbol in dict.fromkeys(symbols):
+            try:
+                self.price_history_service.get_price_series(db, symbol, start.isoformat(), end.isoformat())
+            except Exception as e:
+                logger.warning(f"Could not refresh price history for {symbol}: {e}")
+            self.invalidate(symbol)
+
+    def _cache_get(self, key: Tuple[str, int]) -> Optional[Dict]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key: Tuple[str, int], value: Dict) -> None:
+        with self._lock:
+            self._cache[key] = (time.monotonic(), value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
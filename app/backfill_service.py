@@ -0,0 +1,240 @@
+"""Batch backfill job for warming the price_history cache."""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import threading
+import time
+import logging
+
+from app.database import SessionLocal, Ticker, Position, PriceCoverage
+from app.price_history_service import PriceHistoryService, history_to_columns, parse_date
+from app.provider_gateway import provider_gateway
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillService:
+    """Service for downloading price histories for every known ticker.
+
+    Tickers are collected from the watchlist and from positions, split into
+    batches, and each batch is fetched with the provider gateway's
+    batch_history, which rate limits and retries every symbol on its own
+    and reports the symbols that failed. Batches run with bounded
+    concurrency. Tickers whose cached
+    coverage already spans the requested window are skipped, so a job that
+    was interrupted resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        price_history_service: Optional[PriceHistoryService] = None,
+        batch_size: int = 20,
+        max_workers: int = 4,
+        session_factory=SessionLocal
+    ):
+        self.price_history_service = price_history_service or PriceHistoryService()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status = self._new_status()
+
+    def collect_tickers(self, db) -> List[str]:
+        """All distinct tickers from the watchlist and positions."""
+        symbols = {row.symbol for row in db.query(Ticker.symbol)}
+        symbols.update(row.ticker for row in db.query(Position.ticker).distinct())
+        return sorted(symbol.upper().strip() for symbol in symbols if symbol)
+
+    def run(
+        self,
+        tickers: Optional[List[str]] = None,
+        years: float = 5,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict:
+        """
+        Run a backfill to completion in the calling thread.
+
+        Args:
+            tickers: Symbols to backfill; defaults to every known ticker
+            years: Window length when start_date is not given
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format, defaults to yesterday
+
+        Returns:
+            dict: Final job status (see get_status)
+        """
+        today = datetime.now().date()
+        end_date = end_date or (today - timedelta(days=1)).strftime('%Y-%m-%d')
+        start_date = start_date or (today - timedelta(days=int(years * 365))).strftime('%Y-%m-%d')
+
+        db = self.session_factory()
+        try:
+            if tickers is None:
+                tickers = self.collect_tickers(db)
+            tickers = sorted({ticker.upper().strip() for ticker in tickers if ticker})
+            pending = self._pending_tickers(db, tickers, start_date, end_date)
+        finally:
+            db.close()
+
+        with self._lock:
+            self._status = self._new_status()
+            self._status.update({
+                "state": "running",
+                "start_date": start_date,
+                "end_date": end_date,
+                "tickers_total": len(tickers),
+                "tickers_skipped": len(tickers) - len(pending),
+                "started_at": datetime.utcnow().isoformat(),
+            })
+        started = time.perf_counter()
+        logger.info(
+            f"Backfill {start_date} to {end_date}: {len(pending)} of {len(tickers)} tickers "
+            f"pending, batch size {self.batch_size}, {self.max_workers} workers"
+        )
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="backfill") as executor:
+                futures = [
+                    executor.submit(self._run_batch, batch, start_date, end_date)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    future.result()
+                    self._log_progress(started)
+            state = "finished"
+        except Exception as e:
+            logger.error(f"Backfill failed: {e}")
+            state = "failed"
+            with self._lock:
+                self._status["errors"].append(str(e))
+
+        with self._lock:
+            self._status["state"] = state
+            self._status["finished_at"] = datetime.utcnow().isoformat()
+            self._update_rate(started)
+        self._log_progress(started)
+        return self.get_status()
+
+    def start(self, **kwargs) -> bool:
+        """
+        Run a backfill in a background thread.
+
+        Returns:
+            bool: False if a backfill is already running
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return False
+            self._status = self._new_status()
+            self._status["state"] = "starting"
+            self._thread = threading.Thread(
+                target=self.run, kwargs=kwargs, name="backfill", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def get_status(self) -> Dict:
+        """Progress of the current or last backfill."""
+        with self._lock:
+            status = dict(self._status)
+            status["errors"] = list(self._status["errors"][-20:])
+            return status
+
+    def _pending_tickers(self, db, tickers: List[str], start_date: str, end_date: str) -> List[str]:
+        """Tickers whose coverage does not already span the window."""
+        last_required = min(parse_date(end_date), datetime.now().date() - timedelta(days=1))
+        covered = {
+            row.ticker for row in db.query(PriceCoverage.ticker).filter(
+                PriceCoverage.ticker.in_(tickers),
+                PriceCoverage.earliest_date <= parse_date(start_date),
+                PriceCoverage.latest_date >= last_required
+            )
+        }
+        return [ticker for ticker in tickers if ticker not in covered]
+
+    def _run_batch(self, batch: List[str], start_date: str, end_date: str) -> None:
+        """Download one batch of tickers and store every history in it."""
+        end_inclusive = (
+            datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+        ).strftime('%Y-%m-%d')
+
+        data, errors = provider_gateway.batch_history(batch, start_date, end_inclusive)
+        if errors:
+            logger.error(f"Backfill download failed for {', '.join(errors)}")
+            with self._lock:
+                self._status["tickers_failed"] += len(errors)
+                self._status["errors"].extend(f"{ticker}: {error}" for ticker, error in errors.items())
+
+        db = self.session_factory()
+        try:
+            for ticker in batch:
+                if ticker in errors:
+                    continue
+                try:
+                    prices = history_to_columns(self._ticker_frame(data, ticker))
+                    if not len(prices['date']):
+                        raise ValueError("No data returned")
+                    rows = self.price_history_service.store_fetched_range(
+                        db, ticker, start_date, end_date, prices
+                    )
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"Backfill skipped {ticker}: {e}")
+                    with self._lock:
+                        self._status["tickers_failed"] += 1
+                        self._status["errors"].append(f"{ticker}: {e}")
+                    continue
+
+                with self._lock:
+                    self._status["tickers_done"] += 1
+                    self._status["rows"] += rows
+        finally:
+            db.close()
+
+    @staticmethod
+    def _ticker_frame(data, ticker: str):
+        """Get one ticker's columns out of a multi-symbol download."""
+        if hasattr(data.columns, 'levels'):
+            if ticker not in data.columns.get_level_values(0):
+                return data.iloc[0:0]
+            return data[ticker].dropna(how='all')
+        return data
+
+    def _update_rate(self, started: float) -> None:
+        """Refresh elapsed time and throughput. Caller holds the lock."""
+        elapsed = time.perf_counter() - started
+        self._status["elapsed_seconds"] = round(elapsed, 1)
+        self._status["rows_per_second"] = round(self._status["rows"] / elapsed, 1) if elapsed else None
+
+    def _log_progress(self, started: float) -> None:
+        with self._lock:
+            self._update_rate(started)
+            status = dict(self._status)
+        processed = status["tickers_done"] + status["tickers_failed"] + status["tickers_skipped"]
+        logger.info(
+            f"Backfill progress: {processed}/{status['tickers_total']} tickers, "
+            f"{status['rows']} rows, {status['rows_per_second']} rows/s, "
+            f"{status['tickers_failed']} failed"
+        )
+
+    @staticmethod
+    def _new_status() -> Dict:
+        return {
+            "state": "idle",
+            "start_date": None,
+            "end_date": None,
+            "tickers_total": 0,
+            "tickers_done": 0,
+            "tickers_skipped": 0,
+            "tickers_failed": 0,
+            "rows": 0,
+            "rows_per_second": None,
+            "elapsed_seconds": 0.0,
+            "started_at": None,
+            "finished_at": None,
+            "errors": [],
+        }
@@ -0,0 +1,54 @@
+"""Execution model for blocking work called from async endpoints.
+
+yfinance and SQLAlchemy are both synchronous. Async endpoints never call them
+directly on the event loop; instead the work is dispatched to one of two
+bounded thread pools:
+
+- the provider pool (``run_provider``) for slow network calls to Yahoo,
+  sized by ``FINSITE_PROVIDER_THREADS``
+- the database pool (``run_db``), which is anyio's default thread limiter,
+  sized by ``FINSITE_DB_THREADS``. FastAPI uses the same pool for plain
+  ``def`` endpoints and sync dependencies such as ``get_db``.
+
+Keeping the pools separate means a burst of slow provider calls can occupy
+at most ``PROVIDER_THREADS`` threads and never starves DB-only requests.
+"""
+
+from functools import partial
+from typing import Any, Callable, TypeVar
+from anyio import CapacityLimiter, to_thread
+from anyio.lowlevel import RunVar
+
+from app import config
+
+T = TypeVar("T")
+
+_provider_limiter: RunVar[CapacityLimiter] = RunVar("finsite_provider_limiter")
+
+
+def configure_thread_pools() -> None:
+    """Size both thread pools for the running event loop.
+
+    Must be called from inside the event loop, e.g. the app lifespan.
+    """
+    to_thread.current_default_thread_limiter().total_tokens = config.DB_THREADS
+    _provider_limiter.set(CapacityLimiter(config.PROVIDER_THREADS))
+
+
+def _get_provider_limiter() -> CapacityLimiter:
+    try:
+        return _provider_limiter.get()
+    except LookupError:
+        limiter = CapacityLimiter(config.PROVIDER_THREADS)
+        _provider_limiter.set(limiter)
+        return limiter
+
+
+async def run_provider(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking market data provider call on the provider pool."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=_get_provider_limiter())
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the database pool."""
+    return await to_thread.run_sync(partial(func, *args, **kwargs))
@@ -0,0 +1,152 @@
+"""Liveness and readiness checks for Finsite application."""
+
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Optional, Tuple
+from sqlalchemy import text
+import asyncio
+import logging
+import time
+
+from app import config
+from app.concurrency import run_db, run_provider
+from app.provider_gateway import provider_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def _probe_history(symbol: str) -> None:
+    """One small provider request: the last daily bar of a symbol."""
+    hist = provider_gateway.history(symbol, period='1d')
+    if hist.empty:
+        raise RuntimeError(f"No recent data for {symbol}")
+
+
+def check_database(engine) -> Tuple[bool, float, Optional[str]]:
+    """
+    Run SELECT 1 on a pooled connection.
+
+    Returns:
+        tuple: (ok, latency in ms, error message or None)
+    """
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True, (time.perf_counter() - started) * 1000, None
+    except Exception as e:
+        return False, (time.perf_counter() - started) * 1000, str(e)
+
+
+class ProviderProbe:
+    """Periodic market data provider check with rolling stats.
+
+    Runs as a task in the app lifespan and probes the provider every
+    interval seconds, so readiness checks only read the cached result and
+    never cause provider traffic themselves. Latency and error rate cover
+    the last `window` probes.
+    """
+
+    def __init__(
+        self,
+        symbol: str = config.HEALTH_PROBE_SYMBOL,
+        interval: float = config.HEALTH_PROBE_INTERVAL,
+        window: int = config.HEALTH_PROBE_WINDOW,
+        probe: Callable[[str], None] = _probe_history
+    ):
+        self.symbol = symbol
+        self.interval = interval
+        self._probe = probe
+        self._task: Optional[asyncio.Task] = None
+        # (ok, latency ms) of the most recent probes
+        self._results: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self._last_checked: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._consecutive_failures = 0
+
+    def start(self) -> None:
+        """Start probing on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="provider-probe")
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> bool:
+        """Probe the provider now and record the result."""
+        started = time.perf_counter()
+        try:
+            await run_provider(self._probe, self.symbol)
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+            logger.warning(f"Provider probe for {self.symbol} failed: {e}")
+        self._results.append((ok, (time.perf_counter() - started) * 1000))
+        self._last_checked = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self._last_error = error if not ok else self._last_error
+        self._consecutive_failures = 0 if ok else self._consecutive_failures + 1
+        return ok
+
+    def get_status(self) -> Dict:
+        """
+        Get the cached probe result and stats.
+
+        Returns:
+            dict: status is "ok" when the last probe succeeded, "error" when
+                it failed and "unknown" before the first probe
+        """
+        results = list(self._results)
+        latencies = sorted(latency for _, latency in results)
+        if not results:
+            status = "unknown"
+        else:
+            status = "ok" if results[-1][0] else "error"
+        return {
+            "status": status,
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "last_checked": self._last_checked,
+            "last_latency_ms": round(results[-1][1], 1) if results else None,
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "p95_latency_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 1) if latencies else None,
+            "max_latency_ms": round(latencies[-1], 1) if latencies else None,
+            "probes": len(results),
+            "error_rate": round(sum(1 for ok, _ in results if not ok) / len(results), 4) if results else None,
+            "consecutive_failures": self._consecutive_failures,
+            "last_error": self._last_error,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+
+async def readiness(engine, probe: ProviderProbe) -> Tuple[bool, Dict]:
+    """
+    Check the database and read the cached provider probe.
+
+    Only the database decides readiness: without the provider the app keeps
+    serving cached prices, so a failing probe is reported but not fatal.
+
+    Returns:
+        tuple: (ready, details)
+    """
+    db_ok, db_latency, db_error = await run_db(check_database, engine)
+    provider = probe.get_status()
+    return db_ok, {
+        "status": ("ok" if provider["status"] != "error" else "degraded") if db_ok else "unavailable",
+        "database": {
+            "status": "ok" if db_ok else "error",
+            "latency_ms": round(db_latency, 1),
+            "error": db_error,
+        },
+        "provider": provider,
+    }
@@ -0,0 +1,203 @@
+"""Process-wide cache for yfinance `.info` payloads."""
+
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional
+import threading
+import time
+import logging
+
+from app import config
+from app.provider_gateway import provider_gateway
+
+logger = logging.getLogger(__name__)
+
+# Fields that move during the trading day and must be refreshed quickly.
+# Every other field (names, sector, market cap, ratios...) is treated as a
+# fundamental and may be served from cache for hours.
+PRICE_FIELDS = frozenset({
+    'currentPrice', 'regularMarketPrice', 'price', 'ask', 'bid',
+    'previousClose', 'regularMarketPreviousClose',
+    'volume', 'regularMarketVolume',
+    'dayHigh', 'dayLow', 'regularMarketDayHigh', 'regularMarketDayLow',
+})
+
+
+def _fetch_info(symbol: str) -> Dict[str, Any]:
+    """Fetch the raw `.info` dict for a symbol from yfinance."""
+    return provider_gateway.info(symbol)
+
+
+class InfoCache:
+    """LRU cache of `.info` payloads with per-field TTLs.
+
+    A cached payload is served as long as it is younger than the shortest
+    TTL of the fields the caller is going to read, or up to pin_max_age
+    while the symbol is pinned by a background refresher. Identical concurrent
+    lookups for a symbol that is not cached are coalesced so that a single
+    fetch serves all of them. When a fetch fails, an expired payload is
+    served instead of the error if one is cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        price_ttl: float = 15.0,
+        fundamentals_ttl: float = 6 * 3600.0,
+        pin_max_age: float = 120.0,
+        fetcher: Callable[[str], Dict[str, Any]] = _fetch_info
+    ):
+        self.max_entries = max_entries
+        self.price_ttl = price_ttl
+        self.fundamentals_ttl = fundamentals_ttl
+        self.pin_max_age = pin_max_age
+        self._fetcher = fetcher
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._pinned: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._errors = 0
+        self._stale = 0
+
+    def ttl_for(self, fields: Iterable[str] = ()) -> float:
+        """Get the TTL that applies when reading the given fields."""
+        fields = list(fields)
+        if not fields:
+            return self.fundamentals_ttl
+        if any(field in PRICE_FIELDS for field in fields):
+            return self.price_ttl
+        return self.fundamentals_ttl
+
+    def get(self, symbol: str, fields: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Get the `.info` payload for a symbol.
+
+        Args:
+            symbol: Ticker symbol
+            fields: Fields the caller is going to read; decides the TTL
+
+        Returns:
+            dict: The raw yfinance info payload (may be empty)
+
+        Raises:
+            Exception: Whatever the underlying fetch raised
+        """
+        symbol = symbol.upper().strip()
+        max_age = self.ttl_for(fields)
+
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and self._fresh(symbol, time.monotonic() - entry[0], max_age):
+                self._entries.move_to_end(symbol)
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        return self._load(symbol)
+
+    def refresh(self, symbol: str) -> Dict[str, Any]:
+        """Fetch a symbol's payload now, whatever the age of the cached one (errors are raised)."""
+        return self._load(symbol.upper().strip(), allow_stale=False)
+
+    def pin(self, symbols: Iterable[str]) -> None:
+        """
+        Serve these symbols from cache for up to pin_max_age, whatever the TTL.
+
+        Used while a background job keeps them up to date with refresh();
+        replaces the previously pinned set. If the refreshes stop working,
+        pinned payloads expire like any other after pin_max_age.
+        """
+        with self._lock:
+            self._pinned = frozenset(symbol.upper().strip() for symbol in symbols)
+
+    def _load(self, symbol: str, allow_stale: bool = True) -> Dict[str, Any]:
+        """Fetch and store a payload, coalescing concurrent loads of one symbol."""
+        with self._lock:
+            future = self._inflight.get(symbol)
+            if future is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._inflight[symbol] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            info = self._fetcher(symbol)
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+                self._inflight.pop(symbol, None)
+                stale = self._entries.get(symbol) if allow_stale else None
+                if stale is not None:
+                    self._stale += 1
+            if stale is not None:
+                # Provider down or throttled: an old payload beats none
+                logger.warning(f"Serving stale info for {symbol}: {e}")
+                future.set_result(stale[1])
+                return stale[1]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(symbol, info)
+            self._inflight.pop(symbol, None)
+        future.set_result(info)
+        return info
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """Drop one symbol, or everything when no symbol is given."""
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol.upper().strip(), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else None,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "errors": self._errors,
+                "stale": self._stale,
+                "pinned": len(self._pinned),
+                "pin_max_age": self.pin_max_age,
+                "price_ttl": self.price_ttl,
+                "fundamentals_ttl": self.fundamentals_ttl,
+            }
+
+    def _fresh(self, symbol: str, age: float, max_age: float) -> bool:
+        """Whether a cached payload may be served. Caller holds the lock."""
+        if symbol in self._pinned:
+            max_age = max(max_age, self.pin_max_age)
+        return age <= max_age
+
+    def _store(self, symbol: str, info: Dict[str, Any]) -> None:
+        """Insert an entry and evict least recently used ones. Caller holds the lock."""
+        self._entries[symbol] = (time.monotonic(), info)
+        self._entries.move_to_end(symbol)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+info_cache = InfoCache(
+    max_entries=config.INFO_CACHE_SIZE,
+    price_ttl=config.INFO_PRICE_TTL,
+    fundamentals_ttl=config.INFO_FUNDAMENTALS_TTL,
+    pin_max_age=config.QUOTE_MAX_AGE
+)
@@ -1,22 +1,35 @@
 """Main FastAPI application for Finsite - with improved validation."""
 
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 import logging
 import os
 
-from app.database import get_db, Ticker, Position, Trade
+from app import config
+from app.concurrency import configure_thread_pools, run_db, run_provider
+from app.database import engine, get_db, Ticker, Position, Trade
+from app.migrations import run_migrations
 from app.models import (
     TickerCreate, TickerResponse, TickerInfo,
     PositionCreate, PositionClose, PositionResponse,
-    OpenPositionDetail, ClosedPositionDetail
+    OpenPositionDetail, ClosedPositionPage, PortfolioSummary, BackfillRequest
 )
 from app.ticker_service import TickerService
 from app.position_service import PositionService
+from app.quote_service import QuoteService
+from app.market_data_refresher import MarketDataRefresher
+from app.quote_stream import QuoteStream
+from app.health_service import ProviderProbe, readiness
+from app.info_cache import info_cache
+from app.provider_gateway import provider_gateway
+from app.backfill_service import BackfillService
+from app.valuation_service import ValuationService
+from app.analytics_service import AnalyticsService
 from app.version import __version__, __codename__
 
 # Configure logging
@@ -26,11 +39,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown."""
+    await run_db(run_migrations, engine)
+    configure_thread_pools()
+    logger.info(
+        f"Thread pools configured: provider={config.PROVIDER_THREADS}, db={config.DB_THREADS}"
+    )
+    if config.QUOTE_REFRESH_ENABLED:
+        quote_refresher.start()
+    provider_probe.start()
+    yield
+    await provider_probe.stop()
+    await quote_refresher.stop()
+
+
 # Initialize FastAPI app
+#
+# Execution model: endpoints that only touch the database are plain `def`
+# and run on the database thread pool. Endpoints that call the market data
+# provider are `async def` and dispatch every blocking call explicitly with
+# run_provider / run_db (see app/concurrency.py), so a slow Yahoo request
+# never blocks the event loop.
 app = FastAPI(
     title="Finsite",
     description="Investment Intelligence with Grit - Personal Investment Workbench",
-    version=__version__
+    version=__version__,
+    lifespan=lifespan
 )
 
 # Setup templates and static files
@@ -40,7 +77,22 @@ app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), na
 
 # Initialize services
 ticker_service = TickerService()
-position_service = PositionService()
+quote_service = QuoteService(max_workers=config.QUOTE_WORKERS)
+quote_refresher = MarketDataRefresher(quote_service)
+quote_stream = QuoteStream(quote_service)
+quote_refresher.add_listener(quote_stream.publish)
+provider_probe = ProviderProbe()
+position_service = PositionService(quote_service=quote_service)
+backfill_service = BackfillService(price_history_service=position_service.price_history_service)
+valuation_service = ValuationService(price_history_service=position_service.price_history_service)
+analytics_service = AnalyticsService(price_history_service=position_service.price_history_service)
+
+
+def _save(db: Session, instance) -> None:
+    """Add, commit and refresh a new model instance."""
+    db.add(instance)
+    db.commit()
+    db.refresh(instance)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -50,7 +102,7 @@ async def read_root(request: Request):
 
 
 @app.get("/api/tickers", response_model=List[TickerResponse])
-async def get_tickers(db: Session = Depends(get_db)):
+def get_tickers(db: Session = Depends(get_db)):
     """Get all tracked ticker symbols."""
     try:
         tickers = db.query(Ticker).order_by(Ticker.symbol).all()
@@ -66,9 +118,9 @@ async def create_ticker(ticker_data: TickerCreate, db: Session = Depends(get_db)
     symbol = ticker_data.symbol.upper().strip()
     
     # Check if ticker already exists
-    existing = db.query(Ticker).filter(
-        Ticker.symbol == symbol
-    ).first()
+    existing = await run_db(
+        lambda: db.query(Ticker).filter(Ticker.symbol == symbol).first()
+    )
     
     if existing:
         raise HTTPException(status_code=400, detail="Ticker already exists in your watchlist")
@@ -76,7 +128,7 @@ async def create_ticker(ticker_data: TickerCreate, db: Session = Depends(get_db)
     # Validate ticker symbol with improved validation
     logger.info(f"Validating ticker symbol: {symbol}")
     
-    if not ticker_service.validate_symbol(symbol):
+    if not await run_provider(ticker_service.validate_symbol, symbol):
         logger.warning(f"Invalid ticker symbol: {symbol}")
         raise HTTPException(
             status_code=400, 
@@ -90,19 +142,17 @@ async def create_ticker(ticker_data: TickerCreate, db: Session = Depends(get_db)
     )
     
     try:
-        db.add(new_ticker)
-        db.commit()
-        db.refresh(new_ticker)
+        await run_db(_save, db, new_ticker)
         logger.info(f"Successfully added ticker: {symbol}")
         return new_ticker
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
         logger.error(f"Database error adding ticker {symbol}: {e}")
         raise HTTPException(status_code=500, detail="Failed to save ticker")
 
 
 @app.delete("/api/tickers/{symbol}")
-async def delete_ticker(symbol: str, db: Session = Depends(get_db)):
+def delete_ticker(symbol: str, db: Session = Depends(get_db)):
     """Remove a ticker from the watchlist."""
     symbol = symbol.upper().strip()
     
@@ -130,7 +180,7 @@ async def get_ticker_info(symbol: str):
     symbol = symbol.upper().strip()
     logger.info(f"Fetching info for ticker: {symbol}")
     
-    info = ticker_service.get_ticker_info(symbol)
+    info = await run_provider(ticker_service.get_ticker_info, symbol)
     
     if info.error:
         logger.warning(f"Error fetching info for {symbol}: {info.error}")
@@ -150,7 +200,7 @@ async def validate_ticker(ticker_data: dict):
     logger.info(f"Validating ticker: {symbol}")
     
     # First, check if it's a valid symbol
-    if not ticker_service.validate_symbol(symbol):
+    if not await run_provider(ticker_service.validate_symbol, symbol):
         logger.warning(f"Invalid symbol: {symbol}")
         raise HTTPException(
             status_code=400, 
@@ -158,7 +208,7 @@ async def validate_ticker(ticker_data: dict):
         )
     
     # Get company name
-    company_name = ticker_service.get_company_name(symbol)
+    company_name = await run_provider(ticker_service.get_company_name, symbol)
     
     if not company_name:
         # If we can't get a name but symbol is valid, use symbol itself
@@ -178,10 +228,10 @@ async def debug_ticker(symbol: str):
     """Debug endpoint to test ticker validation - useful for troubleshooting."""
     symbol = symbol.upper().strip()
     
-    result = ticker_service.test_symbol(symbol)
+    result = await run_provider(ticker_service.test_symbol, symbol)
     
     # Also try to get full info to see what's available
-    info = ticker_service.get_ticker_info(symbol)
+    info = await run_provider(ticker_service.get_ticker_info, symbol)
     
     return {
         "debug_info": result,
@@ -201,7 +251,7 @@ async def debug_ticker(symbol: str):
 # Position Management Endpoints
 
 @app.post("/api/positions/open")
-async def open_position(position_data: PositionCreate, db: Session = Depends(get_db)):
+def open_position(position_data: PositionCreate, db: Session = Depends(get_db)):
     """Create a new open position with buy trade."""
     try:
         position = position_service.create_position(
@@ -222,7 +272,7 @@ async def open_position(position_data: PositionCreate, db: Session = Depends(get
 
 
 @app.post("/api/positions/{position_id}/close")
-async def close_position(position_id: int, close_data: PositionClose, db: Session = Depends(get_db)):
+def close_position(position_id: int, close_data: PositionClose, db: Session = Depends(get_db)):
     """Close an existing position with sell trade."""
     try:
         position = position_service.close_position(
@@ -245,26 +295,90 @@ async def close_position(position_id: int, close_data: PositionClose, db: Sessio
 async def get_open_positions(db: Session = Depends(get_db)):
     """Get all open positions with current valuations."""
     try:
-        positions = position_service.get_open_positions(db)
+        positions = await run_provider(position_service.get_open_positions, db)
         return positions
     except Exception as e:
         logger.error(f"Error fetching open positions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch open positions")
 
 
-@app.get("/api/positions/closed", response_model=List[ClosedPositionDetail])
-async def get_closed_positions(db: Session = Depends(get_db)):
-    """Get all closed positions with P&L."""
+@app.get("/api/positions/closed", response_model=ClosedPositionPage)
+def get_closed_positions(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    ticker: Optional[str] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    pnl: Optional[str] = Query(None, description="gain or loss"),
+    sort: str = Query("exit_date", description="exit_date, entry_date, ticker, profit, profit_percent or holding_days"),
+    order: str = Query("desc", description="asc or desc"),
+    db: Session = Depends(get_db)
+):
+    """Get a page of closed positions with P&L; pass next_cursor to get the next page."""
     try:
-        positions = position_service.get_closed_positions(db)
-        return positions
+        return position_service.get_closed_positions(
+            db,
+            limit=limit,
+            cursor=cursor,
+            ticker=ticker,
+            from_date=from_date,
+            to_date=to_date,
+            pnl=pnl,
+            sort=sort,
+            order=order
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching closed positions: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch closed positions")
 
 
+@app.get("/api/portfolio/summary", response_model=PortfolioSummary)
+def get_portfolio_summary(db: Session = Depends(get_db)):
+    """Get portfolio totals (invested, realized P&L, win rate, holding period) and per-ticker aggregates."""
+    try:
+        return position_service.portfolio_service.get_summary(db)
+    except Exception as e:
+        logger.error(f"Error fetching portfolio summary: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch portfolio summary")
+
+
+@app.get("/api/portfolio/equity-curve")
+async def get_equity_curve(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Get the daily value and P&L of all positions from the price history cache.
+    
+    With refresh=true, missing history is downloaded first.
+    """
+    runner = run_provider if refresh else run_db
+    try:
+        return await runner(valuation_service.equity_curve, db, start_date, end_date, refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error computing equity curve: {e}")
+        raise HTTPException(status_code=500, detail="Failed to compute equity curve")
+
+
+@app.post("/api/portfolio/summary/rebuild")
+def rebuild_portfolio_summary(db: Session = Depends(get_db)):
+    """Recompute the per-ticker aggregates from positions and trades."""
+    try:
+        count = position_service.portfolio_service.rebuild(db)
+        return {"message": f"Rebuilt portfolio summaries for {count} tickers"}
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding portfolio summary: {e}")
+        raise HTTPException(status_code=500, detail="Failed to rebuild portfolio summary")
+
+
 @app.get("/api/positions/{position_id}")
-async def get_position(position_id: int, db: Session = Depends(get_db)):
+def get_position(position_id: int, db: Session = Depends(get_db)):
     """Get a single position by ID."""
     position = position_service.get_position(db, position_id)
     
@@ -275,7 +389,7 @@ async def get_position(position_id: int, db: Session = Depends(get_db)):
 
 
 @app.delete("/api/positions/{position_id}")
-async def delete_position(position_id: int, db: Session = Depends(get_db)):
+def delete_position(position_id: int, db: Session = Depends(get_db)):
     """Delete a closed position."""
     position = position_service.get_position(db, position_id)
     
@@ -286,9 +400,7 @@ async def delete_position(position_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Can only delete closed positions")
     
     try:
-        db.delete(position)
-        db.commit()
-        logger.info(f"Deleted closed position {position_id} for {position.ticker}")
+        position_service.delete_position(db, position)
         return {"message": f"Position {position_id} deleted successfully"}
     except Exception as e:
         db.rollback()
@@ -299,14 +411,20 @@ async def delete_position(position_id: int, db: Session = Depends(get_db)):
 @app.get("/api/positions/{position_id}/chart-data")
 async def get_position_chart_data(
     position_id: int, 
+    max_points: Optional[int] = Query(None, ge=10, le=10000, description="Downsample the price line (LTTB)"),
+    format: str = Query("points", description="points or columnar"),
     db: Session = Depends(get_db)
 ):
-    """Get chart data for a closed position.
-    
-    Returns price history with entry/exit markers.
+    """Get chart data for an open or closed position.
+
+    Returns price history with entry and exit markers; open positions use
+    the current price and date in place of the exit. max_points downsamples
+    the price line (LTTB, keeping the entry and exit bars), and
+    format=columnar returns parallel "dates" and "closes" arrays instead of
+    "prices" points.
     """
     try:
-        chart_data = position_service.get_chart_data(db, position_id)
+        chart_data = await run_provider(position_service.get_chart_data, db, position_id, max_points, format)
         return chart_data
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -317,21 +435,134 @@ async def get_position_chart_data(
         }
 
 
+# Risk Analytics Endpoints
+# /api/analytics/portfolio is registered before /api/analytics/{symbol} so it is not taken for a ticker
+
+@app.get("/api/analytics/portfolio")
+async def get_portfolio_analytics(
+    window: int = Query(252, ge=2, le=2520, description="Number of daily returns"),
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Volatility, drawdown, Sharpe ratio and beta of the open positions as one portfolio."""
+    runner = run_provider if refresh else run_db
+    try:
+        return await runner(analytics_service.get_portfolio_analytics, db, window, refresh)
+    except Exception as e:
+        logger.error(f"Error computing portfolio analytics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to compute portfolio analytics")
+
+
+@app.get("/api/analytics/{symbol}")
+async def get_ticker_analytics(
+    symbol: str,
+    window: int = Query(252, ge=2, le=2520, description="Number of daily returns"),
+    refresh: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Volatility, drawdown, Sharpe ratio and beta of a ticker from cached price history.
+    
+    With refresh=true, missing history is downloaded first.
+    """
+    runner = run_provider if refresh else run_db
+    try:
+        return await runner(analytics_service.get_ticker_analytics, db, symbol, window, refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error computing analytics for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to compute analytics")
+
+
+# Price History Backfill Endpoints
+
+@app.post("/api/backfill", status_code=202)
+def start_backfill(request: BackfillRequest = None):
+    """Start warming the price history cache in the background."""
+    request = request or BackfillRequest()
+    started = backfill_service.start(
+        tickers=request.tickers,
+        years=request.years,
+        start_date=request.start_date,
+        end_date=request.end_date
+    )
+    
+    if not started:
+        raise HTTPException(status_code=409, detail="A backfill is already running")
+    
+    return backfill_service.get_status()
+
+
+@app.get("/api/backfill/status")
+def get_backfill_status():
+    """Progress of the current or last backfill."""
+    return backfill_service.get_status()
+
+
+@app.get("/api/quotes/stats")
+async def get_quote_stats():
+    """Per-ticker quote timing and failure counts, slowest first."""
+    return quote_service.get_stats()
+
+
+@app.get("/api/quotes/snapshot")
+async def get_quote_snapshot():
+    """In-memory quote snapshot and the state of the background refresher."""
+    return {
+        "refresher": quote_refresher.get_status(),
+        "stream": quote_stream.get_status(),
+        "quotes": quote_service.get_snapshot(),
+    }
+
+
+@app.get("/api/stream/quotes")
+async def stream_quotes():
+    """Server-Sent Events stream of changed quotes and open position valuations.
+    
+    Sends a "snapshot" event with everything on connect, then "quotes"
+    events with only what changed after each background refresh.
+    """
+    return StreamingResponse(
+        quote_stream.events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/provider/stats")
+async def get_provider_stats():
+    """Rate limiter, retry and circuit breaker counters of the provider gateway."""
+    return provider_gateway.get_stats()
+
+
+@app.get("/api/info-cache/stats")
+async def get_info_cache_stats():
+    """Hit/miss counters of the shared ticker info cache."""
+    return info_cache.get_stats()
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    # Test yfinance connectivity
-    test_result = ticker_service.validate_symbol("AAPL")
-    
+    """Liveness check: answers without touching the database or the provider."""
     return {
         "status": "healthy",
         "service": "Finsite",
         "version": __version__,
         "codename": __codename__,
-        "yfinance_connection": "ok" if test_result else "error"
     }
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness check: database round-trip plus the cached provider probe.
+    
+    Returns 503 when the database is unavailable. A failing provider probe
+    only marks the status "degraded", since cached data is still served.
+    """
+    ready, details = await readiness(engine, provider_probe)
+    return JSONResponse(details, status_code=200 if ready else 503)
+
+
 @app.get("/api/test-symbols")
 async def test_common_symbols():
     """Test endpoint to validate common symbols - useful for debugging."""
@@ -340,8 +571,8 @@ async def test_common_symbols():
     
     for symbol in test_symbols:
         results[symbol] = {
-            "is_valid": ticker_service.validate_symbol(symbol),
-            "name": ticker_service.get_company_name(symbol)
+            "is_valid": await run_provider(ticker_service.validate_symbol, symbol),
+            "name": await run_provider(ticker_service.get_company_name, symbol)
         }
     
     return results
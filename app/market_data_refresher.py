@@ -0,0 +1,145 @@
+"""Background refresher that keeps the quote snapshot current."""
+
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import select
+import asyncio
+import logging
+import time
+
+from app import config
+from app.concurrency import run_db, run_provider
+from app.database import Position, SessionLocal, Ticker
+from app.quote_service import QuoteService
+from app.trading_calendar import calendar_for_ticker
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataRefresher:
+    """Periodic quote refresh for watchlist tickers and open positions.
+
+    Runs as a task in the app lifespan. Each pass loads the tracked symbols,
+    refreshes the ones whose exchange is in session, and once more after
+    the close so the snapshot ends on the closing price; symbols of closed
+    markets are otherwise left alone. The tracked set is registered with
+    the QuoteService, which then answers requests for it from memory.
+    Listeners (e.g. QuoteStream.publish) run after every pass.
+    """
+
+    def __init__(
+        self,
+        quote_service: QuoteService,
+        session_factory: Callable = SessionLocal,
+        interval: float = config.QUOTE_REFRESH_INTERVAL,
+        closed_interval: float = config.QUOTE_REFRESH_CLOSED_INTERVAL
+    ):
+        self.quote_service = quote_service
+        self.session_factory = session_factory
+        self.interval = interval
+        self.closed_interval = closed_interval
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[], Awaitable[None]]] = []
+        # ticker -> whether its market was open at its last successful refresh
+        self._refreshed_open: Dict[str, bool] = {}
+        self._status = {
+            "passes": 0,
+            "tickers": 0,
+            "open_markets": 0,
+            "last_run": None,
+            "last_refreshed": 0,
+            "last_duration_ms": None,
+            "last_error": None,
+        }
+
+    def start(self) -> None:
+        """Start the refresh loop on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="market-data-refresher")
+            logger.info(f"Quote refresher started (every {self.interval:.0f}s while markets are open)")
+
+    async def stop(self) -> None:
+        """Stop the loop and hand tracked symbols back to on-demand fetching."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.quote_service.track(())
+
+    def add_listener(self, listener: Callable[[], Awaitable[None]]) -> None:
+        """Register a coroutine function to await after every refresh pass."""
+        self._listeners.append(listener)
+
+    def get_status(self) -> Dict:
+        """Get counters of the refresh loop."""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval": self.interval,
+            "closed_interval": self.closed_interval,
+            **self._status,
+        }
+
+    async def run_once(self) -> float:
+        """
+        Run one refresh pass.
+
+        Returns:
+            float: Seconds to wait before the next pass
+        """
+        started = time.perf_counter()
+        tickers = await run_db(self._load_tickers)
+        now = datetime.now(timezone.utc)
+        open_now = {ticker: calendar_for_ticker(ticker).is_open(now) for ticker in tickers}
+
+        self._refreshed_open = {t: was_open for t, was_open in self._refreshed_open.items() if t in open_now}
+        due = [
+            ticker for ticker, is_open in open_now.items()
+            if is_open or self._refreshed_open.get(ticker, True)
+        ]
+
+        self.quote_service.track(tickers)
+        refreshed = 0
+        if due:
+            quotes = await run_provider(self.quote_service.refresh, due)
+            for ticker, price in quotes.items():
+                if price is not None:
+                    self._refreshed_open[ticker] = open_now[ticker]
+                    refreshed += 1
+
+        markets_open = sum(open_now.values())
+        self._status.update(
+            passes=self._status["passes"] + 1,
+            tickers=len(tickers),
+            open_markets=markets_open,
+            last_run=now.isoformat(timespec='seconds'),
+            last_refreshed=refreshed,
+            last_duration_ms=round((time.perf_counter() - started) * 1000, 1),
+            last_error=None,
+        )
+        for listener in self._listeners:
+            await listener()
+        return self.interval if markets_open else self.closed_interval
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                delay = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Quote refresh failed: {e}")
+                self._status["last_error"] = str(e)
+                delay = self.interval
+            await asyncio.sleep(delay)
+
+    def _load_tickers(self) -> List[str]:
+        """Watchlist symbols plus tickers of open positions."""
+        with self.session_factory() as db:
+            symbols = db.scalars(select(Ticker.symbol)).all()
+            symbols += db.scalars(
+                select(Position.ticker).where(Position.status == 'OPEN').distinct()
+            ).all()
+        return sorted({symbol.upper().strip() for symbol in symbols})
@@ -0,0 +1,253 @@
+"""Versioned schema migrations for Finsite.
+
+Each migration has a version number and an idempotent upgrade function. The
+versions applied to a database are recorded in the schema_version table, so
+startup only needs one small query to see that the schema is current and
+skips metadata reflection entirely.
+
+To change the schema, update the models in app/database.py and append a
+Migration to MIGRATIONS that brings existing databases to the same state
+(use the add_column / create_index helpers, which skip work that is already
+done, because fresh databases get every table from the baseline).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List
+from sqlalchemy import inspect, text, BigInteger, Column, DateTime, Float, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+import logging
+
+from app.database import Base
+from app.portfolio_service import rebuild_ticker_summaries
+
+logger = logging.getLogger(__name__)
+
+_version_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema change."""
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def add_column(conn: Connection, table: str, column: Column) -> None:
+    """Add a column to an existing table unless it is already there."""
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    if column.name in existing:
+        return
+    column_type = column.type.compile(dialect=conn.dialect)
+    nullable = "" if column.nullable else " NOT NULL"
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}{nullable}"))
+    logger.info(f"Added column {table}.{column.name}")
+
+
+def create_index(conn: Connection, table: str, name: str) -> None:
+    """Create an index declared on a model unless it already exists."""
+    index = next(idx for idx in Base.metadata.tables[table].indexes if idx.name == name)
+    index.create(bind=conn, checkfirst=True)
+    logger.info(f"Ensured index {name} on {table}")
+
+
+def _baseline(conn: Connection) -> None:
+    """Create every table that does not exist yet (v1.2 schema and earlier)."""
+    Base.metadata.create_all(bind=conn)
+
+
+DATE_COLUMNS = [
+    ("positions", "entry_date"),
+    ("positions", "exit_date"),
+    ("trades", "trade_date"),
+    ("price_history", "date"),
+    ("non_trading_days", "date"),
+    ("price_coverage", "earliest_date"),
+    ("price_coverage", "latest_date"),
+]
+
+
+def _convert_date_column(conn: Connection, table: str, column: str) -> None:
+    """
+    Turn a YYYY-MM-DD string column into a DATE column.
+    
+    SQLite stores SQLAlchemy Date values as YYYY-MM-DD text already, so only
+    values in another shape (e.g. 2025-1-5) need rewriting. PostgreSQL
+    changes the column type in place.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE DATE USING {column}::date"
+        ))
+        return
+    
+    rows = conn.execute(text(
+        f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL "
+        f"AND {column} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    )).fetchall()
+    invalid = []
+    for row_id, value in rows:
+        try:
+            normalized = datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date().isoformat()
+        except ValueError:
+            invalid.append(row_id)
+            continue
+        conn.execute(
+            text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+            {"value": normalized, "id": row_id}
+        )
+    if invalid:
+        raise RuntimeError(f"{table}.{column} has values that are not dates (ids: {invalid[:20]})")
+    if rows:
+        logger.info(f"Normalized {len(rows)} values in {table}.{column}")
+
+
+def _typed_dates_and_indexes(conn: Connection) -> None:
+    """Date columns instead of strings; (status, ticker) and (position_id, trade_date) indexes."""
+    for table, column in DATE_COLUMNS:
+        _convert_date_column(conn, table, column)
+    create_index(conn, "positions", "ix_positions_status_ticker")
+    create_index(conn, "trades", "ix_trades_position_id_trade_date")
+
+
+def _closed_positions_index(conn: Connection) -> None:
+    """(status, exit_date) index for paging through closed positions."""
+    create_index(conn, "positions", "ix_positions_status_exit_date")
+
+
+def _realized_pnl_columns(conn: Connection) -> None:
+    """Stored profit, profit percent and holding period, backfilled for closed positions."""
+    add_column(conn, "positions", Column("profit_eur", Float, nullable=True))
+    add_column(conn, "positions", Column("profit_percent", Float, nullable=True))
+    add_column(conn, "positions", Column("holding_period_days", Integer, nullable=True))
+    
+    if conn.dialect.name == "sqlite":
+        holding_days = "CAST(julianday(exit_date) - julianday(entry_date) AS INTEGER)"
+    else:
+        holding_days = "exit_date - entry_date"
+    result = conn.execute(text(
+        "UPDATE positions SET "
+        "profit_eur = exit_value_eur - entry_value_eur, "
+        "profit_percent = (exit_value_eur - entry_value_eur) * 100.0 / entry_value_eur, "
+        f"holding_period_days = {holding_days} "
+        "WHERE status = 'CLOSED' AND profit_eur IS NULL"
+    ))
+    logger.info(f"Backfilled realized P&L for {result.rowcount} closed positions")
+    
+    for name in (
+        "ix_positions_status_profit_eur",
+        "ix_positions_status_profit_percent",
+        "ix_positions_status_holding_period_days",
+    ):
+        create_index(conn, "positions", name)
+
+
+def _ticker_summaries(conn: Connection) -> None:
+    """Per-ticker portfolio aggregates, populated from existing positions."""
+    Base.metadata.tables["ticker_summaries"].create(bind=conn, checkfirst=True)
+    rebuild_ticker_summaries(conn)
+
+
+def _ohlcv_columns(conn: Connection) -> None:
+    """
+    Open/high/low/volume plus dividends and splits on price_history.
+    
+    Existing rows keep NULLs until their dates are fetched again. Clearing
+    price_coverage makes the next chart request or backfill of each ticker
+    re-download its cached range once and fill the new columns in.
+    """
+    add_column(conn, "price_history", Column("open_price", Float, nullable=True))
+    add_column(conn, "price_history", Column("high_price", Float, nullable=True))
+    add_column(conn, "price_history", Column("low_price", Float, nullable=True))
+    add_column(conn, "price_history", Column("volume", BigInteger, nullable=True))
+    add_column(conn, "price_history", Column("dividend", Float, nullable=True))
+    add_column(conn, "price_history", Column("split_ratio", Float, nullable=True))
+    conn.execute(text("DELETE FROM price_coverage"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Baseline schema", _baseline),
+    Migration(2, "Typed date columns and position/trade indexes", _typed_dates_and_indexes),
+    Migration(3, "Closed positions index", _closed_positions_index),
+    Migration(4, "Realized P&L columns on positions", _realized_pnl_columns),
+    Migration(5, "Ticker summaries for portfolio aggregates", _ticker_summaries),
+    Migration(6, "OHLCV, dividend and split columns on price_history", _ohlcv_columns),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: Connection) -> int:
+    """Highest applied migration version, 0 for a database without one."""
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except Exception:
+        # No schema_version table yet; roll back the failed statement
+        conn.rollback()
+        return 0
+
+
+class _AlreadyApplied(Exception):
+    """Another process recorded the migration first."""
+
+
+def _claim_version(conn: Connection, migration: Migration) -> None:
+    """Record a migration as applied in the current transaction."""
+    try:
+        conn.execute(schema_version.insert().values(
+            version=migration.version,
+            description=migration.description,
+            applied_at=datetime.utcnow()
+        ))
+    except IntegrityError as e:
+        raise _AlreadyApplied() from e
+
+
+def run_migrations(engine: Engine) -> int:
+    """
+    Bring the database schema up to date.
+
+    Returns:
+        int: The schema version after migrating
+    """
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+    if current >= LATEST_VERSION:
+        logger.info(f"Database schema is current (version {current})")
+        return current
+
+    try:
+        _version_metadata.create_all(bind=engine)
+    except (OperationalError, ProgrammingError):
+        # Another worker created it between the existence check and CREATE TABLE
+        if not inspect(engine).has_table("schema_version"):
+            raise
+
+    for migration in MIGRATIONS:
+        if migration.version <= current:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        try:
+            with engine.begin() as conn:
+                # Claim the version before upgrading: a concurrent worker's
+                # insert waits on this row until we commit and then fails,
+                # while errors of the upgrade itself roll the claim back
+                # and propagate
+                _claim_version(conn, migration)
+                migration.upgrade(conn)
+        except _AlreadyApplied:
+            logger.info(f"Migration {migration.version} was applied by another process")
+        current = migration.version
+
+    logger.info(f"Database schema migrated to version {current}")
+    return current
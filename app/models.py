@@ -91,13 +91,48 @@ class OpenPositionDetail(PositionResponse):
     current_value_eur: Optional[float] = None
     unrealized_profit_eur: Optional[float] = None
     unrealized_profit_percent: Optional[float] = None
+    current_price_as_of: Optional[str] = None
 
 
 class ClosedPositionDetail(PositionResponse):
     """Model for closed position with P&L."""
-    profit_eur: float
-    profit_percent: float
-    holding_period_days: int
+    profit_eur: Optional[float] = None
+    profit_percent: Optional[float] = None
+    holding_period_days: Optional[int] = None
+
+
+class ClosedPositionPage(BaseModel):
+    """One page of closed positions."""
+    items: List[ClosedPositionDetail]
+    next_cursor: Optional[str] = None
+    limit: int
+
+
+class PortfolioAggregate(BaseModel):
+    """Position aggregates for the whole portfolio or one ticker."""
+    open_positions: int
+    open_invested_eur: float
+    closed_positions: int
+    closed_invested_eur: float
+    total_invested_eur: float
+    realized_profit_eur: float
+    realized_profit_percent: Optional[float] = None
+    wins: int
+    losses: int
+    win_rate: Optional[float] = None
+    avg_holding_days: Optional[float] = None
+    trade_count: int
+
+
+class TickerAggregate(PortfolioAggregate):
+    """Position aggregates for one ticker."""
+    ticker: str
+
+
+class PortfolioSummary(BaseModel):
+    """Portfolio totals with a per-ticker breakdown."""
+    totals: PortfolioAggregate
+    tickers: List[TickerAggregate]
 
 
 class ChartDataPoint(BaseModel):
@@ -118,3 +153,11 @@ class PositionChartData(BaseModel):
     end_date: str
     prices: List[ChartDataPoint]
     error: Optional[str] = None
+
+
+class BackfillRequest(BaseModel):
+    """Model for starting a price history backfill."""
+    tickers: Optional[List[str]] = Field(None, description="Symbols to load; defaults to all known tickers")
+    years: float = Field(5, gt=0, description="Years of history to load")
+    start_date: Optional[str] = Field(None, description="First date (YYYY-MM-DD), overrides years")
+    end_date: Optional[str] = Field(None, description="Last date (YYYY-MM-DD), defaults to yesterday")
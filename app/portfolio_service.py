@@ -0,0 +1,176 @@
+"""Portfolio-level aggregates for Finsite application."""
+
+from datetime import datetime
+from typing import Dict
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+import logging
+
+from app.database import Position, Trade, TickerSummary, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_COUNTERS = (
+    'open_positions',
+    'open_invested_eur',
+    'closed_positions',
+    'closed_invested_eur',
+    'closed_proceeds_eur',
+    'realized_profit_eur',
+    'wins',
+    'losses',
+    'total_holding_days',
+    'trade_count',
+)
+
+
+def rebuild_ticker_summaries(conn) -> int:
+    """
+    Recompute the ticker_summaries table from positions and trades.
+
+    Args:
+        conn: Connection or Session to run the statements on
+
+    Returns:
+        int: Number of tickers summarized
+    """
+    is_open = Position.status == 'OPEN'
+    is_closed = Position.status == 'CLOSED'
+    positions = conn.execute(
+        select(
+            Position.ticker,
+            func.sum(case((is_open, 1), else_=0)),
+            func.sum(case((is_open, Position.entry_value_eur), else_=0.0)),
+            func.sum(case((is_closed, 1), else_=0)),
+            func.sum(case((is_closed, Position.entry_value_eur), else_=0.0)),
+            func.sum(case((is_closed, Position.exit_value_eur), else_=0.0)),
+            func.sum(case((is_closed, Position.profit_eur), else_=0.0)),
+            func.sum(case((is_closed & (Position.profit_eur > 0), 1), else_=0)),
+            func.sum(case((is_closed & (Position.profit_eur < 0), 1), else_=0)),
+            func.sum(case((is_closed, Position.holding_period_days), else_=0)),
+        ).group_by(Position.ticker)
+    ).all()
+    trade_counts = dict(conn.execute(
+        select(Trade.ticker, func.count(Trade.id)).group_by(Trade.ticker)
+    ).all())
+
+    now = datetime.utcnow()
+    rows = []
+    for ticker, *values in positions:
+        row = dict(zip(SUMMARY_COUNTERS, values))
+        row.update(ticker=ticker, trade_count=trade_counts.get(ticker, 0), updated_at=now)
+        rows.append(row)
+
+    conn.execute(delete(TickerSummary))
+    if rows:
+        conn.execute(TickerSummary.__table__.insert(), rows)
+    logger.info(f"Rebuilt portfolio summaries for {len(rows)} tickers")
+    return len(rows)
+
+
+class PortfolioService:
+    """Service for portfolio aggregates backed by the ticker_summaries table.
+
+    PositionService calls the record_* hooks inside the same transaction that
+    changes a position, so the summaries stay in step with the positions they
+    describe. Counters are updated with relative UPDATEs (col = col + delta)
+    so concurrent requests do not overwrite each other.
+    """
+
+    def record_open(self, db: Session, position: Position) -> None:
+        """Account for a newly opened position and its buy trade."""
+        self._apply(db, position.ticker, {
+            'open_positions': 1,
+            'open_invested_eur': position.entry_value_eur,
+            'trade_count': 1,
+        })
+
+    def record_close(self, db: Session, position: Position) -> None:
+        """Move a position from open to closed and add its sell trade."""
+        self._apply(db, position.ticker, {
+            'open_positions': -1,
+            'open_invested_eur': -position.entry_value_eur,
+            'closed_positions': 1,
+            'closed_invested_eur': position.entry_value_eur,
+            'closed_proceeds_eur': position.exit_value_eur,
+            'realized_profit_eur': position.profit_eur,
+            'wins': 1 if position.profit_eur > 0 else 0,
+            'losses': 1 if position.profit_eur < 0 else 0,
+            'total_holding_days': position.holding_period_days,
+            'trade_count': 1,
+        })
+
+    def record_delete(self, db: Session, position: Position) -> None:
+        """Remove a closed position and its trades from the aggregates."""
+        self._apply(db, position.ticker, {
+            'closed_positions': -1,
+            'closed_invested_eur': -position.entry_value_eur,
+            'closed_proceeds_eur': -position.exit_value_eur,
+            'realized_profit_eur': -position.profit_eur,
+            'wins': -1 if position.profit_eur > 0 else 0,
+            'losses': -1 if position.profit_eur < 0 else 0,
+            'total_holding_days': -position.holding_period_days,
+            'trade_count': -len(position.trades),
+        })
+
+    def get_summary(self, db: Session) -> Dict:
+        """
+        Get portfolio totals and per-ticker aggregates.
+
+        Returns:
+            dict: {"totals": {...}, "tickers": [{...}, ...]}
+        """
+        summaries = db.query(TickerSummary).order_by(TickerSummary.ticker).all()
+        tickers = [
+            self._describe({c: getattr(s, c) for c in SUMMARY_COUNTERS}, ticker=s.ticker)
+            for s in summaries
+            if s.open_positions or s.closed_positions
+        ]
+        totals = {c: sum(getattr(s, c) for s in summaries) for c in SUMMARY_COUNTERS}
+        return {"totals": self._describe(totals), "tickers": tickers}
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute all summaries from positions and trades."""
+        count = rebuild_ticker_summaries(db)
+        db.commit()
+        return count
+
+    @staticmethod
+    def _apply(db: Session, ticker: str, deltas: Dict) -> None:
+        """Add deltas to a ticker's counters, creating its row on first use."""
+        db.execute(
+            dialect_insert(db, TickerSummary)
+            .values(ticker=ticker, **{c: 0 for c in SUMMARY_COUNTERS}, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=['ticker'])
+        )
+        db.execute(
+            update(TickerSummary)
+            .where(TickerSummary.ticker == ticker)
+            .values(
+                updated_at=datetime.utcnow(),
+                **{c: getattr(TickerSummary, c) + delta for c, delta in deltas.items()}
+            )
+        )
+
+    @staticmethod
+    def _describe(counters: Dict, **extra) -> Dict:
+        """Turn raw counters into the API shape with derived ratios."""
+        closed = counters['closed_positions']
+        closed_invested = counters['closed_invested_eur']
+        return {
+            **extra,
+            "open_positions": counters['open_positions'],
+            "open_invested_eur": round(counters['open_invested_eur'], 2),
+            "closed_positions": closed,
+            "closed_invested_eur": round(closed_invested, 2),
+            "total_invested_eur": round(counters['open_invested_eur'] + closed_invested, 2),
+            "realized_profit_eur": round(counters['realized_profit_eur'], 2),
+            "realized_profit_percent": (
+                round(counters['realized_profit_eur'] / closed_invested * 100, 2) if closed_invested else None
+            ),
+            "wins": counters['wins'],
+            "losses": counters['losses'],
+            "win_rate": round(counters['wins'] / closed * 100, 2) if closed else None,
+            "avg_holding_days": round(counters['total_holding_days'] / closed, 1) if closed else None,
+            "trade_count": counters['trade_count'],
+        }
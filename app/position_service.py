@@ -1,22 +1,79 @@
 """Position management service for Finsite application."""
 
+from sqlalchemy import or_, tuple_
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
-import yfinance as yf
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Dict, Tuple
+import base64
+import json
 import logging
 
 from app.database import Position, Trade
-from app.price_history_service import PriceHistoryService
+from app.portfolio_service import PortfolioService
+from app.price_history_service import PriceHistoryService, downsample_series, series_to_points
+from app.quote_service import QuoteService
 
 logger = logging.getLogger(__name__)
 
+CLOSED_SORT_KEYS = ('exit_date', 'entry_date', 'ticker', 'profit', 'profit_percent', 'holding_days')
+MAX_PAGE_SIZE = 200
+PNL_TOLERANCE = 1e-6
+CHART_FORMATS = ('points', 'columnar')
+MIN_CHART_POINTS = 10
+
+
+def realized_pnl(position: Position) -> Tuple[float, float, int]:
+    """Profit in EUR, profit percent and holding days of a closed position."""
+    profit = position.exit_value_eur - position.entry_value_eur
+    profit_pct = profit * 100.0 / position.entry_value_eur
+    holding_days = (position.exit_date - position.entry_date).days
+    return profit, profit_pct, holding_days
+
+
+def unrealized_pnl(position, current_price: Optional[float]) -> Dict[str, Optional[float]]:
+    """
+    Current valuation fields of an open position at a price.
+    
+    Args:
+        position: Anything with entry_value_eur and entry_price_per_share
+        current_price: Current price per share, None when unknown
+    
+    Returns:
+        dict: current_price_per_share, current_value_eur, unrealized_profit_eur
+            and unrealized_profit_percent (all None without a price)
+    """
+    if not current_price:
+        return {
+            'current_price_per_share': None,
+            'current_value_eur': None,
+            'unrealized_profit_eur': None,
+            'unrealized_profit_percent': None,
+        }
+    
+    # Calculate current value: (entry_value / entry_price) * current_price
+    shares = position.entry_value_eur / position.entry_price_per_share
+    current_value = shares * current_price
+    unrealized_profit = current_value - position.entry_value_eur
+    unrealized_profit_pct = (unrealized_profit / position.entry_value_eur) * 100
+    return {
+        'current_price_per_share': round(current_price, 2),
+        'current_value_eur': round(current_value, 2),
+        'unrealized_profit_eur': round(unrealized_profit, 2),
+        'unrealized_profit_percent': round(unrealized_profit_pct, 2),
+    }
+
 
 class PositionService:
     """Service for managing trading positions."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        quote_service: Optional[QuoteService] = None,
+        portfolio_service: Optional[PortfolioService] = None
+    ):
         self.price_history_service = PriceHistoryService()
+        self.quote_service = quote_service or QuoteService()
+        self.portfolio_service = portfolio_service or PortfolioService()
     
     def create_position(
         self, 
@@ -29,6 +86,7 @@ class PositionService:
     ) -> Position:
         """Create a new open position with buy trade."""
         ticker = ticker.upper().strip()
+        entry_day = self._parse_date(entry_date, "Entry date")
         
         # Validate currency
         if entry_currency not in ['EUR', 'USD']:
@@ -38,7 +96,7 @@ class PositionService:
         position = Position(
             ticker=ticker,
             status='OPEN',
-            entry_date=entry_date,
+            entry_date=entry_day,
             entry_value_eur=entry_value_eur,
             entry_price_per_share=entry_price_per_share,
             entry_currency=entry_currency
@@ -52,13 +110,14 @@ class PositionService:
             position_id=position.id,
             ticker=ticker,
             trade_type='BUY',
-            trade_date=entry_date,
+            trade_date=entry_day,
             amount_eur=entry_value_eur,
             price_per_share=entry_price_per_share,
             currency=entry_currency
         )
         
         db.add(trade)
+        self.portfolio_service.record_open(db, position)
         db.commit()
         db.refresh(position)
         
@@ -82,6 +141,8 @@ class PositionService:
         if position.status != 'OPEN':
             raise ValueError(f"Position {position_id} is already closed")
         
+        exit_day = self._parse_date(exit_date, "Exit date")
+        
         # Validate currency
         if exit_currency not in ['EUR', 'USD']:
             raise ValueError("Currency must be EUR or USD")
@@ -92,22 +153,24 @@ class PositionService:
         
         # Update position
         position.status = 'CLOSED'
-        position.exit_date = exit_date
+        position.exit_date = exit_day
         position.exit_value_eur = exit_value_eur
         position.exit_currency = exit_currency
+        position.profit_eur, position.profit_percent, position.holding_period_days = realized_pnl(position)
         
         # Create sell trade
         trade = Trade(
             position_id=position.id,
             ticker=position.ticker,
             trade_type='SELL',
-            trade_date=exit_date,
+            trade_date=exit_day,
             amount_eur=exit_value_eur,
             price_per_share=exit_price_per_share,
             currency=exit_currency
         )
         
         db.add(trade)
+        self.portfolio_service.record_close(db, position)
         db.commit()
         db.refresh(position)
         
@@ -118,89 +181,230 @@ class PositionService:
         """Get all open positions with current valuations."""
         positions = db.query(Position).filter(Position.status == 'OPEN').all()
         
+        # Fetch every distinct ticker once and value all positions from that snapshot
+        quotes = self.quote_service.get_quotes(pos.ticker for pos in positions)
+        quote_times = self.quote_service.get_quote_times(quotes)
+        
         result = []
         for pos in positions:
             pos_dict = pos.to_dict()
-            
-            # Get current price
-            current_price = self._get_current_price(pos.ticker, pos.entry_currency)
-            
-            if current_price:
-                # Calculate current value: (entry_value / entry_price) * current_price
-                shares = pos.entry_value_eur / pos.entry_price_per_share
-                current_value = shares * current_price
-                unrealized_profit = current_value - pos.entry_value_eur
-                unrealized_profit_pct = (unrealized_profit / pos.entry_value_eur) * 100
-                
-                pos_dict['current_price_per_share'] = round(current_price, 2)
-                pos_dict['current_value_eur'] = round(current_value, 2)
-                pos_dict['unrealized_profit_eur'] = round(unrealized_profit, 2)
-                pos_dict['unrealized_profit_percent'] = round(unrealized_profit_pct, 2)
-            else:
-                pos_dict['current_price_per_share'] = None
-                pos_dict['current_value_eur'] = None
-                pos_dict['unrealized_profit_eur'] = None
-                pos_dict['unrealized_profit_percent'] = None
-            
+            pos_dict.update(unrealized_pnl(pos, quotes.get(pos.ticker)))
+            # When the price was fetched; older than a refresh when the provider is down
+            pos_dict['current_price_as_of'] = quote_times.get(pos.ticker)
             result.append(pos_dict)
         
         return result
     
-    def get_closed_positions(self, db: Session) -> List[dict]:
-        """Get all closed positions with P&L."""
-        positions = db.query(Position).filter(Position.status == 'CLOSED').all()
+    def get_closed_positions(
+        self,
+        db: Session,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        ticker: Optional[str] = None,
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        pnl: Optional[str] = None,
+        sort: str = 'exit_date',
+        order: str = 'desc'
+    ) -> Dict:
+        """
+        Get one page of closed positions with P&L.
         
-        result = []
-        for pos in positions:
+        Filtering and sorting run in SQL on the P&L columns stored at close
+        time. Pages are keyset paginated on (sort value, id): pass the
+        returned next_cursor to get the following page with the same
+        filters and sort.
+        
+        Args:
+            db: Database session
+            limit: Page size (1-200)
+            cursor: next_cursor from the previous page
+            ticker: Only positions in this ticker
+            from_date: Only positions closed on or after this date (YYYY-MM-DD)
+            to_date: Only positions closed on or before this date (YYYY-MM-DD)
+            pnl: 'gain' or 'loss'
+            sort: One of CLOSED_SORT_KEYS
+            order: 'asc' or 'desc'
+        
+        Returns:
+            dict: {"items": [...], "next_cursor": "..." or None, "limit": 50}
+        """
+        if sort not in CLOSED_SORT_KEYS:
+            raise ValueError(f"Sort must be one of: {', '.join(CLOSED_SORT_KEYS)}")
+        if order not in ('asc', 'desc'):
+            raise ValueError("Order must be asc or desc")
+        if pnl not in (None, 'gain', 'loss'):
+            raise ValueError("P&L filter must be gain or loss")
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        sort_columns = {
+            'exit_date': Position.exit_date,
+            'entry_date': Position.entry_date,
+            'ticker': Position.ticker,
+            'profit': Position.profit_eur,
+            'profit_percent': Position.profit_percent,
+            'holding_days': Position.holding_period_days,
+        }
+        sort_column = sort_columns[sort]
+        
+        query = db.query(Position).filter(Position.status == 'CLOSED')
+        
+        if ticker:
+            query = query.filter(Position.ticker == ticker.upper().strip())
+        if from_date:
+            query = query.filter(Position.exit_date >= self._parse_date(from_date, "From date"))
+        if to_date:
+            query = query.filter(Position.exit_date <= self._parse_date(to_date, "To date"))
+        if pnl == 'gain':
+            query = query.filter(Position.profit_eur > 0)
+        elif pnl == 'loss':
+            query = query.filter(Position.profit_eur < 0)
+        
+        # Rows whose P&L could not be computed (NULL) come last in either
+        # order. A tuple comparison never matches NULL, so once the cursor
+        # reaches them it pages on the id alone.
+        if cursor:
+            last_value, last_id = self._decode_cursor(cursor, sort)
+            if last_value is None:
+                after_id = Position.id < last_id if order == 'desc' else Position.id > last_id
+                query = query.filter(sort_column.is_(None), after_id)
+            else:
+                key = tuple_(sort_column, Position.id)
+                after_key = key < (last_value, last_id) if order == 'desc' else key > (last_value, last_id)
+                query = query.filter(or_(after_key, sort_column.is_(None)))
+        
+        if order == 'desc':
+            query = query.order_by(sort_column.desc().nulls_last(), Position.id.desc())
+        else:
+            query = query.order_by(sort_column.asc().nulls_last(), Position.id.asc())
+        
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        items = []
+        for pos in rows:
             pos_dict = pos.to_dict()
-            
-            # Calculate profit/loss
-            profit = pos.exit_value_eur - pos.entry_value_eur
-            profit_pct = (profit / pos.entry_value_eur) * 100
-            
-            # Calculate holding period in days
-            entry = datetime.strptime(pos.entry_date, '%Y-%m-%d')
-            exit_dt = datetime.strptime(pos.exit_date, '%Y-%m-%d')
-            holding_days = (exit_dt - entry).days
-            
-            pos_dict['profit_eur'] = round(profit, 2)
-            pos_dict['profit_percent'] = round(profit_pct, 2)
-            pos_dict['holding_period_days'] = holding_days
-            
-            result.append(pos_dict)
+            pos_dict['profit_eur'] = round(pos.profit_eur, 2) if pos.profit_eur is not None else None
+            pos_dict['profit_percent'] = round(pos.profit_percent, 2) if pos.profit_percent is not None else None
+            pos_dict['holding_period_days'] = pos.holding_period_days
+            items.append(pos_dict)
         
-        return result
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            last_values = {
+                'exit_date': last.exit_date,
+                'entry_date': last.entry_date,
+                'ticker': last.ticker,
+                'profit': last.profit_eur,
+                'profit_percent': last.profit_percent,
+                'holding_days': last.holding_period_days,
+            }
+            next_cursor = self._encode_cursor(last_values[sort], last.id)
+        
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
+    
+    def check_realized_pnl(self, db: Session, repair: bool = False) -> List[Dict]:
+        """
+        Compare the stored P&L of closed positions with their entry/exit values.
+        
+        Args:
+            db: Database session
+            repair: Overwrite mismatching rows with the recomputed values
+        
+        Returns:
+            List[Dict]: One entry per mismatching position with stored and expected values
+        """
+        mismatches = []
+        for pos in db.query(Position).filter(Position.status == 'CLOSED').yield_per(1000):
+            expected = realized_pnl(pos)
+            stored = (pos.profit_eur, pos.profit_percent, pos.holding_period_days)
+            if all(
+                value is not None and abs(value - target) <= PNL_TOLERANCE
+                for value, target in zip(stored, expected)
+            ):
+                continue
+            mismatches.append({
+                "id": pos.id,
+                "ticker": pos.ticker,
+                "stored": dict(zip(("profit_eur", "profit_percent", "holding_period_days"), stored)),
+                "expected": dict(zip(("profit_eur", "profit_percent", "holding_period_days"), expected)),
+            })
+            if repair:
+                pos.profit_eur, pos.profit_percent, pos.holding_period_days = expected
+        
+        if repair and mismatches:
+            db.commit()
+            # Per-ticker aggregates were built from the wrong values
+            self.portfolio_service.rebuild(db)
+            logger.info(f"Repaired realized P&L for {len(mismatches)} positions")
+        return mismatches
+    
+    @staticmethod
+    def _encode_cursor(value, position_id: int) -> str:
+        """Opaque page cursor for the last row of a page."""
+        if isinstance(value, date):
+            value = value.isoformat()
+        payload = json.dumps([value, position_id]).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+    
+    @staticmethod
+    def _decode_cursor(cursor: str, sort: str):
+        """Inverse of _encode_cursor; dates come back as date objects."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, position_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if value is not None and sort in ('exit_date', 'entry_date'):
+                value = datetime.strptime(value, '%Y-%m-%d').date()
+            return value, int(position_id)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def _parse_date(value: str, label: str) -> date:
+        """Parse a YYYY-MM-DD date from a request."""
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise ValueError(f"{label} must be in YYYY-MM-DD format")
     
     def get_position(self, db: Session, position_id: int) -> Optional[Position]:
         """Get a single position by ID."""
         return db.query(Position).filter(Position.id == position_id).first()
     
+    def delete_position(self, db: Session, position: Position) -> None:
+        """Delete a closed position and its trades."""
+        if position.status != 'CLOSED':
+            raise ValueError("Can only delete closed positions")
+        
+        self.portfolio_service.record_delete(db, position)
+        db.delete(position)
+        db.commit()
+        logger.info(f"Deleted closed position {position.id} for {position.ticker}")
+    
     def _get_current_price(self, ticker: str, currency: str) -> Optional[float]:
-        """Get current price for a ticker from yfinance."""
-        try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-            
-            # Try to get current price
-            price = info.get('currentPrice') or info.get('regularMarketPrice')
-            
-            if price and price > 0:
-                return float(price)
-            
-            # Fallback: try getting latest price from history
-            hist = stock.history(period='1d')
-            if not hist.empty and 'Close' in hist.columns:
-                return float(hist['Close'].iloc[-1])
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error fetching current price for {ticker}: {e}")
-            return None
+        """Get current price for a ticker from the quote engine."""
+        return self.quote_service.get_quote(ticker)
     
-    def get_chart_data(self, db: Session, position_id: int) -> Dict:
+    def get_chart_data(
+        self,
+        db: Session,
+        position_id: int,
+        max_points: Optional[int] = None,
+        format: str = "points"
+    ) -> Dict:
         """Get chart data for both open and closed positions.
         
+        Args:
+            db: Database session
+            position_id: Position ID
+            max_points: Downsample the price line to at most this many points
+                (LTTB), always keeping the entry and exit bars
+            format: "points" for prices as [{"date", "close"}, ...] or
+                "columnar" for parallel "dates" and "closes" arrays in place
+                of "prices"
+        
         Returns:
             For closed positions:
             {
@@ -232,6 +436,9 @@ class PositionService:
                 "error": None
             }
         """
+        if format not in CHART_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(CHART_FORMATS)}")
+        
         # Get position from database
         position = db.query(Position).filter(Position.id == position_id).first()
         
@@ -239,8 +446,8 @@ class PositionService:
             return {"error": f"Position {position_id} not found"}
         
         # Calculate date range
-        entry_date = datetime.strptime(position.entry_date, '%Y-%m-%d')
-        today = datetime.now()
+        entry_date = position.entry_date
+        today = datetime.now().date()
         
         # Always start 90 days before entry
         start_date = (entry_date - timedelta(days=90)).strftime('%Y-%m-%d')
@@ -260,28 +467,28 @@ class PositionService:
             
             # Get price history
             try:
-                prices = self.price_history_service.get_price_history(
+                series = self.price_history_service.get_price_series(
                     db=db,
                     ticker=position.ticker,
                     start_date=start_date,
                     end_date=end_date
                 )
                 
-                if not prices:
+                if not series["dates"]:
                     return {
                         "error": f"No price data available for {position.ticker}"
                     }
                 
                 return {
                     "ticker": position.ticker,
-                    "entry_date": position.entry_date,
+                    "entry_date": position.entry_date.isoformat(),
                     "current_date": current_date,
                     "entry_price": round(position.entry_price_per_share, 2),
                     "current_price": round(current_price, 2),
                     "entry_currency": position.entry_currency,
                     "start_date": start_date,
                     "end_date": end_date,
-                    "prices": prices,
+                    **self._chart_prices(series, max_points, format, (position.entry_date.isoformat(),)),
                     "is_open": True,
                     "error": None
                 }
@@ -298,7 +505,7 @@ class PositionService:
             exit_price = position.exit_value_eur / shares
             
             # Calculate date range for closed position
-            exit_date = datetime.strptime(position.exit_date, '%Y-%m-%d')
+            exit_date = position.exit_date
             days_since_exit = (today - exit_date).days
             
             if days_since_exit < 90:
@@ -310,28 +517,31 @@ class PositionService:
             
             # Get price history
             try:
-                prices = self.price_history_service.get_price_history(
+                series = self.price_history_service.get_price_series(
                     db=db,
                     ticker=position.ticker,
                     start_date=start_date,
                     end_date=end_date
                 )
                 
-                if not prices:
+                if not series["dates"]:
                     return {
                         "error": f"No price data available for {position.ticker}"
                     }
                 
                 return {
                     "ticker": position.ticker,
-                    "entry_date": position.entry_date,
-                    "exit_date": position.exit_date,
+                    "entry_date": position.entry_date.isoformat(),
+                    "exit_date": position.exit_date.isoformat(),
                     "entry_price": round(position.entry_price_per_share, 2),
                     "exit_price": round(exit_price, 2),
                     "entry_currency": position.entry_currency,
                     "start_date": start_date,
                     "end_date": end_date,
-                    "prices": prices,
+                    **self._chart_prices(
+                        series, max_points, format,
+                        (position.entry_date.isoformat(), position.exit_date.isoformat())
+                    ),
                     "is_open": False,
                     "error": None
                 }
@@ -341,3 +551,12 @@ class PositionService:
                 return {
                     "error": "Unable to load chart data. Please try again later."
                 }
+    
+    @staticmethod
+    def _chart_prices(series: Dict, max_points: Optional[int], format: str, keep: Tuple[str, ...]) -> Dict:
+        """Price line fields of a chart payload, downsampled and in the requested format."""
+        if max_points is not None:
+            series = downsample_series(series, max(max_points, MIN_CHART_POINTS), keep)
+        if format == 'columnar':
+            return {"dates": series["dates"], "closes": series["closes"]}
+        return {"prices": series_to_points(series)}
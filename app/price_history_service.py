@@ -1,18 +1,150 @@
 """Price history service for managing cached price data."""
 
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import yfinance as yf
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 import logging
 
-from app.database import PriceHistory
+from app.database import NonTradingDay, PriceCoverage
+from app.price_store import BAR_FIELDS, create_price_store
+from app.provider_gateway import provider_gateway
+from app.trading_calendar import calendar_for_ticker
 
 logger = logging.getLogger(__name__)
 
 
+def empty_price_columns() -> Dict[str, any]:
+    """Columnar price data with no rows."""
+    return {"date": [], "close": np.empty(0, dtype=float)}
+
+
+def parse_date(value) -> date:
+    """Accept a date, datetime or YYYY-MM-DD string and return a date."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def history_to_columns(hist) -> Dict[str, any]:
+    """Convert a yfinance history DataFrame into price columns.
+    
+    Works on whole columns at once; NaN closes fail the > 0 test too.
+    Open, high, low, volume, dividends and splits are included as extra
+    float columns when the frame has them.
+    """
+    if hist.empty or 'Close' not in hist.columns:
+        return empty_price_columns()
+    closes = hist['Close'].to_numpy(dtype=float)
+    valid = closes > 0
+    columns = {
+        "date": hist.index[valid].date.tolist(),
+        "close": closes[valid]
+    }
+    for key, (source, _) in BAR_FIELDS.items():
+        if source in hist.columns:
+            columns[key] = hist[source].to_numpy(dtype=float)[valid]
+    return columns
+
+
+def series_to_points(series: Dict[str, any]) -> List[Dict[str, any]]:
+    """Convert a {"dates", "closes"} series into [{"date", "close"}, ...] points."""
+    return [
+        {"date": day, "close": close}
+        for day, close in zip(series["dates"], series["closes"])
+    ]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Pick up to max_points indices with Largest-Triangle-Three-Buckets.
+    
+    The first and last points are always kept. The points in between are
+    split into max_points - 2 buckets, and from each bucket the point
+    forming the largest triangle with the previously kept point and the
+    average of the next bucket is kept, which preserves peaks and troughs
+    that plain striding would drop.
+    
+    Args:
+        x: Increasing x values (e.g. day numbers)
+        y: Values to plot
+        max_points: Number of points to keep, at least 3
+    
+    Returns:
+        np.ndarray: Sorted indices into x and y
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.intp)
+    kept = np.empty(max_points, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        first, last = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[last:edges[bucket + 2]].mean()
+            next_y = y[last:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs(
+            (x[previous] - next_x) * (y[first:last] - y[previous])
+            - (x[previous] - x[first:last]) * (next_y - y[previous])
+        )
+        previous = first + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def downsample_series(series: Dict[str, any], max_points: int, keep: Tuple[str, ...] = ()) -> Dict[str, any]:
+    """
+    Reduce a {"dates", "closes"} series to at most max_points with LTTB.
+    
+    Args:
+        series: Series as returned by get_price_series
+        max_points: Maximum number of points in the result
+        keep: Dates (YYYY-MM-DD) whose bar must survive, e.g. entry and
+            exit; a date without a bar keeps the last bar before it
+    
+    Returns:
+        dict: Series of the same shape with the selected points
+    """
+    dates = series["dates"]
+    if len(dates) <= max_points:
+        return series
+    
+    days = np.array(dates, dtype='datetime64[D]')
+    anchors = np.searchsorted(days, np.array(keep, dtype='datetime64[D]'), side='right') - 1
+    anchors = np.unique(anchors[anchors >= 0])
+    
+    closes = np.asarray(series["closes"], dtype=float)
+    picked = lttb_indices(days.astype(np.int64).astype(float), closes, max(max_points - len(anchors), 3))
+    picked = np.union1d(picked, anchors)
+    return {
+        "dates": [dates[i] for i in picked.tolist()],
+        "closes": closes[picked].tolist(),
+    }
+
+
 class PriceHistoryService:
-    """Service for managing price history data with caching."""
+    """Service for managing price history data with caching.
+    
+    Coverage ranges and confirmed non-trading days live in the database;
+    the bars themselves go to a price store (app.price_store), by default
+    the one selected by FINSITE_PRICE_STORE.
+    """
+    
+    def __init__(self, store=None):
+        self.store = store or create_price_store()
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Register a function called with the ticker after bars are stored."""
+        self._listeners.append(listener)
     
     def get_price_history(
         self, 
@@ -21,6 +153,25 @@ class PriceHistoryService:
         start_date: str, 
         end_date: str
     ) -> List[Dict[str, any]]:
+        """
+        Get price history for ticker in date range as a list of points.
+        
+        Prefer get_price_series, which keeps the data columnar; this wrapper
+        exists for callers that need one dict per day.
+        
+        Returns:
+            List[dict]: [{"date": "2025-01-15", "close": 150.50}, ...]
+        """
+        series = self.get_price_series(db, ticker, start_date, end_date)
+        return series_to_points(series)
+    
+    def get_price_series(
+        self, 
+        db: Session, 
+        ticker: str, 
+        start_date: str, 
+        end_date: str
+    ) -> Dict[str, any]:
         """
         Get price history for ticker in date range.
         Checks cache first, fetches missing data from yfinance.
@@ -32,73 +183,292 @@ class PriceHistoryService:
             end_date: End date in YYYY-MM-DD format
         
         Returns:
-            List[dict]: [{"date": "2025-01-15", "close": 150.50}, ...]
+            dict: Parallel columns {"dates": ["2025-01-15", ...], "closes": [150.50, ...]}
         """
         ticker = ticker.upper().strip()
+        start = parse_date(start_date)
+        end = parse_date(end_date)
+        
+        # Cached closes plus the days stored without OHLCV data
+        cached_dict, incomplete = self.store.read(db, ticker, start, end)
+        
+        # Today is never required because its bar is not final until the market closes
+        last_required = min(end, datetime.now().date() - timedelta(days=1))
+        
+        coverage = db.query(PriceCoverage).filter(PriceCoverage.ticker == ticker).first()
+        
+        if start <= last_required and not (
+            coverage
+            and coverage.earliest_date <= start
+            and coverage.latest_date >= last_required
+        ):
+            self._fill_gaps(db, ticker, start, last_required, cached_dict, coverage, incomplete)
+        
+        # Build result from cached dict (now includes new data)
+        dates = sorted(day for day in cached_dict if start <= day <= end)
+        closes = np.fromiter((cached_dict[day] for day in dates), dtype=float, count=len(dates))
+        
+        return {
+            "dates": [day.isoformat() for day in dates],
+            "closes": np.round(closes, 2).tolist()
+        }
+    
+    def get_price_matrix(
+        self,
+        db: Session,
+        tickers: List[str],
+        start: date,
+        end: date
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get cached closes for many tickers aligned on a shared date axis.
+        
+        Reads the price store only (no downloads); call get_price_series
+        first for tickers that may have gaps.
+        
+        Args:
+            db: Database session
+            tickers: Ticker symbols, one matrix column each
+            start: First date
+            end: Last date
+        
+        Returns:
+            tuple: (dates, closes) where dates is a sorted datetime64[D] array
+                of every day with at least one bar and closes is a
+                len(dates) x len(tickers) float array with NaN where a ticker
+                has no bar
+        """
+        return self.store.read_matrix(db, tickers, start, end)
+    
+    def _fill_gaps(
+        self,
+        db: Session,
+        ticker: str,
+        start: date,
+        end: date,
+        cached_dict: Dict[date, float],
+        coverage: Optional[PriceCoverage],
+        incomplete: Optional[set] = None
+    ) -> None:
+        """
+        Fetch only the missing sub-ranges of a window and extend coverage.
+        
+        Expected days come from the exchange calendar, so weekends and market
+        holidays never count as missing. Days inside the ticker's coverage
+        range or confirmed as non-trading are skipped. The remaining missing
+        days are merged into contiguous intervals and each one is fetched
+        on its own, so extending a chart by one day downloads one day.
+        Cached close-only rows outside the coverage range (stored before
+        OHLCV was kept) count as missing so their bars get filled in.
+        
+        Updates cached_dict in place with any newly fetched prices.
+        """
+        calendar = calendar_for_ticker(ticker)
+        expected = calendar.trading_days(start, end)
+        
+        known_gaps = set()
+        if expected:
+            known_gaps = {
+                row.date for row in db.query(NonTradingDay.date).filter(
+                    NonTradingDay.ticker == ticker,
+                    NonTradingDay.date >= expected[0],
+                    NonTradingDay.date <= expected[-1]
+                )
+            }
         
-        # Convert string dates to datetime for comparison
-        start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-        
-        # Query database for cached data
-        cached_prices = db.query(PriceHistory).filter(
-            PriceHistory.ticker == ticker,
-            PriceHistory.date >= start_date,
-            PriceHistory.date <= end_date
-        ).order_by(PriceHistory.date).all()
-        
-        # Convert to dict for easier lookup
-        cached_dict = {price.date: price.close_price for price in cached_prices}
-        
-        # Generate all trading days in range (excluding weekends for now)
-        all_dates = []
-        current = start_dt
-        while current <= end_dt:
-            # Skip weekends (Saturday=5, Sunday=6)
-            if current.weekday() < 5:
-                all_dates.append(current.strftime('%Y-%m-%d'))
-            current += timedelta(days=1)
-        
-        # Check if we have all the data we need
-        missing_dates = [date for date in all_dates if date not in cached_dict]
-        
-        if missing_dates:
-            logger.info(f"Missing {len(missing_dates)} price records for {ticker}, fetching from yfinance")
+        incomplete = incomplete or set()
+        
+        def is_missing(day: date) -> bool:
+            if day in known_gaps or (day in cached_dict and day not in incomplete):
+                return False
+            return not (coverage and coverage.earliest_date <= day <= coverage.latest_date)
+        
+        intervals = self._group_intervals(expected, is_missing)
+        unresolved = 0
+        
+        for gap_dates in intervals:
+            gap_start, gap_end = gap_dates[0], gap_dates[-1]
+            logger.info(
+                f"Missing {len(gap_dates)} price bars for {ticker} "
+                f"({gap_start} to {gap_end}), fetching from yfinance"
+            )
             
             try:
-                # Fetch missing data from yfinance
-                new_prices = self.fetch_from_yfinance(ticker, start_date, end_date)
-                
-                if new_prices:
-                    # Store new data in database
-                    self.store_prices(db, ticker, new_prices)
-                    
-                    # Update our cached dict
-                    for price in new_prices:
-                        cached_dict[price['date']] = price['close']
-                    
-                    logger.info(f"Stored {len(new_prices)} new price records for {ticker}")
+                new_prices = self.fetch_from_yfinance(
+                    ticker, gap_start.isoformat(), gap_end.isoformat(), raise_errors=True
+                )
             except Exception as e:
                 logger.error(f"Error fetching prices for {ticker}: {e}")
                 # Continue with whatever cached data we have
+                unresolved += len(gap_dates)
+                continue
+            
+            if not len(new_prices['date']):
+                # No bars at all proves nothing: the provider may have failed
+                # quietly, so nothing is recorded as a non-trading day
+                unresolved += len(gap_dates)
+                continue
+            
+            self.store_prices(db, ticker, new_prices)
+            # Closes already cached are kept, as in the database
+            for day, close in zip(map(parse_date, new_prices['date']), new_prices['close'].tolist()):
+                cached_dict.setdefault(day, close)
+            logger.info(f"Stored {len(new_prices['date'])} new price records for {ticker}")
+            
+            # A day the provider had no bar for is a confirmed gap once a later
+            # bar is known; trailing days may simply not be published yet
+            latest_bar = max(cached_dict) if cached_dict else None
+            gaps = [
+                day for day in gap_dates
+                if day not in cached_dict and latest_bar and day < latest_bar
+            ]
+            self._record_non_trading_days(db, ticker, gaps)
+            unresolved += sum(1 for day in gap_dates if day not in cached_dict) - len(gaps)
         
-        # Build result from cached dict (now includes new data)
-        result = []
-        for date in sorted(cached_dict.keys()):
-            if start_date <= date <= end_date:
-                result.append({
-                    "date": date,
-                    "close": round(cached_dict[date], 2)
-                })
+        if unresolved == 0:
+            self._extend_coverage(db, ticker, coverage, start, end, calendar)
+    
+    def store_fetched_range(
+        self,
+        db: Session,
+        ticker: str,
+        start_date: str,
+        end_date: str,
+        prices: Dict[str, any]
+    ) -> int:
+        """
+        Store a provider response that covers a whole date range.
+        
+        Used by bulk loaders that download ranges themselves: stores the bars,
+        confirms expected days the provider skipped as non-trading and extends
+        the ticker's coverage, exactly as a chart request would have.
+        
+        Args:
+            db: Database session
+            ticker: Ticker symbol
+            start_date: First requested date in YYYY-MM-DD format
+            end_date: Last requested date in YYYY-MM-DD format
+            prices: Columns as returned by fetch_from_yfinance
         
-        return result
+        Returns:
+            int: Number of bars in the response
+        """
+        ticker = ticker.upper().strip()
+        start = parse_date(start_date)
+        end = min(parse_date(end_date), datetime.now().date() - timedelta(days=1))
+        
+        returned = {parse_date(day) for day in prices['date']}
+        if returned:
+            self.store_prices(db, ticker, prices)
+        
+        calendar = calendar_for_ticker(ticker)
+        missing = [day for day in calendar.trading_days(start, end) if day not in returned]
+        latest_bar = max(returned) if returned else None
+        
+        if missing:
+            known_gaps = {
+                row.date for row in db.query(NonTradingDay.date).filter(
+                    NonTradingDay.ticker == ticker,
+                    NonTradingDay.date >= missing[0],
+                    NonTradingDay.date <= missing[-1]
+                )
+            }
+            self._record_non_trading_days(db, ticker, [
+                day for day in missing
+                if latest_bar and day < latest_bar and day not in known_gaps
+            ])
+        
+        if start <= end and not (missing and (latest_bar is None or missing[-1] > latest_bar)):
+            coverage = db.query(PriceCoverage).filter(PriceCoverage.ticker == ticker).first()
+            self._extend_coverage(db, ticker, coverage, start, end, calendar)
+        
+        return len(returned)
+    
+    @staticmethod
+    def _group_intervals(expected: List[date], is_missing) -> List[List[date]]:
+        """Merge missing days into runs of consecutive expected trading days."""
+        intervals = []
+        current = []
+        for day in expected:
+            if is_missing(day):
+                current.append(day)
+            elif current:
+                intervals.append(current)
+                current = []
+        if current:
+            intervals.append(current)
+        return intervals
+    
+    def _record_non_trading_days(self, db: Session, ticker: str, dates: List[date]) -> None:
+        """Remember expected dates the provider has no bar for."""
+        if not dates:
+            return
+        
+        for day in dates:
+            db.add(NonTradingDay(ticker=ticker, date=day))
+        
+        try:
+            db.commit()
+            logger.info(f"Recorded {len(dates)} non-trading days for {ticker}")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not record non-trading days for {ticker}: {e}")
+    
+    def _extend_coverage(
+        self,
+        db: Session,
+        ticker: str,
+        coverage: Optional[PriceCoverage],
+        start: date,
+        end: date,
+        calendar
+    ) -> None:
+        """
+        Record that every expected trading day in [start, end] is resolved.
+        
+        Ranges that overlap or touch (no trading day in between) are merged.
+        A disjoint range replaces the stored one only if it is more recent,
+        since recent data is what open position charts keep asking for.
+        """
+        new_start, new_end = start, end
+        
+        if coverage is None:
+            db.add(PriceCoverage(ticker=ticker, earliest_date=new_start, latest_date=new_end))
+        else:
+            old_start, old_end = coverage.earliest_date, coverage.latest_date
+            
+            if start > old_end:
+                touching = not calendar.trading_days(old_end + timedelta(days=1), start - timedelta(days=1))
+            elif end < old_start:
+                touching = not calendar.trading_days(end + timedelta(days=1), old_start - timedelta(days=1))
+            else:
+                touching = True
+            
+            if touching:
+                new_start = min(new_start, coverage.earliest_date)
+                new_end = max(new_end, coverage.latest_date)
+            elif new_end < coverage.latest_date:
+                return
+            
+            if (new_start, new_end) == (coverage.earliest_date, coverage.latest_date):
+                return
+            coverage.earliest_date = new_start
+            coverage.latest_date = new_end
+            coverage.updated_at = datetime.utcnow()
+        
+        try:
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not update price coverage for {ticker}: {e}")
     
     def fetch_from_yfinance(
         self, 
         ticker: str, 
         start_date: str, 
-        end_date: str
-    ) -> List[Dict[str, any]]:
+        end_date: str,
+        raise_errors: bool = False
+    ) -> Dict[str, any]:
         """
         Fetch price data from yfinance API.
         
@@ -106,76 +476,126 @@ class PriceHistoryService:
             ticker: Ticker symbol
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
+            raise_errors: Re-raise provider errors instead of returning empty
+                columns, so callers can tell "no data" from "failed"
         
         Returns:
-            List[dict]: [{"date": "2025-01-15", "close": 150.50}, ...]
+            dict: Columns {"date": [date(2025, 1, 15), ...], "close": ndarray([150.50, ...]),
+                "open": ndarray, "high": ..., "low": ..., "volume": ..., "dividend": ..., "split": ...}
         """
         try:
-            stock = yf.Ticker(ticker)
-            
             # Add one day to end_date because yfinance is exclusive on end date
             end_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
             end_date_inclusive = end_dt.strftime('%Y-%m-%d')
             
             # Fetch historical data
-            hist = stock.history(start=start_date, end=end_date_inclusive)
+            hist = provider_gateway.history(ticker, start=start_date, end=end_date_inclusive)
             
-            if hist.empty:
+            if hist.empty or 'Close' not in hist.columns:
                 logger.warning(f"No price data returned for {ticker}")
-                return []
+                return empty_price_columns()
             
-            # Convert to list of dicts
-            prices = []
-            for date, row in hist.iterrows():
-                # Only get Close price
-                if 'Close' in row and row['Close'] > 0:
-                    prices.append({
-                        "date": date.strftime('%Y-%m-%d'),
-                        "close": float(row['Close'])
-                    })
+            prices = history_to_columns(hist)
             
-            logger.info(f"Fetched {len(prices)} price records for {ticker} from yfinance")
+            logger.info(f"Fetched {len(prices['date'])} price records for {ticker} from yfinance")
             return prices
             
         except Exception as e:
             logger.error(f"Error fetching from yfinance for {ticker}: {e}")
-            return []
+            if raise_errors:
+                raise
+            return empty_price_columns()
     
     def store_prices(
         self, 
         db: Session, 
         ticker: str, 
-        prices: List[Dict[str, any]]
+        prices,
+        update: bool = False
     ) -> None:
         """
-        Store price data in database.
-        Uses INSERT OR IGNORE to handle duplicates gracefully.
+        Store price data in the price store.
+        Days already stored are skipped (the SQL store relies on the
+        uix_ticker_date constraint, INSERT ... ON CONFLICT DO NOTHING), or
+        overwritten when update is True. Rows cached without OHLCV data
+        get their open/high/low/volume/dividend/split filled in either way;
+        their close is only overwritten when update is True.
         
         Args:
             db: Database session
             ticker: Ticker symbol
-            prices: List of price dicts [{"date": "2025-01-15", "close": 150.50}, ...]
+            prices: Either a list of price dicts
+                [{"date": "2025-01-15", "close": 150.50, "open": 149.0, ...}, ...],
+                columns {"date": [...], "close": [...], "open": [...], ...},
+                or a DataFrame with "date"/"close" columns (or a date index).
+                Dates may be date objects or YYYY-MM-DD strings. The bar
+                fields in BAR_FIELDS are optional.
+            update: Overwrite the close price of rows that already exist
         """
         ticker = ticker.upper().strip()
+        dates, closes, bars = self._price_columns(prices)
         
-        for price in prices:
-            # Check if already exists to avoid UniqueConstraint error
-            existing = db.query(PriceHistory).filter(
-                PriceHistory.ticker == ticker,
-                PriceHistory.date == price['date']
-            ).first()
-            
-            if not existing:
-                price_record = PriceHistory(
-                    ticker=ticker,
-                    date=price['date'],
-                    close_price=price['close']
-                )
-                db.add(price_record)
+        if not dates:
+            return
         
         try:
-            db.commit()
+            self.store.write(db, ticker, dates, closes, bars, update=update)
         except Exception as e:
-            db.rollback()
             logger.error(f"Error storing prices for {ticker}: {e}")
             raise
+
+        for listener in self._listeners:
+            try:
+                listener(ticker)
+            except Exception as e:
+                logger.error(f"Price store listener failed for {ticker}: {e}")
+    
+    @staticmethod
+    def _price_columns(prices) -> Tuple[List[date], List[float], Dict[str, List]]:
+        """Normalize rows, columns or a DataFrame into (dates, closes, bar fields) lists."""
+        bars = {}
+        if hasattr(prices, 'columns'):
+            frame = prices
+            if 'date' in frame.columns:
+                dates = frame['date'].tolist()
+            elif hasattr(frame.index, 'date'):
+                dates = frame.index.date.tolist()
+            else:
+                dates = list(frame.index)
+            closes = frame['close'] if 'close' in frame.columns else frame['Close']
+            closes = closes.to_numpy(dtype=float).tolist()
+            for key, (source, _) in BAR_FIELDS.items():
+                name = key if key in frame.columns else source
+                if name in frame.columns:
+                    bars[key] = frame[name].to_numpy(dtype=float)
+        elif isinstance(prices, dict):
+            dates = list(prices['date'])
+            closes = np.asarray(prices['close'], dtype=float).tolist()
+            bars = {
+                key: np.asarray(prices[key], dtype=float)
+                for key in BAR_FIELDS if prices.get(key) is not None
+            }
+        else:
+            dates = [price['date'] for price in prices]
+            closes = [float(price['close']) for price in prices]
+            if prices:
+                bars = {
+                    key: np.array([price.get(key) for price in prices], dtype=float)
+                    for key in BAR_FIELDS if key in prices[0]
+                }
+        
+        return [parse_date(day) for day in dates], closes, {
+            key: _bar_values(key, values) for key, values in bars.items()
+        }
+
+
+def _bar_values(key: str, values: np.ndarray) -> List:
+    """Database values for one bar field: NULL for NaN, and for zero dividends/splits."""
+    missing = np.isnan(values)
+    if key in ("dividend", "split"):
+        missing |= values == 0
+    if key == "volume":
+        converted = np.where(missing, 0, values).astype(np.int64).tolist()
+    else:
+        converted = values.tolist()
+    return [None if gap else value for value, gap in zip(converted, missing.tolist())]
@@ -0,0 +1,443 @@
+"""Storage backends for cached daily price bars.
+
+PriceHistoryService keeps its bookkeeping (coverage ranges, confirmed
+non-trading days) in the database and delegates the bars themselves to a
+price store:
+
+- SqlPriceStore keeps one price_history row per ticker and day.
+- ColumnarPriceStore keeps one file per ticker holding a sorted array of
+  fixed-size records, memory-mapped for reads. New bars are appended to the
+  end of the file, and range reads are two binary searches plus a slice of
+  the mapping, so no per-row objects are built.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+from sqlalchemy import cast, select, String
+from sqlalchemy.orm import Session
+import numpy as np
+import tempfile
+import threading
+import logging
+import time
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app import config
+from app.database import PriceHistory, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Rows per bulk INSERT batch in SqlPriceStore.write
+STORE_BATCH_SIZE = 1000
+
+# Optional bar fields besides close: column key -> (yfinance column, PriceHistory column)
+BAR_FIELDS = {
+    "open": ("Open", "open_price"),
+    "high": ("High", "high_price"),
+    "low": ("Low", "low_price"),
+    "volume": ("Volume", "volume"),
+    "dividend": ("Dividends", "dividend"),
+    "split": ("Stock Splits", "split_ratio"),
+}
+
+# One columnar record per day: days since 1970-01-01, the close, then the bar
+# fields. Missing bar values are NaN (the SQL backend stores NULL).
+RECORD_DTYPE = np.dtype([("date", "<i4"), ("close", "<f8")] + [(key, "<f8") for key in BAR_FIELDS])
+
+COLUMNAR_SUFFIX = ".bars"
+
+# Ticker files kept memory-mapped per columnar store, least recently used
+# mappings are closed first
+MAX_MAPPED_FILES = 256
+
+_EPOCH = date(1970, 1, 1)
+
+
+def empty_matrix(tickers: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """A (dates, closes) price matrix with no days."""
+    return np.empty(0, dtype='datetime64[D]'), np.empty((0, len(tickers)))
+
+
+class SqlPriceStore:
+    """Price bars as rows of the price_history table."""
+
+    def read(self, db: Session, ticker: str, start: date, end: date) -> Tuple[Dict[date, float], Set[date]]:
+        """
+        Get the cached closes of one ticker.
+
+        Returns:
+            tuple: ({day: close}, days stored without OHLCV data)
+        """
+        closes = {}
+        incomplete = set()
+        for day, close, open_price in db.query(
+            PriceHistory.date, PriceHistory.close_price, PriceHistory.open_price
+        ).filter(
+            PriceHistory.ticker == ticker,
+            PriceHistory.date >= start,
+            PriceHistory.date <= end
+        ):
+            closes[day] = close
+            if open_price is None:
+                incomplete.add(day)
+        return closes, incomplete
+
+    def read_matrix(
+        self,
+        db: Session,
+        tickers: List[str],
+        start: date,
+        end: date
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get closes for many tickers on a shared date axis (see PriceHistoryService.get_price_matrix)."""
+        columns = {ticker: i for i, ticker in enumerate(tickers)}
+        # Core statement on the session's connection: no ORM row processing,
+        # and dates come back as YYYY-MM-DD text that maps through a dict
+        rows = db.connection().execute(
+            select(PriceHistory.ticker, cast(PriceHistory.date, String), PriceHistory.close_price).where(
+                PriceHistory.ticker.in_(list(columns)),
+                PriceHistory.date >= start,
+                PriceHistory.date <= end
+            )
+        ).fetchall()
+        if not rows:
+            return empty_matrix(tickers)
+
+        row_tickers, row_dates, row_closes = zip(*rows)
+        day_slots: Dict[str, int] = {}
+        day_index = np.fromiter(
+            (day_slots.setdefault(day, len(day_slots)) for day in row_dates), dtype=np.intp, count=len(rows)
+        )
+        ticker_index = np.fromiter((columns[t] for t in row_tickers), dtype=np.intp, count=len(rows))
+
+        # Sort the distinct days and renumber the rows to match
+        days = np.array(list(day_slots), dtype='datetime64[D]')
+        order = np.argsort(days)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+
+        closes = np.full((len(days), len(tickers)), np.nan)
+        closes[rank[day_index], ticker_index] = row_closes
+        return days[order], closes
+
+    def write(
+        self,
+        db: Session,
+        ticker: str,
+        dates: List[date],
+        closes: List[float],
+        bars: Dict[str, List],
+        update: bool = False
+    ) -> None:
+        """
+        Upsert bars in batches and commit.
+
+        Existing rows keep their close unless update is True; rows cached
+        without OHLCV data get the bar fields filled in either way.
+
+        Args:
+            db: Database session
+            ticker: Normalized ticker symbol
+            dates: Bar dates
+            closes: Close per date
+            bars: Optional BAR_FIELDS values per date, None where missing
+            update: Overwrite existing rows
+        """
+        stmt = dialect_insert(db, PriceHistory)
+        bar_columns = [BAR_FIELDS[key][1] for key in bars]
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['ticker', 'date'],
+                set_={column: stmt.excluded[column] for column in ['close_price'] + bar_columns}
+            )
+        elif bar_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['ticker', 'date'],
+                set_={column: stmt.excluded[column] for column in bar_columns},
+                where=PriceHistory.__table__.c.open_price.is_(None)
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=['ticker', 'date'])
+
+        try:
+            for offset in range(0, len(dates), STORE_BATCH_SIZE):
+                batch = slice(offset, offset + STORE_BATCH_SIZE)
+                rows = [
+                    {"ticker": ticker, "date": day, "close_price": close}
+                    for day, close in zip(dates[batch], closes[batch])
+                ]
+                for key, values in bars.items():
+                    column = BAR_FIELDS[key][1]
+                    for row, value in zip(rows, values[batch]):
+                        row[column] = value
+                db.execute(stmt, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+
+class ColumnarPriceStore:
+    """Price bars as one memory-mapped record file per ticker.
+
+    Each file is a sorted array of RECORD_DTYPE records. Bars that are all
+    newer than the last stored day are appended in place; anything else is
+    merged into a copy that atomically replaces the file. Readers map the
+    file once and re-map it when its size or inode changes, ignoring a
+    trailing partial record left by an interrupted append.
+
+    Writes to a ticker's file hold a lock file next to it (`<file>.lock`),
+    so the server, backfill_prices.py and copy_price_store.py can write the
+    same directory concurrently.
+    """
+
+    def __init__(self, root: str, max_mapped: int = MAX_MAPPED_FILES):
+        self.root = root
+        self.max_mapped = max_mapped
+        os.makedirs(root, exist_ok=True)
+        self._maps: "OrderedDict[str, Tuple[tuple, np.ndarray]]" = OrderedDict()
+        self._maps_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def path(self, ticker: str) -> str:
+        """File holding a ticker's bars (symbols like ^GSPC are percent-encoded)."""
+        return os.path.join(self.root, quote(ticker, safe='') + COLUMNAR_SUFFIX)
+
+    def records(self, ticker: str, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+        """
+        Get a ticker's records between two dates, inclusive.
+
+        Returns:
+            np.ndarray: Read-only RECORD_DTYPE view into the mapped file,
+                e.g. records(...)["close"]; empty when nothing is stored
+        """
+        records = self._mapped(ticker)
+        days = records["date"]
+        first = 0 if start is None else np.searchsorted(days, _day_number(start), side='left')
+        last = len(records) if end is None else np.searchsorted(days, _day_number(end), side='right')
+        return records[first:last]
+
+    def read(self, db: Session, ticker: str, start: date, end: date) -> Tuple[Dict[date, float], Set[date]]:
+        """
+        Get the cached closes of one ticker.
+
+        Returns:
+            tuple: ({day: close}, days stored without OHLCV data)
+        """
+        records = self.records(ticker, start, end)
+        days = (records["date"].astype('datetime64[D]')).tolist()
+        closes = dict(zip(days, records["close"].tolist()))
+        incomplete = {day for day, gap in zip(days, np.isnan(records["open"]).tolist()) if gap}
+        return closes, incomplete
+
+    def read_matrix(
+        self,
+        db: Session,
+        tickers: List[str],
+        start: date,
+        end: date
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get closes for many tickers on a shared date axis (see PriceHistoryService.get_price_matrix)."""
+        slices = [self.records(ticker, start, end) for ticker in tickers]
+        if not any(len(records) for records in slices):
+            return empty_matrix(tickers)
+
+        days = np.unique(np.concatenate([records["date"] for records in slices]))
+        closes = np.full((len(days), len(tickers)), np.nan)
+        for column, records in enumerate(slices):
+            if len(records):
+                closes[np.searchsorted(days, records["date"]), column] = records["close"]
+        return days.astype('datetime64[D]'), closes
+
+    def write(
+        self,
+        db: Session,
+        ticker: str,
+        dates: List[date],
+        closes: List[float],
+        bars: Dict[str, List],
+        update: bool = False
+    ) -> None:
+        """
+        Merge bars into the ticker's file, with the same rules as SqlPriceStore.write.
+
+        Args:
+            db: Database session (unused)
+            ticker: Normalized ticker symbol
+            dates: Bar dates
+            closes: Close per date
+            bars: Optional BAR_FIELDS values per date, None where missing
+            update: Overwrite existing records
+        """
+        new = np.zeros(len(dates), dtype=RECORD_DTYPE)
+        new["date"] = [_day_number(day) for day in dates]
+        new["close"] = closes
+        for key in BAR_FIELDS:
+            new[key] = np.array(bars[key], dtype=float) if key in bars else np.nan
+        # Sorted, and the last bar wins when a date repeats
+        order = np.argsort(new["date"], kind='stable')
+        new = new[order]
+        keep = np.append(new["date"][1:] != new["date"][:-1], True)
+        new = new[keep]
+
+        with self._lock, _file_lock(self.path(ticker) + '.lock'):
+            existing = self._mapped(ticker)
+            count = len(existing)
+            if not count or new["date"][0] > existing["date"][-1]:
+                existing = None
+                self._unmap(ticker)
+                self._append(ticker, new, count)
+            else:
+                existing = np.array(existing)
+                # A mapped file cannot be replaced on Windows
+                self._unmap(ticker)
+                self._replace(ticker, self._merge(existing, new, set(bars), update))
+
+    def _merge(self, existing: np.ndarray, new: np.ndarray, fields: Set[str], update: bool) -> np.ndarray:
+        """Combine stored and new records into one sorted array."""
+        position = np.searchsorted(existing["date"], new["date"])
+        found = position < len(existing)
+        found[found] = existing["date"][position[found]] == new["date"][found]
+
+        rows = position[found]
+        incoming = new[found]
+        if update:
+            existing["close"][rows] = incoming["close"]
+            replace = np.ones(len(rows), dtype=bool)
+        else:
+            replace = np.isnan(existing["open"][rows])
+        for key in fields:
+            existing[key][rows[replace]] = incoming[key][replace]
+
+        merged = np.concatenate([existing, new[~found]])
+        return merged[np.argsort(merged["date"], kind='stable')]
+
+    def _append(self, ticker: str, records: np.ndarray, count: int) -> None:
+        """Add records after the last whole stored record."""
+        with open(self.path(ticker), 'ab') as handle:
+            # Drop a partial record from an interrupted append first
+            handle.truncate(count * RECORD_DTYPE.itemsize)
+            handle.write(records.tobytes())
+
+    def _replace(self, ticker: str, records: np.ndarray) -> None:
+        """Write records to a temporary file and swap it in."""
+        path = self.path(ticker)
+        descriptor, temporary = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as handle:
+                handle.write(records.tobytes())
+            for attempt in range(5):
+                try:
+                    os.replace(temporary, path)
+                    break
+                except PermissionError:
+                    # Windows: another process still has the old file mapped
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.1 * (attempt + 1))
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def _unmap(self, ticker: str) -> None:
+        """Forget the cached mapping of a ticker's file before it is rewritten."""
+        with self._maps_lock:
+            self._maps.pop(ticker, None)
+
+    def _mapped(self, ticker: str) -> np.ndarray:
+        """Memory-map a ticker's file, reusing the mapping while the file is unchanged."""
+        path = self.path(ticker)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=RECORD_DTYPE)
+
+        key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self._maps_lock:
+            cached = self._maps.get(ticker)
+            if cached and cached[0] == key:
+                self._maps.move_to_end(ticker)
+                return cached[1]
+
+        count = stat.st_size // RECORD_DTYPE.itemsize
+        if count:
+            records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        else:
+            records = np.zeros(0, dtype=RECORD_DTYPE)
+        with self._maps_lock:
+            self._maps[ticker] = (key, records)
+            self._maps.move_to_end(ticker)
+            while len(self._maps) > self.max_mapped:
+                self._maps.popitem(last=False)
+        return records
+
+
+_columnar_stores: Dict[str, ColumnarPriceStore] = {}
+
+
+def create_price_store(kind: Optional[str] = None, path: Optional[str] = None):
+    """
+    Get the configured price store.
+
+    Columnar stores are shared per directory so every service in the
+    process uses the same mappings and write lock.
+
+    Args:
+        kind: "sql" or "columnar", defaults to config.PRICE_STORE
+        path: Directory of the columnar store, defaults to config.PRICE_STORE_PATH
+    """
+    kind = (kind or config.PRICE_STORE).lower()
+    if kind == "sql":
+        return SqlPriceStore()
+    if kind == "columnar":
+        root = os.path.abspath(path or config.PRICE_STORE_PATH or _default_columnar_path())
+        if root not in _columnar_stores:
+            logger.info(f"Using columnar price store at {root}")
+            _columnar_stores[root] = ColumnarPriceStore(root)
+        return _columnar_stores[root]
+    raise ValueError(f"Unknown price store: {kind}")
+
+
+def _default_columnar_path() -> str:
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base_dir, 'data', 'prices')
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock on a lock file, across processes."""
+    with open(path, 'a+b') as handle:
+        if fcntl:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 seconds; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _day_number(day: date) -> int:
+    """Days since 1970-01-01, the date encoding of columnar records."""
+    return (day - _EPOCH).days
@@ -0,0 +1,301 @@
+"""Single gateway for market data provider calls.
+
+Services call the gateway, never a provider (app/providers.py) directly.
+Every outbound request goes through ProviderGateway.call, which applies in
+order:
+
+- a circuit breaker: after `breaker_threshold` consecutive failed calls it
+  opens and rejects calls immediately with ProviderUnavailable for
+  `breaker_cooldown` seconds, then lets one trial call through (half-open)
+  and closes again when it succeeds
+- a token bucket shared by all threads (`rate` requests per second with
+  bursts of `burst`), so a burst of chart requests is smoothed instead of
+  getting us rate limited; waiting longer than `max_wait` is refused
+- bounded retries with exponential backoff and full jitter
+
+SymbolNotFound from the provider (a typo, a delisted symbol) is neither
+retried nor counted as a failure, so bad searches cannot open the breaker;
+the typed methods turn it into an empty result.
+
+Callers treat ProviderUnavailable like any other provider error and fall
+back to cached data.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+import random
+import threading
+import time
+import logging
+
+from app import config
+from app.providers import MarketDataProvider, SymbolNotFound, combine_histories, create_provider, empty_history
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """The gateway refused a call (circuit open or rate limit wait too long)."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def cancel(self) -> None:
+        """Give back a reserved token that will not be used."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+
+class ProviderGateway:
+    """Rate limiting, retries and circuit breaking around provider calls."""
+
+    def __init__(
+        self,
+        provider: Optional[MarketDataProvider] = None,
+        rate: float = config.PROVIDER_RATE,
+        burst: int = config.PROVIDER_BURST,
+        max_wait: float = config.PROVIDER_MAX_WAIT,
+        retries: int = config.PROVIDER_RETRIES,
+        backoff: float = config.PROVIDER_BACKOFF,
+        backoff_max: float = config.PROVIDER_BACKOFF_MAX,
+        breaker_threshold: int = config.PROVIDER_BREAKER_THRESHOLD,
+        breaker_cooldown: float = config.PROVIDER_BREAKER_COOLDOWN
+    ):
+        self.provider = provider or create_provider()
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._consecutive_failures = 0
+        self._counters = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "attempts": 0,
+            "retries": 0,
+            "throttled": 0,
+            "throttle_wait_ms": 0.0,
+            "rejected_rate_limit": 0,
+            "rejected_open": 0,
+            "not_found": 0,
+            "breaker_opened": 0,
+        }
+        self._operations: Dict[str, Dict[str, int]] = {}
+
+    def call(self, operation: str, func: Callable[[], T]) -> T:
+        """
+        Run one provider request through the gateway.
+
+        Args:
+            operation: Name for the counters, e.g. "history"
+            func: Zero-argument callable doing the request
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            ProviderUnavailable: Circuit open or rate limit wait over max_wait
+            SymbolNotFound: The provider has no data for the symbol
+            Exception: The last error of func once retries are exhausted
+        """
+        trial = self._admit(operation)
+        try:
+            result = self._attempts(operation, func)
+        except (ProviderUnavailable, SymbolNotFound) as e:
+            # Says nothing about provider health: leave the breaker as it is
+            with self._lock:
+                if trial:
+                    self._trial_running = False
+                if isinstance(e, SymbolNotFound):
+                    self._counters["not_found"] += 1
+                    self._operation(operation)["not_found"] += 1
+            raise
+        except Exception:
+            self._record(operation, ok=False, trial=trial)
+            raise
+        self._record(operation, ok=True, trial=trial)
+        return result
+
+    def quote(self, symbol: str) -> Optional[float]:
+        """Latest price of a symbol (see MarketDataProvider.quote), None when unknown."""
+        try:
+            return self.call("quote", lambda: self.provider.quote(symbol))
+        except SymbolNotFound:
+            return None
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        """The `.info`-style payload of a symbol, empty when unknown."""
+        try:
+            return self.call("info", lambda: self.provider.info(symbol))
+        except SymbolNotFound:
+            return {}
+
+    def history(
+        self,
+        symbol: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None
+    ):
+        """Daily bars of one symbol as a DataFrame, end exclusive; empty when there are none."""
+        try:
+            return self.call("history", lambda: self.provider.history(symbol, start=start, end=end, period=period))
+        except SymbolNotFound:
+            return empty_history()
+
+    def batch_history(self, symbols: List[str], start: str, end: str) -> Tuple[Any, Dict[str, str]]:
+        """
+        Daily bars of many symbols, end exclusive.
+
+        Each symbol is its own history call, so it takes its own rate limit
+        token and only failed symbols are retried. Failures do not abort
+        the batch.
+
+        Returns:
+            tuple: (DataFrame with columns grouped by ticker, {symbol: error}
+                for the symbols that failed); symbols without bars are simply
+                absent from the frame
+        """
+        frames = {}
+        errors = {}
+        for symbol in symbols:
+            try:
+                frames[symbol] = self.history(symbol, start=start, end=end)
+            except Exception as e:
+                errors[symbol] = str(e)
+        return combine_histories(frames), errors
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters, overall, per operation and of the provider itself."""
+        provider_stats = self.provider.get_stats()
+        with self._lock:
+            state = self._current_state()
+            return {
+                "provider": self.provider.name,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in": (
+                    round(max(0.0, self._opened_at + self.breaker_cooldown - time.monotonic()), 1)
+                    if state == OPEN else None
+                ),
+                **{k: round(v, 1) if isinstance(v, float) else v for k, v in self._counters.items()},
+                "operations": {op: dict(counts) for op, counts in self._operations.items()},
+                "provider_stats": provider_stats,
+            }
+
+    def _admit(self, operation: str) -> bool:
+        """Check the breaker; returns True when this call is the half-open trial."""
+        with self._lock:
+            self._counters["calls"] += 1
+            self._operation(operation)["calls"] += 1
+            state = self._current_state()
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self._counters["rejected_open"] += 1
+            self._operation(operation)["rejected"] += 1
+        raise ProviderUnavailable("Market data provider circuit is open")
+
+    def _attempts(self, operation: str, func: Callable[[], T]) -> T:
+        """Call func with throttling and jittered exponential backoff between attempts."""
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            with self._lock:
+                self._counters["attempts"] += 1
+            try:
+                return func()
+            except SymbolNotFound:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+                logger.warning(f"Provider {operation} failed ({e}), retry {attempt + 1} in {delay:.2f}s")
+                with self._lock:
+                    self._counters["retries"] += 1
+                time.sleep(delay)
+
+    def _throttle(self) -> None:
+        """Wait for a token from the bucket."""
+        wait = self._bucket.reserve()
+        if wait <= 0:
+            return
+        if wait > self.max_wait:
+            self._bucket.cancel()
+            with self._lock:
+                self._counters["rejected_rate_limit"] += 1
+            raise ProviderUnavailable(f"Provider rate limit: would wait {wait:.1f}s")
+        with self._lock:
+            self._counters["throttled"] += 1
+            self._counters["throttle_wait_ms"] += wait * 1000
+        time.sleep(wait)
+
+    def _record(self, operation: str, ok: bool, trial: bool) -> None:
+        """Count the outcome of a call and move the breaker."""
+        with self._lock:
+            if trial:
+                self._trial_running = False
+            if ok:
+                self._counters["successes"] += 1
+                self._consecutive_failures = 0
+                if self._state != CLOSED:
+                    logger.info("Provider circuit closed")
+                self._state = CLOSED
+                return
+
+            self._counters["failures"] += 1
+            self._operation(operation)["failures"] += 1
+            self._consecutive_failures += 1
+            if trial or self._consecutive_failures >= self.breaker_threshold:
+                if self._state == CLOSED or trial:
+                    self._counters["breaker_opened"] += 1
+                    logger.warning(
+                        f"Provider circuit opened after {self._consecutive_failures} failures, "
+                        f"failing fast for {self.breaker_cooldown:.0f}s"
+                    )
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _current_state(self) -> str:
+        """Breaker state, moving open to half-open after the cooldown. Caller holds the lock."""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.breaker_cooldown:
+            self._state = HALF_OPEN
+        return self._state
+
+    def _operation(self, operation: str) -> Dict[str, int]:
+        """Counters of one operation. Caller holds the lock."""
+        return self._operations.setdefault(operation, {"calls": 0, "failures": 0, "rejected": 0, "not_found": 0})
+
+
+provider_gateway = ProviderGateway()
@@ -0,0 +1,374 @@
+"""Market data providers.
+
+Services never talk to a data source directly; they go through the
+ProviderGateway (app/provider_gateway.py), which wraps one of these:
+
+- YFinanceProvider: Yahoo Finance via yfinance, the production source
+- LocalProvider: no network. Replays recorded fixtures (see
+  record_fixtures.py) and generates deterministic synthetic prices for
+  every other symbol, with configurable latency and injected errors, so
+  benchmarks and load tests run on an isolated machine
+
+Histories are DataFrames shaped like yfinance's: a date index with Open,
+High, Low, Close, Volume, Dividends and Stock Splits columns, where `end`
+is exclusive. Providers serve one symbol per request; the gateway builds
+multi-symbol histories so every request is rate limited on its own.
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from urllib.parse import quote as quote_path
+import json
+import os
+import random
+import threading
+import time
+import zlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app import config
+from app.trading_calendar import calendar_for_ticker
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# First day of synthetic histories
+SYNTHETIC_START = date(2000, 1, 3)
+
+# yfinance period suffix -> trading days per unit
+PERIOD_DAYS = {'d': 1, 'wk': 5, 'mo': 21, 'y': 252}
+
+
+class ProviderError(Exception):
+    """A provider request failed."""
+
+
+class SymbolNotFound(ProviderError):
+    """The provider answered but has no data for the symbol (unknown, delisted or nothing in range).
+
+    Not a provider fault: the gateway neither retries it nor counts it toward
+    the circuit breaker.
+    """
+
+
+def empty_history() -> pd.DataFrame:
+    """A history with no bars."""
+    return pd.DataFrame(columns=HISTORY_COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+
+
+def combine_histories(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Join per-symbol histories like a grouped yf.download.
+
+    Returns:
+        pd.DataFrame: Columns grouped by ticker (ticker, field) on the union
+            of the exchange-local dates
+    """
+    frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    for frame in frames.values():
+        if frame.index.tz is not None:
+            frame.index = frame.index.tz_localize(None)
+    return pd.concat(frames, axis=1)
+
+
+class MarketDataProvider(ABC):
+    """Interface the provider gateway calls."""
+
+    name = "base"
+
+    @abstractmethod
+    def quote(self, symbol: str) -> Optional[float]:
+        """Latest price of a symbol, None when there is none."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def info(self, symbol: str) -> Dict[str, Any]:
+        """Quote and company fields of a symbol, shaped like yfinance `.info`."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def history(
+        self,
+        symbol: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Daily bars from start (inclusive) to end (exclusive), or for a period like "5d"."""
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Provider-specific counters for /api/provider/stats."""
+        return {}
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance through yfinance, with split/dividend-adjusted closes.
+
+    yfinance reports most failures (network errors, HTTP 429/5xx) as empty
+    results. This provider raises instead: SymbolNotFound when Yahoo answered
+    that it has no data, ProviderError or the underlying exception otherwise.
+    """
+
+    name = "yfinance"
+
+    def __init__(self):
+        import yfinance
+        from yfinance import exceptions
+        self._yf = yfinance
+        self._exceptions = exceptions
+
+    def quote(self, symbol: str) -> Optional[float]:
+        hist = self.history(symbol, period='1d')
+        if not hist.empty and 'Close' in hist.columns:
+            return float(hist['Close'].iloc[-1])
+        return None
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        info = self._yf.Ticker(symbol).info or {}
+        # yfinance turns every HTTP error (404 for unknown symbols, but also
+        # 429 and 5xx) into an empty payload, apart from a complementary field
+        if any(key != 'trailingPegRatio' for key in info):
+            return info
+        # A history request tells an unknown symbol from a failed request:
+        # it raises SymbolNotFound or the request error
+        self.history(symbol, period='5d')
+        raise ProviderError(f"Empty info payload for {symbol}")
+
+    def history(
+        self,
+        symbol: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> pd.DataFrame:
+        ticker = self._yf.Ticker(symbol)
+        try:
+            if period:
+                return ticker.history(period=period, raise_errors=True)
+            return ticker.history(start=start, end=end, raise_errors=True)
+        except self._exceptions.YFPricesMissingError as e:
+            # Yahoo answered the chart request; "Yahoo status_code = ..." is
+            # an HTTP error, anything else means it has no bars
+            if 'status_code' in str(e):
+                raise ProviderError(str(e)) from e
+            raise SymbolNotFound(str(e)) from e
+        except self._exceptions.YFTickerMissingError as e:
+            # The timezone lookup before a start/end request fails the same
+            # way for unknown symbols and for network errors or 429s
+            raise ProviderError(str(e)) from e
+
+
+class LocalProvider(MarketDataProvider):
+    """Offline provider with recorded fixtures, synthetic prices and fault injection.
+
+    For a symbol with `<fixtures_dir>/<SYMBOL>.csv` (and optionally
+    `<SYMBOL>.json` for info) the recording is replayed. Any other symbol
+    gets a random-walk history seeded by its name, so runs are repeatable;
+    with synthetic=False such symbols have no data instead. Every request
+    sleeps latency plus up to jitter seconds and fails with probability
+    error_rate.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        fixtures_dir: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        synthetic: bool = True
+    ):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self.synthetic = synthetic
+        self._rng = random.Random(seed)
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._injected_errors = 0
+
+    def quote(self, symbol: str) -> Optional[float]:
+        self._simulate("quote", symbol)
+        frame = self._known_frame(symbol)
+        # Drift around the last close, changing once a minute
+        minute = int(time.time() // 60)
+        wiggle = random.Random(self._symbol_seed(symbol) ^ minute).gauss(0, 0.002)
+        return round(float(frame['Close'].iloc[-1]) * (1 + wiggle), 4)
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        self._simulate("info", symbol)
+        recorded = self.fixture_path(symbol, '.json')
+        if recorded and os.path.exists(recorded):
+            with open(recorded) as handle:
+                return json.load(handle)
+
+        frame = self._known_frame(symbol)
+        last = frame.iloc[-1]
+        year = frame.iloc[-252:]
+        return {
+            'symbol': symbol,
+            'shortName': f"{symbol} Synthetic",
+            'longName': f"{symbol} Synthetic Holdings",
+            'quoteType': 'EQUITY',
+            'exchange': 'NMS',
+            'currency': 'USD',
+            'sector': 'Technology',
+            'industry': 'Software',
+            'currentPrice': float(last['Close']),
+            'regularMarketPrice': float(last['Close']),
+            'previousClose': float(frame['Close'].iloc[-2]) if len(frame) > 1 else float(last['Close']),
+            'dayHigh': float(last['High']),
+            'dayLow': float(last['Low']),
+            'volume': int(last['Volume']),
+            'averageVolume': int(year['Volume'].mean()),
+            'fiftyTwoWeekHigh': float(year['High'].max()),
+            'fiftyTwoWeekLow': float(year['Low'].min()),
+            'marketCap': int(float(last['Close']) * 1e9),
+            'trailingPE': 20.0,
+            'beta': 1.0,
+        }
+
+    def history(
+        self,
+        symbol: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> pd.DataFrame:
+        self._simulate("history", symbol)
+        return self._slice(self._known_frame(symbol), start, end, period)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request and injected error counters."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "injected_errors": self._injected_errors,
+                "symbols_loaded": len(self._frames),
+            }
+
+    def _simulate(self, operation: str, symbol: str) -> None:
+        """Sleep for the configured latency and maybe fail."""
+        with self._lock:
+            self._requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self._injected_errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ProviderError(f"Injected {operation} failure for {symbol}")
+
+    @staticmethod
+    def _slice(frame: pd.DataFrame, start: Optional[str], end: Optional[str], period: Optional[str]) -> pd.DataFrame:
+        if period:
+            if period == 'max':
+                return frame
+            for suffix, days in PERIOD_DAYS.items():
+                if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+                    return frame.iloc[-int(period[:-len(suffix)]) * days:]
+            raise ProviderError(f"Unsupported period: {period}")
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index < pd.Timestamp(end)]
+        return frame
+
+    def _frame(self, symbol: str) -> pd.DataFrame:
+        """Full history of a symbol, loaded or generated once."""
+        symbol = symbol.upper().strip()
+        frame = self._frames.get(symbol)
+        if frame is None:
+            recorded = self.fixture_path(symbol, '.csv')
+            if recorded and os.path.exists(recorded):
+                frame = pd.read_csv(recorded, index_col=0)
+                # Keep the exchange-local date of each bar, whatever the offset
+                frame.index = pd.DatetimeIndex(pd.to_datetime(frame.index.astype(str).str[:10]), name='Date')
+            elif self.synthetic:
+                frame = self._synthetic(symbol)
+            else:
+                frame = empty_history()
+            self._frames[symbol] = frame
+        return frame
+
+    def _known_frame(self, symbol: str) -> pd.DataFrame:
+        """Full history of a symbol, SymbolNotFound when there is none."""
+        frame = self._frame(symbol)
+        if frame.empty:
+            raise SymbolNotFound(f"{symbol}: no fixture or synthetic data")
+        return frame
+
+    def _synthetic(self, symbol: str) -> pd.DataFrame:
+        """Random-walk daily bars on the symbol's trading calendar, up to today."""
+        days = calendar_for_ticker(symbol).trading_days(SYNTHETIC_START, datetime.now().date())
+        rng = np.random.default_rng(self._symbol_seed(symbol))
+        count = len(days)
+
+        returns = rng.normal(0.0003, rng.uniform(0.01, 0.03), count)
+        close = rng.uniform(10, 500) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + rng.normal(0, 0.003, count))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.005, count)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.005, count)))
+        volume = rng.integers(100_000, 10_000_000, count)
+
+        return pd.DataFrame(
+            {
+                'Open': open_,
+                'High': high,
+                'Low': low,
+                'Close': close,
+                'Volume': volume,
+                'Dividends': np.zeros(count),
+                'Stock Splits': np.zeros(count),
+            },
+            index=pd.DatetimeIndex(days, name='Date')
+        )
+
+    def _symbol_seed(self, symbol: str) -> int:
+        return zlib.crc32(symbol.upper().encode()) ^ self.seed
+
+    def fixture_path(self, symbol: str, suffix: str) -> Optional[str]:
+        """Path of a symbol's fixture file with the given suffix, None without a fixture directory."""
+        if not self.fixtures_dir:
+            return None
+        return os.path.join(self.fixtures_dir, quote_path(symbol.upper().strip(), safe='') + suffix)
+
+
+def create_provider(kind: Optional[str] = None) -> MarketDataProvider:
+    """
+    Get the configured market data provider.
+
+    Args:
+        kind: "yfinance" or "local", defaults to config.PROVIDER
+    """
+    kind = (kind or config.PROVIDER).lower()
+    if kind == "yfinance":
+        return YFinanceProvider()
+    if kind == "local":
+        logger.info(
+            f"Using local market data provider (fixtures: {config.PROVIDER_FIXTURES or 'none'}, "
+            f"latency {config.PROVIDER_LATENCY_MS:.0f} ms, error rate {config.PROVIDER_ERROR_RATE:.1%})"
+        )
+        return LocalProvider(
+            fixtures_dir=config.PROVIDER_FIXTURES,
+            latency=config.PROVIDER_LATENCY_MS / 1000,
+            jitter=config.PROVIDER_JITTER_MS / 1000,
+            error_rate=config.PROVIDER_ERROR_RATE,
+            seed=config.PROVIDER_SEED,
+            synthetic=config.PROVIDER_SYNTHETIC
+        )
+    raise ValueError(f"Unknown market data provider: {kind}")
@@ -0,0 +1,264 @@
+"""Quote engine for valuing many positions from a single price snapshot."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import threading
+import time
+import logging
+
+from app import config
+from app.info_cache import info_cache
+from app.provider_gateway import provider_gateway
+from app.trading_calendar import calendar_for_ticker
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteService:
+    """Service for fetching current prices for many tickers at once.
+
+    Duplicate tickers are collapsed and the remaining symbols are fetched
+    with a bounded concurrent fan-out, so a page with 80 positions costs
+    roughly the time of its slowest symbol instead of the sum of all of them.
+    Per-ticker timings and failure counts are kept for diagnostics.
+
+    Every fetched price also lands in an in-memory snapshot. Snapshot
+    prices are served for snapshot_ttl seconds. For the symbols a background
+    refresher tracks (see track and refresh) they are served for up to
+    tracked_max_age seconds while the symbol's market is open and without
+    limit while it is closed, so requests for those never wait on the
+    provider. A symbol without a price is always fetched again.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        snapshot_ttl: float = config.INFO_PRICE_TTL,
+        tracked_max_age: float = config.QUOTE_MAX_AGE
+    ):
+        self.max_workers = max_workers
+        self.snapshot_ttl = snapshot_ttl
+        self.tracked_max_age = tracked_max_age
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quote")
+        self._stats: Dict[str, Dict] = {}
+        # ticker -> (price, time.time() of the fetch)
+        self._snapshot: Dict[str, Tuple[Optional[float], float]] = {}
+        self._tracked: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+
+    def get_quotes(self, tickers: Iterable[str]) -> Dict[str, Optional[float]]:
+        """
+        Get current prices for a set of tickers as one snapshot.
+
+        Fresh snapshot prices are used as is; only the other symbols are
+        fetched from the provider.
+
+        Args:
+            tickers: Ticker symbols, duplicates allowed
+
+        Returns:
+            Dict[str, Optional[float]]: {"AAPL": 150.5, "MSFT": None, ...}
+        """
+        symbols = self._normalize(tickers)
+        if not symbols:
+            return {}
+
+        now = time.time()
+        quotes = {}
+        with self._lock:
+            entries = {symbol: self._snapshot.get(symbol) for symbol in symbols}
+            tracked = self._tracked
+        for symbol, entry in entries.items():
+            if entry is None or entry[0] is None:
+                continue
+            age = now - entry[1]
+            if age <= self.snapshot_ttl or (symbol in tracked and self._tracked_fresh(symbol, age)):
+                quotes[symbol] = entry[0]
+
+        missing = [symbol for symbol in symbols if symbol not in quotes]
+        # Tracked symbols are pinned in the info cache, so an expired one has
+        # to bypass it to reach the provider
+        expired = [symbol for symbol in missing if symbol in tracked]
+        missing = [symbol for symbol in missing if symbol not in tracked]
+        if expired:
+            quotes.update(self._fetch_many(expired, force=True, fallback=True))
+        if missing:
+            quotes.update(self._fetch_many(missing, force=False, fallback=True))
+        return {symbol: quotes[symbol] for symbol in symbols}
+
+    def refresh(self, tickers: Iterable[str]) -> Dict[str, Optional[float]]:
+        """
+        Fetch current prices from the provider, bypassing every cache.
+
+        A failed fetch keeps the previous snapshot price of the symbol.
+
+        Returns:
+            Dict[str, Optional[float]]: Freshly fetched prices
+        """
+        symbols = self._normalize(tickers)
+        if not symbols:
+            return {}
+        return self._fetch_many(symbols, force=True, fallback=False)
+
+    def get_quote_times(self, tickers: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Get when the snapshot price of each ticker was fetched.
+
+        Returns:
+            Dict[str, Optional[str]]: ISO timestamp per ticker, None without a price
+        """
+        with self._lock:
+            entries = {symbol: self._snapshot.get(symbol) for symbol in self._normalize(tickers)}
+        return {
+            symbol: _iso(entry[1]) if entry is not None and entry[0] is not None else None
+            for symbol, entry in entries.items()
+        }
+
+    def track(self, tickers: Iterable[str]) -> None:
+        """
+        Serve these symbols from the snapshot beyond snapshot_ttl.
+
+        Called by the background refresher with the set it keeps up to date;
+        replaces the previously tracked set. Their info payloads are pinned
+        in the shared info cache as well.
+        """
+        tracked = frozenset(self._normalize(tickers))
+        with self._lock:
+            self._tracked = tracked
+        info_cache.pin(tracked)
+
+    def get_snapshot(self) -> Dict[str, Dict]:
+        """Get every snapshot price with the time it was fetched."""
+        with self._lock:
+            entries = dict(self._snapshot)
+            tracked = self._tracked
+        return {
+            ticker: {
+                "price": price,
+                "as_of": _iso(fetched_at),
+                "tracked": ticker in tracked,
+            }
+            for ticker, (price, fetched_at) in sorted(entries.items())
+        }
+
+    def get_quote(self, ticker: str) -> Optional[float]:
+        """Get the current price for a single ticker."""
+        return self.get_quotes([ticker]).get(ticker.upper().strip())
+
+    def get_stats(self) -> List[Dict]:
+        """Get per-ticker timing and failure counts, slowest first."""
+        with self._lock:
+            stats = [
+                {
+                    "ticker": ticker,
+                    "requests": entry["requests"],
+                    "failures": entry["failures"],
+                    "last_ms": round(entry["last_ms"], 1),
+                    "avg_ms": round(entry["total_ms"] / entry["requests"], 1),
+                    "max_ms": round(entry["max_ms"], 1),
+                    "last_error": entry["last_error"],
+                }
+                for ticker, entry in self._stats.items()
+            ]
+        return sorted(stats, key=lambda s: s["avg_ms"], reverse=True)
+
+    def _tracked_fresh(self, symbol: str, age: float) -> bool:
+        """Whether a tracked snapshot price is recent enough to serve."""
+        if age <= self.tracked_max_age:
+            return True
+        # The refresher stops at the close, so after it prices stay as they are
+        return not calendar_for_ticker(symbol).is_open(datetime.now(timezone.utc))
+
+    @staticmethod
+    def _normalize(tickers: Iterable[str]) -> List[str]:
+        """Upper-case, strip and de-duplicate tickers, keeping first-seen order."""
+        seen = {}
+        for ticker in tickers:
+            if ticker and ticker.strip():
+                seen.setdefault(ticker.upper().strip(), None)
+        return list(seen)
+
+    def _fetch_many(self, symbols: List[str], force: bool, fallback: bool) -> Dict[str, Optional[float]]:
+        """
+        Fetch normalized symbols concurrently and store them in the snapshot.
+
+        Args:
+            symbols: Normalized ticker symbols
+            force: Bypass the info cache
+            fallback: Return the last snapshot price (keeping its time) when a fetch fails
+        """
+        started = time.perf_counter()
+        prices = list(self._executor.map(lambda symbol: self._timed_fetch(symbol, force), symbols))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        quotes = dict(zip(symbols, prices))
+        failed = sum(1 for price in prices if price is None)
+        logger.info(
+            f"Fetched {len(symbols)} quotes in {elapsed_ms:.0f} ms "
+            f"({failed} failed)"
+        )
+
+        now = time.time()
+        with self._lock:
+            for symbol, price in quotes.items():
+                if price is not None or symbol not in self._snapshot:
+                    self._snapshot[symbol] = (price, now)
+                elif fallback:
+                    # Provider failed: fall back to the last known price
+                    quotes[symbol] = self._snapshot[symbol][0]
+        return quotes
+
+    def _timed_fetch(self, ticker: str, force: bool = False) -> Optional[float]:
+        """Fetch one quote and record how long it took."""
+        started = time.perf_counter()
+        error = None
+        try:
+            price = self._fetch_price(ticker, force)
+        except Exception as e:
+            logger.error(f"Error fetching current price for {ticker}: {e}")
+            price = None
+            error = str(e)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(ticker, elapsed_ms, price is None, error)
+        return price
+
+    @staticmethod
+    def _fetch_price(ticker: str, force: bool = False) -> Optional[float]:
+        """Get current price for a ticker from the shared info cache (or the provider when forced)."""
+        if force:
+            info = info_cache.refresh(ticker)
+        else:
+            info = info_cache.get(ticker, ('currentPrice', 'regularMarketPrice'))
+
+        # Try to get current price
+        price = info.get('currentPrice') or info.get('regularMarketPrice')
+
+        if price and price > 0:
+            return float(price)
+
+        # Fallback: the provider's own latest price
+        return provider_gateway.quote(ticker)
+
+    def _record(self, ticker: str, elapsed_ms: float, failed: bool, error: Optional[str]) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(ticker, {
+                "requests": 0,
+                "failures": 0,
+                "last_ms": 0.0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "last_error": None,
+            })
+            entry["requests"] += 1
+            entry["last_ms"] = elapsed_ms
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            if failed:
+                entry["failures"] += 1
+                entry["last_error"] = error or "No price available"
+
+
+def _iso(timestamp: float) -> str:
+    """A time.time() value as an ISO timestamp in UTC."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec='seconds')
@@ -0,0 +1,130 @@
+"""Server-Sent Events stream of quote and open position changes."""
+
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Optional
+from sqlalchemy import select
+import asyncio
+import json
+import logging
+
+from app import config
+from app.concurrency import run_db
+from app.database import Position, SessionLocal
+from app.position_service import unrealized_pnl
+from app.quote_service import QuoteService
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class QuoteStream:
+    """Fan-out of quote snapshot changes to any number of clients.
+
+    publish() values every open position from the QuoteService snapshot once
+    (no provider calls) and wakes all connected streams; each stream then
+    sends its client only what differs from what that client last received.
+    The MarketDataRefresher calls publish() after every pass, so all browser
+    tabs share the one upstream refresh.
+
+    Messages:
+        snapshot: the full state, sent first on every connection
+        quotes: {"quotes": {ticker: price}, "positions": {id: {...}},
+                 "removed_positions": [id, ...], "as_of": ...} with changes only
+    """
+
+    def __init__(
+        self,
+        quote_service: QuoteService,
+        session_factory: Callable = SessionLocal,
+        keepalive: float = config.QUOTE_STREAM_KEEPALIVE
+    ):
+        self.quote_service = quote_service
+        self.session_factory = session_factory
+        self.keepalive = keepalive
+        self._state: Optional[Dict] = None
+        self._changed = asyncio.Event()
+        self._clients = 0
+        self._published = 0
+
+    async def publish(self) -> None:
+        """Rebuild the shared state and wake every stream."""
+        self._state = await run_db(self._build_state)
+        self._published += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def events(self) -> AsyncIterator[str]:
+        """Yield SSE messages for one client until it disconnects."""
+        self._clients += 1
+        try:
+            if self._state is None:
+                await self.publish()
+            sent = None
+            while True:
+                state = self._state
+                if sent is None:
+                    yield format_event("snapshot", self._delta({"quotes": {}, "positions": {}}, state))
+                else:
+                    delta = self._delta(sent, state)
+                    if delta["quotes"] or delta["positions"] or delta["removed_positions"]:
+                        yield format_event("quotes", delta)
+                sent = state
+
+                changed = self._changed
+                if self._state is not state:
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self._clients -= 1
+
+    def get_status(self) -> Dict:
+        """Get connection and publish counters."""
+        return {
+            "clients": self._clients,
+            "published": self._published,
+            "as_of": self._state["as_of"] if self._state else None,
+        }
+
+    @staticmethod
+    def _delta(sent: Dict, state: Dict) -> Dict:
+        """What changed between the state a client has and the current one."""
+        return {
+            "quotes": {
+                ticker: price for ticker, price in state["quotes"].items()
+                if ticker not in sent["quotes"] or sent["quotes"][ticker] != price
+            },
+            "positions": {
+                position_id: values for position_id, values in state["positions"].items()
+                if sent["positions"].get(position_id) != values
+            },
+            "removed_positions": [
+                position_id for position_id in sent["positions"] if position_id not in state["positions"]
+            ],
+            "as_of": state["as_of"],
+        }
+
+    def _build_state(self) -> Dict:
+        """Snapshot prices plus every open position valued at them."""
+        quotes = {
+            ticker: entry["price"] for ticker, entry in self.quote_service.get_snapshot().items()
+        }
+        with self.session_factory() as db:
+            positions = db.execute(
+                select(Position.id, Position.ticker, Position.entry_value_eur, Position.entry_price_per_share)
+                .where(Position.status == 'OPEN')
+            ).all()
+        return {
+            "quotes": quotes,
+            "positions": {
+                position.id: unrealized_pnl(position, quotes.get(position.ticker))
+                for position in positions
+            },
+            "as_of": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        }
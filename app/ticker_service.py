@@ -1,8 +1,9 @@
 """Service for fetching ticker information using yfinance - ULTRA ROBUST VERSION."""
 
-import yfinance as yf
 from typing import Optional, Dict, Any
 from app.models import TickerInfo
+from app.info_cache import info_cache, PRICE_FIELDS
+from app.provider_gateway import provider_gateway
 import logging
 from datetime import datetime
 
@@ -46,8 +47,7 @@ class TickerService:
             return False
         
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = info_cache.get(symbol)
             
             # Check 1: If info dict is essentially empty
             if not info or len(info) <= 1:
@@ -111,7 +111,7 @@ class TickerService:
             # Additional check: Try to get recent history as final validation
             if is_valid:
                 try:
-                    history = ticker.history(period="5d")
+                    history = provider_gateway.history(symbol, period="5d")
                     if history.empty:
                         logger.debug(f"Symbol {symbol}: No recent history, might be delisted")
                         # Still valid if other criteria are strong
@@ -137,8 +137,7 @@ class TickerService:
         Used when validating to auto-fill the name field.
         """
         try:
-            ticker = yf.Ticker(symbol.upper())
-            info = ticker.info
+            info = info_cache.get(symbol)
             
             # Try different name fields in order of preference
             name = (
@@ -164,8 +163,7 @@ class TickerService:
         symbol = symbol.upper().strip()
         
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+            info = info_cache.get(symbol, PRICE_FIELDS)
             
             # If info is empty or minimal, return error
             if not info or len(info) <= 1:
@@ -336,8 +334,7 @@ class TickerService:
             return result
         
         try:
-            ticker = yf.Ticker(symbol.upper())
-            info = ticker.info
+            info = info_cache.get(symbol, PRICE_FIELDS)
             
             result['data_points'] = len(info) if info else 0
             
@@ -372,7 +369,7 @@ class TickerService:
                 
                 # History check
                 try:
-                    history = ticker.history(period="5d")
+                    history = provider_gateway.history(symbol.upper(), period="5d")
                     result['has_history'] = not history.empty
                 except:
                     result['has_history'] = False
@@ -0,0 +1,304 @@
+"""Offline exchange trading calendars.
+
+Holidays are derived from each exchange's published rules (fixed dates,
+weekday rules and Easter-based holidays) plus a table of one-off closures,
+so deciding whether a date should have a price bar never needs the network.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXCHANGE = 'NYSE'
+
+# yfinance symbol suffix -> exchange calendar
+EXCHANGE_SUFFIXES = {
+    'DE': 'XETRA',
+    'F': 'XETRA',
+    'L': 'LSE',
+    'PA': 'EURONEXT',
+    'AS': 'EURONEXT',
+    'BR': 'EURONEXT',
+    'LS': 'EURONEXT',
+    'SW': 'SIX',
+}
+
+# Unscheduled closures (national days of mourning, storms, royal events...)
+SPECIAL_CLOSURES: Dict[str, FrozenSet[date]] = {
+    'NYSE': frozenset({
+        date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+        date(2004, 6, 11),   # President Reagan
+        date(2007, 1, 2),    # President Ford
+        date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+        date(2018, 12, 5),   # President G. H. W. Bush
+        date(2025, 1, 9),    # President Carter
+    }),
+    'LSE': frozenset({
+        date(2011, 4, 29),   # Royal wedding
+        date(2012, 6, 5),    # Diamond Jubilee
+        date(2022, 6, 3),    # Platinum Jubilee
+        date(2022, 9, 19),   # State funeral of Queen Elizabeth II
+        date(2023, 5, 8),    # Coronation of King Charles III
+    }),
+}
+
+# Regular session per exchange: (standard UTC offset in hours, daylight saving
+# rule, local open, local close). CRYPTO trades around the clock and WEEKDAYS
+# (currency pairs, unknown suffixes) all day on trading days.
+TRADING_SESSIONS: Dict[str, Tuple[int, str, time, time]] = {
+    'NYSE': (-5, 'US', time(9, 30), time(16, 0)),
+    'XETRA': (1, 'EU', time(9, 0), time(17, 30)),
+    'LSE': (0, 'EU', time(8, 0), time(16, 30)),
+    'EURONEXT': (1, 'EU', time(9, 0), time(17, 30)),
+    'SIX': (1, 'EU', time(9, 0), time(17, 30)),
+}
+
+
+def easter_sunday(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """The n-th given weekday of a month (n=-1 for the last one)."""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _daylight_saving(rule: str, moment: datetime) -> bool:
+    """Whether daylight saving time is in effect at a UTC moment.
+    
+    US: second Sunday of March 02:00 to first Sunday of November 02:00 local.
+    EU: last Sunday of March to last Sunday of October, 01:00 UTC both.
+    """
+    year = moment.year
+    if rule == 'US':
+        starts = datetime.combine(_nth_weekday(year, 3, 6, 2), time(7), timezone.utc)
+        ends = datetime.combine(_nth_weekday(year, 11, 6, 1), time(6), timezone.utc)
+    else:
+        starts = datetime.combine(_nth_weekday(year, 3, 6, -1), time(1), timezone.utc)
+        ends = datetime.combine(_nth_weekday(year, 10, 6, -1), time(1), timezone.utc)
+    return starts <= moment < ends
+
+
+def _observed_us(day: date) -> date:
+    """US rule: Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _observed_uk(day: date) -> date:
+    """UK rule: weekend holidays move to the following Monday."""
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def _nyse_holidays(year: int) -> Set[date]:
+    easter = easter_sunday(year)
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),     # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),     # Washington's Birthday
+        easter - timedelta(days=2),      # Good Friday
+        _nth_weekday(year, 5, 0, -1),    # Memorial Day
+        _observed_us(date(year, 7, 4)),  # Independence Day
+        _nth_weekday(year, 9, 0, 1),     # Labor Day
+        _nth_weekday(year, 11, 3, 4),    # Thanksgiving
+        _observed_us(date(year, 12, 25)),
+    }
+    # NYSE does not close on the preceding Friday when New Year's Day is a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed_us(new_year))
+    if year >= 2022:
+        holidays.add(_observed_us(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def _xetra_holidays(year: int) -> Set[date]:
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1),
+        easter - timedelta(days=2),   # Good Friday
+        easter + timedelta(days=1),   # Easter Monday
+        date(year, 5, 1),
+        date(year, 12, 24),
+        date(year, 12, 25),
+        date(year, 12, 26),
+        date(year, 12, 31),
+    }
+
+
+def _lse_holidays(year: int) -> Set[date]:
+    easter = easter_sunday(year)
+    early_may = _nth_weekday(year, 5, 0, 1)
+    spring = _nth_weekday(year, 5, 0, -1)
+    if year == 2020:
+        early_may = date(2020, 5, 8)     # Moved for VE Day
+    if year in (2002, 2012):
+        spring = date(year, 6, 4)        # Moved for Jubilees
+    if year == 2022:
+        spring = date(2022, 6, 2)
+
+    christmas = _observed_uk(date(year, 12, 25))
+    boxing_day = date(year, 12, 26)
+    if boxing_day <= christmas or boxing_day.weekday() >= 5:
+        boxing_day = _observed_uk(max(boxing_day, christmas + timedelta(days=1)))
+
+    return {
+        _observed_uk(date(year, 1, 1)),
+        easter - timedelta(days=2),      # Good Friday
+        easter + timedelta(days=1),      # Easter Monday
+        early_may,
+        spring,
+        _nth_weekday(year, 8, 0, -1),    # Summer bank holiday
+        christmas,
+        boxing_day,
+    }
+
+
+def _euronext_holidays(year: int) -> Set[date]:
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1),
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        date(year, 5, 1),
+        date(year, 12, 25),
+        date(year, 12, 26),
+    }
+
+
+def _six_holidays(year: int) -> Set[date]:
+    easter = easter_sunday(year)
+    return {
+        date(year, 1, 1),
+        date(year, 1, 2),
+        easter - timedelta(days=2),      # Good Friday
+        easter + timedelta(days=1),      # Easter Monday
+        easter + timedelta(days=39),     # Ascension Day
+        easter + timedelta(days=50),     # Whit Monday
+        date(year, 5, 1),
+        date(year, 8, 1),                # Swiss National Day
+        date(year, 12, 24),
+        date(year, 12, 25),
+        date(year, 12, 26),
+        date(year, 12, 31),
+    }
+
+
+_HOLIDAY_RULES = {
+    'NYSE': _nyse_holidays,
+    'XETRA': _xetra_holidays,
+    'LSE': _lse_holidays,
+    'EURONEXT': _euronext_holidays,
+    'SIX': _six_holidays,
+}
+
+
+def exchange_for_ticker(ticker: str) -> str:
+    """
+    Get the exchange calendar for a yfinance symbol.
+
+    Suffix-less symbols are US listings. Crypto pairs (BTC-USD) trade every
+    day and currency pairs (EURUSD=X) every weekday. Unknown suffixes fall
+    back to a plain weekday calendar without holidays.
+    """
+    ticker = ticker.upper().strip()
+    if ticker.endswith('=X'):
+        return 'WEEKDAYS'
+    if ticker.endswith(('-USD', '-EUR', '-GBP')):
+        return 'CRYPTO'
+    if '.' in ticker:
+        suffix = ticker.rsplit('.', 1)[1]
+        return EXCHANGE_SUFFIXES.get(suffix, 'WEEKDAYS')
+    return DEFAULT_EXCHANGE
+
+
+class TradingCalendar:
+    """Trading days for one exchange."""
+
+    def __init__(self, exchange: str):
+        self.exchange = exchange
+
+    def holidays(self, year: int) -> FrozenSet[date]:
+        """All full-day closures of the exchange in a year."""
+        return _holidays(self.exchange, year)
+
+    def is_trading_day(self, day: date) -> bool:
+        """Whether the exchange is expected to publish a daily bar for a date."""
+        if self.exchange == 'CRYPTO':
+            return True
+        if day.weekday() >= 5:
+            return False
+        return day not in self.holidays(day.year)
+
+    def is_open(self, moment: datetime) -> bool:
+        """
+        Whether the exchange is in its regular session at a moment.
+        
+        Args:
+            moment: Timezone-aware datetime (naive values are taken as UTC)
+        """
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        moment = moment.astimezone(timezone.utc)
+        session = TRADING_SESSIONS.get(self.exchange)
+        if session is None:
+            return self.is_trading_day(moment.date())
+        
+        offset, rule, opens, closes = session
+        if _daylight_saving(rule, moment):
+            offset += 1
+        local = moment + timedelta(hours=offset)
+        return self.is_trading_day(local.date()) and opens <= local.time() < closes
+    
+    def trading_days(self, start: date, end: date) -> List[date]:
+        """All trading days between start and end, inclusive."""
+        days = []
+        current = start
+        while current <= end:
+            if self.is_trading_day(current):
+                days.append(current)
+            current += timedelta(days=1)
+        return days
+
+
+@lru_cache(maxsize=None)
+def _holidays(exchange: str, year: int) -> FrozenSet[date]:
+    rule = _HOLIDAY_RULES.get(exchange)
+    holidays = set(rule(year)) if rule else set()
+    holidays.update(d for d in SPECIAL_CLOSURES.get(exchange, ()) if d.year == year)
+    return frozenset(holidays)
+
+
+@lru_cache(maxsize=None)
+def get_calendar(exchange: str) -> TradingCalendar:
+    """Get the (shared) calendar for an exchange."""
+    return TradingCalendar(exchange)
+
+
+def calendar_for_ticker(ticker: str) -> TradingCalendar:
+    """Get the calendar that applies to a yfinance symbol."""
+    return get_calendar(exchange_for_ticker(ticker))
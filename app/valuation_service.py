@@ -0,0 +1,186 @@
+"""Portfolio valuation over time from the price history cache."""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+import numpy as np
+import logging
+
+from app.database import Position
+from app.price_history_service import PriceHistoryService, parse_date
+
+logger = logging.getLogger(__name__)
+
+# Extra days loaded before the start so positions held on the first day have a price
+PRICE_LOOKBACK_DAYS = 14
+
+SERIES_FIELDS = ('market_value', 'invested', 'unrealized_pnl', 'realized_pnl', 'total_pnl')
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """Replace NaNs in each column with the last valid value above them."""
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+
+class ValuationService:
+    """Service for daily portfolio equity curves.
+
+    Every position is a (ticker column, entry day, exit day, shares) tuple.
+    Holdings per ticker and day come from scattering +shares at the entry
+    index and -shares at the exit index and taking a cumulative sum down
+    the date axis, so the cost is a few array passes over a days x tickers
+    matrix no matter how many positions there are.
+    """
+
+    def __init__(self, price_history_service: Optional[PriceHistoryService] = None):
+        self.price_history_service = price_history_service or PriceHistoryService()
+
+    def equity_curve(
+        self,
+        db: Session,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        refresh: bool = False
+    ) -> Dict:
+        """
+        Get the daily value of all positions between two dates.
+
+        Values are in EUR, derived like open position valuations: shares are
+        entry_value_eur / entry_price_per_share and a day's value is shares
+        times that day's close (the last known close on days without a bar).
+        A position counts from its entry date until the day before its exit
+        date; on the exit date its profit moves into realized_pnl. Tickers
+        without any cached price yet are valued at cost.
+
+        Args:
+            db: Database session
+            start_date: First date (YYYY-MM-DD), defaults to the first entry date
+            end_date: Last date (YYYY-MM-DD), defaults to today
+            refresh: Download missing history first instead of using the cache as is
+
+        Returns:
+            dict: {"dates": [...], "market_value": [...], "invested": [...],
+                   "unrealized_pnl": [...], "realized_pnl": [...],
+                   "total_pnl": [...], "positions_held": [...]}
+        """
+        positions = db.query(
+            Position.ticker,
+            Position.entry_date,
+            Position.exit_date,
+            Position.entry_value_eur,
+            Position.entry_price_per_share,
+            Position.profit_eur
+        ).all()
+
+        start = parse_date(start_date) if start_date else min((p.entry_date for p in positions), default=None)
+        end = parse_date(end_date) if end_date else datetime.now().date()
+        if start is None:
+            return self._empty(None, end)
+        if start > end:
+            raise ValueError("Start date must be before end date")
+
+        tickers = sorted({p.ticker for p in positions})
+        if refresh:
+            self._refresh(db, positions, end)
+
+        dates, closes = self.price_history_service.get_price_matrix(
+            db, tickers, start - timedelta(days=PRICE_LOOKBACK_DAYS), end
+        )
+        if not len(dates):
+            return self._empty(start, end)
+        series = self._value(positions, tickers, dates, closes)
+
+        visible = dates >= np.datetime64(start)
+        result = {
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "dates": np.datetime_as_string(dates[visible], unit='D').tolist(),
+            "positions_held": series.pop("positions_held")[visible].tolist(),
+        }
+        for field in SERIES_FIELDS:
+            result[field] = np.round(series[field][visible], 2).tolist()
+        return result
+
+    @staticmethod
+    def _value(positions: List, tickers: List[str], dates: np.ndarray, closes: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute the daily series on the (dates x tickers) price matrix."""
+        days = len(dates)
+        columns = {ticker: i for i, ticker in enumerate(tickers)}
+
+        column = np.fromiter((columns[p.ticker] for p in positions), dtype=np.intp, count=len(positions))
+        entry_value = np.fromiter((p.entry_value_eur for p in positions), dtype=float, count=len(positions))
+        shares = entry_value / np.fromiter(
+            (p.entry_price_per_share for p in positions), dtype=float, count=len(positions)
+        )
+        entry_days = np.array([p.entry_date for p in positions], dtype='datetime64[D]')
+        entry_index = np.searchsorted(dates, entry_days)
+
+        # Open positions exit "after the end", index days falls off the axis
+        closed = np.array([p.exit_date is not None for p in positions])
+        exit_index = np.full(len(positions), days, dtype=np.intp)
+        exit_index[closed] = np.searchsorted(
+            dates, np.array([p.exit_date for p in positions if p.exit_date is not None], dtype='datetime64[D]')
+        )
+        profit = np.fromiter(
+            (p.profit_eur or 0.0 for p in positions), dtype=float, count=len(positions)
+        )
+
+        # Row `days` collects changes after the last date and is dropped
+        share_delta = np.zeros((days + 1, len(tickers)))
+        np.add.at(share_delta, (entry_index, column), shares)
+        np.add.at(share_delta, (exit_index, column), -shares)
+        cost_delta = np.zeros((days + 1, len(tickers)))
+        np.add.at(cost_delta, (entry_index, column), entry_value)
+        np.add.at(cost_delta, (exit_index, column), -entry_value)
+
+        holdings = np.cumsum(share_delta[:-1], axis=0)
+        cost = np.cumsum(cost_delta[:-1], axis=0)
+        prices = forward_fill(closes)
+        value = np.where(np.isnan(prices), cost, holdings * np.nan_to_num(prices))
+
+        market_value = value.sum(axis=1)
+        invested = cost.sum(axis=1)
+        realized = np.cumsum(np.bincount(exit_index[closed], weights=profit[closed], minlength=days + 1)[:-1])
+        held = np.cumsum(
+            np.bincount(entry_index, minlength=days + 1) - np.bincount(exit_index, minlength=days + 1)
+        )[:-1]
+
+        return {
+            "market_value": market_value,
+            "invested": invested,
+            "unrealized_pnl": market_value - invested,
+            "realized_pnl": realized,
+            "total_pnl": realized + market_value - invested,
+            "positions_held": held,
+        }
+
+    def _refresh(self, db: Session, positions: List, end: date) -> None:
+        """Fill cache gaps for every ticker over the span its positions were held."""
+        spans = {}
+        for p in positions:
+            last = min(p.exit_date or end, end)
+            first, latest = spans.get(p.ticker, (p.entry_date, last))
+            spans[p.ticker] = (min(first, p.entry_date), max(latest, last))
+        for ticker, (first, last) in spans.items():
+            if first > last:
+                continue
+            try:
+                self.price_history_service.get_price_series(
+                    db, ticker, (first - timedelta(days=PRICE_LOOKBACK_DAYS)).isoformat(), last.isoformat()
+                )
+            except Exception as e:
+                logger.warning(f"Could not refresh price history for {ticker}: {e}")
+
+    @staticmethod
+    def _empty(start: Optional[date], end: date) -> Dict:
+        result = {
+            "start_date": start.isoformat() if start else None,
+            "end_date": end.isoformat(),
+            "dates": [],
+            "positions_held": [],
+        }
+        result.update({field: [] for field in SERIES_FIELDS})
+        return result
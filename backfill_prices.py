@@ -0,0 +1,51 @@
+"""
+Backfill price history for every ticker in the watchlist and in positions.
+
+Run after a deploy so the first chart views are served from the cache:
+
+    python backfill_prices.py --years 5 --batch-size 20 --workers 4
+
+Safe to interrupt and re-run: tickers already covered are skipped.
+"""
+import argparse
+import logging
+
+from app.backfill_service import BackfillService
+from app.database import engine
+from app.migrations import run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill the price_history cache.")
+    parser.add_argument("--years", type=float, default=5, help="Years of history to load (default: 5)")
+    parser.add_argument("--start-date", help="First date (YYYY-MM-DD), overrides --years")
+    parser.add_argument("--end-date", help="Last date (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument("--batch-size", type=int, default=20, help="Symbols per batched download")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent batch downloads")
+    parser.add_argument("--tickers", nargs="*", help="Only these symbols instead of all known tickers")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    run_migrations(engine)
+    service = BackfillService(batch_size=args.batch_size, max_workers=args.workers)
+    status = service.run(
+        tickers=args.tickers,
+        years=args.years,
+        start_date=args.start_date,
+        end_date=args.end_date
+    )
+
+    print(f"\nBackfill {status['state']}: "
+          f"{status['tickers_done']} loaded, {status['tickers_skipped']} already cached, "
+          f"{status['tickers_failed']} failed")
+    print(f"{status['rows']} rows in {status['elapsed_seconds']}s ({status['rows_per_second']} rows/s)")
+    for error in status['errors']:
+        print(f"  ! {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks and load tests for Finsite. Run from the repository root with python -m."""
@@ -0,0 +1,115 @@
+"""Benchmark: portfolio equity curve over a cached price history.
+
+Seeds a database with daily closes for a set of tickers and a book of
+positions spread over the window, then times ValuationService.equity_curve
+(cache only, no downloads), and separately the price query and the array
+work it consists of.
+
+Usage:
+
+    python -m benchmarks.bench_equity_curve --positions 500 --tickers 100 --years 5
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Position, PriceHistory, create_sqlite_engine
+from app.valuation_service import PRICE_LOOKBACK_DAYS, ValuationService
+
+
+def _seed(engine, positions: int, tickers: int, years: int, end: date) -> None:
+    rng = random.Random(42)
+    symbols = [f"T{i:03d}" for i in range(tickers)]
+    start = end - timedelta(days=365 * years)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    days = [day for day in days if day.weekday() < 5]
+
+    prices = []
+    for symbol in symbols:
+        close = rng.uniform(20, 200)
+        for day in days:
+            close *= 1 + rng.gauss(0, 0.015)
+            prices.append({"ticker": symbol, "date": day, "close_price": close})
+
+    book = []
+    for _ in range(positions):
+        entry = rng.choice(days[:-1])
+        closed = rng.random() < 0.6
+        exit_day = min(entry + timedelta(days=rng.randrange(1, 500)), end) if closed else None
+        entry_value = rng.uniform(500, 5000)
+        profit = entry_value * rng.uniform(-0.3, 0.5) if closed else None
+        book.append({
+            "ticker": rng.choice(symbols),
+            "status": "CLOSED" if closed else "OPEN",
+            "entry_date": entry,
+            "entry_value_eur": entry_value,
+            "entry_price_per_share": rng.uniform(20, 200),
+            "entry_currency": "EUR",
+            "exit_date": exit_day,
+            "exit_value_eur": entry_value + profit if closed else None,
+            "exit_currency": "EUR" if closed else None,
+            "profit_eur": profit,
+            "profit_percent": profit / entry_value * 100 if closed else None,
+            "holding_period_days": (exit_day - entry).days if closed else None,
+        })
+
+    with engine.begin() as conn:
+        conn.execute(PriceHistory.__table__.insert(), prices)
+        conn.execute(Position.__table__.insert(), book)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=500)
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    end = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        _seed(engine, args.positions, args.tickers, args.years, end)
+
+        service = ValuationService()
+        start = end - timedelta(days=365 * args.years)
+        totals, queries, arrays = [], [], []
+        for _ in range(args.repeat):
+            with Session() as db:
+                started = time.perf_counter()
+                curve = service.equity_curve(db, start.isoformat(), end.isoformat())
+                totals.append(time.perf_counter() - started)
+
+                positions = db.query(
+                    Position.ticker, Position.entry_date, Position.exit_date, Position.entry_value_eur,
+                    Position.entry_price_per_share, Position.profit_eur
+                ).all()
+                tickers = sorted({p.ticker for p in positions})
+                started = time.perf_counter()
+                dates, closes = service.price_history_service.get_price_matrix(
+                    db, tickers, start - timedelta(days=PRICE_LOOKBACK_DAYS), end
+                )
+                queries.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                service._value(positions, tickers, dates, closes)
+                arrays.append(time.perf_counter() - started)
+        engine.dispose()
+
+    print(f"{args.positions} positions, {args.tickers} tickers, {args.years} years "
+          f"({len(curve['dates'])} days), best of {args.repeat}")
+    print(f"equity curve total   {min(totals) * 1000:8.1f} ms")
+    print(f"  price matrix query {min(queries) * 1000:8.1f} ms")
+    print(f"  valuation arrays   {min(arrays) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark: position queries with and without the composite indexes.
+
+Seeds a database with N positions (about a third of them open) plus their
+trades, then times the open/closed position queries and the per-trade
+lookup with the (status, ticker) and (position_id, trade_date) indexes
+dropped and again with them in place. Also compares the old strptime based
+holding period calculation with plain date arithmetic.
+
+Usage:
+
+    python -m benchmarks.bench_positions_indexes --positions 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Position, Trade, create_sqlite_engine
+
+TICKERS = [f"T{i:03d}" for i in range(200)]
+INDEXES = {
+    "ix_positions_status_ticker": "positions",
+    "ix_trades_position_id_trade_date": "trades",
+}
+
+
+def _seed(engine, count: int) -> None:
+    rng = random.Random(42)
+    positions, trades = [], []
+    for position_id in range(1, count + 1):
+        entry = date(2015, 1, 1) + timedelta(days=rng.randrange(3000))
+        closed = rng.random() < 0.67
+        exit_day = entry + timedelta(days=rng.randrange(1, 400)) if closed else None
+        ticker = rng.choice(TICKERS)
+        positions.append({
+            "id": position_id,
+            "ticker": ticker,
+            "status": "CLOSED" if closed else "OPEN",
+            "entry_date": entry,
+            "entry_value_eur": 1000.0,
+            "entry_price_per_share": 10.0,
+            "entry_currency": "EUR",
+            "exit_date": exit_day,
+            "exit_value_eur": 1000.0 * rng.uniform(0.5, 1.8) if closed else None,
+            "exit_currency": "EUR" if closed else None,
+        })
+        trades.append({
+            "position_id": position_id, "ticker": ticker, "trade_type": "BUY",
+            "trade_date": entry, "amount_eur": 1000.0, "price_per_share": 10.0, "currency": "EUR",
+        })
+        if closed:
+            trades.append({
+                "position_id": position_id, "ticker": ticker, "trade_type": "SELL",
+                "trade_date": exit_day, "amount_eur": 1000.0, "price_per_share": 10.0, "currency": "EUR",
+            })
+    with engine.begin() as conn:
+        conn.execute(Position.__table__.insert(), positions)
+        conn.execute(Trade.__table__.insert(), trades)
+
+
+def _time(func, repeat: int) -> float:
+    """Best wall time of a call in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def _queries(Session, count: int, repeat: int) -> dict:
+    rng = random.Random(7)
+    position_ids = [rng.randrange(1, count + 1) for _ in range(200)]
+
+    def open_positions():
+        with Session() as db:
+            db.query(Position).filter(Position.status == 'OPEN').all()
+
+    def closed_positions():
+        with Session() as db:
+            db.query(Position).filter(Position.status == 'CLOSED').all()
+
+    def open_for_ticker():
+        with Session() as db:
+            db.query(Position).filter(Position.status == 'OPEN', Position.ticker == 'T007').all()
+
+    def trades_for_positions():
+        with Session() as db:
+            for position_id in position_ids:
+                db.query(Trade).filter(Trade.position_id == position_id).order_by(Trade.trade_date).all()
+
+    return {
+        "open positions": _time(open_positions, repeat),
+        "closed positions": _time(closed_positions, repeat),
+        "open positions for ticker": _time(open_for_ticker, repeat),
+        "trades for 200 positions": _time(trades_for_positions, repeat),
+    }
+
+
+def _holding_periods(Session, repeat: int) -> dict:
+    with Session() as db:
+        rows = db.query(Position.entry_date, Position.exit_date).filter(Position.status == 'CLOSED').all()
+    as_strings = [(entry.isoformat(), exit_day.isoformat()) for entry, exit_day in rows]
+
+    def with_strptime():
+        for entry, exit_day in as_strings:
+            (datetime.strptime(exit_day, '%Y-%m-%d') - datetime.strptime(entry, '%Y-%m-%d')).days
+
+    def with_dates():
+        for entry, exit_day in rows:
+            (exit_day - entry).days
+
+    return {
+        f"holding periods, strptime ({len(rows)})": _time(with_strptime, repeat),
+        f"holding periods, date columns ({len(rows)})": _time(with_dates, repeat),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        _seed(engine, args.positions)
+
+        with engine.begin() as conn:
+            for name in INDEXES:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text("ANALYZE"))
+        without = _queries(Session, args.positions, args.repeat)
+
+        with engine.begin() as conn:
+            for index in (idx for table in INDEXES.values() for idx in Base.metadata.tables[table].indexes):
+                if index.name in INDEXES:
+                    index.create(bind=conn, checkfirst=True)
+            conn.execute(text("ANALYZE"))
+        with_indexes = _queries(Session, args.positions, args.repeat)
+
+        holding = _holding_periods(Session, args.repeat)
+        engine.dispose()
+
+    print(f"{args.positions} positions, best of {args.repeat} (ms)")
+    print(f"{'query':<34}{'no index':>10}{'indexed':>10}")
+    for name in without:
+        print(f"{name:<34}{without[name]:>10.1f}{with_indexes[name]:>10.1f}")
+    for name, elapsed in holding.items():
+        print(f"{name:<44}{elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark: SQL vs columnar price store for long histories.
+
+Seeds both stores with the same daily bars (10 years x 1,000 tickers by
+default) and times the reads PriceHistoryService does:
+
+- matrix: every ticker's closes on one date axis (get_price_matrix)
+- series: one ticker at a time as {day: close} (get_price_series' cache read)
+- slice:  the columnar store's zero-copy records() view, for reference
+
+Usage:
+
+    python -m benchmarks.bench_price_store --tickers 1000 --years 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PriceHistory, create_sqlite_engine
+from app.price_store import BAR_FIELDS, ColumnarPriceStore, SqlPriceStore
+
+
+def _bars(tickers: int, years: int, end: date):
+    rng = np.random.default_rng(42)
+    start = end - timedelta(days=365 * years)
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    days = [day for day in days if day.weekday() < 5]
+    for i in range(tickers):
+        closes = rng.uniform(20, 200) * np.cumprod(1 + rng.normal(0, 0.015, len(days)))
+        yield f"T{i:04d}", days, closes
+
+
+def _seed(engine, store: ColumnarPriceStore, tickers: int, years: int, end: date) -> int:
+    rows = 0
+    with engine.begin() as conn:
+        for ticker, days, closes in _bars(tickers, years, end):
+            bars = {key: closes.tolist() for key in ("open", "high", "low")}
+            bars["volume"] = [1000] * len(days)
+            conn.execute(PriceHistory.__table__.insert(), [
+                {"ticker": ticker, "date": day, "close_price": close,
+                 **{BAR_FIELDS[key][1]: values[j] for key, values in bars.items()}}
+                for j, (day, close) in enumerate(zip(days, closes.tolist()))
+            ])
+            store.write(None, ticker, days, closes.tolist(), bars)
+            rows += len(days)
+    return rows
+
+
+def _best(repeat: int, run) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", type=int, default=1000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    end = date.today()
+    start = end - timedelta(days=365 * args.years)
+    symbols = [f"T{i:04d}" for i in range(args.tickers)]
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        columnar = ColumnarPriceStore(os.path.join(tmp, "prices"))
+
+        started = time.perf_counter()
+        rows = _seed(engine, columnar, args.tickers, args.years, end)
+        print(f"seeded {rows} bars ({args.tickers} tickers x {args.years} years) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        sql = SqlPriceStore()
+        results = {}
+        with Session() as db:
+            for name, store in (("sql", sql), ("columnar", columnar)):
+                results[name] = (
+                    _best(args.repeat, lambda: store.read_matrix(db, symbols, start, end)),
+                    _best(args.repeat, lambda: [store.read(db, s, start, end) for s in symbols]),
+                )
+            # Cold columnar reads: a fresh store has to map every file first
+            cold = _best(args.repeat, lambda: ColumnarPriceStore(columnar.root).read_matrix(db, symbols, start, end))
+            zero_copy = _best(args.repeat, lambda: [columnar.records(s, start, end)["close"] for s in symbols])
+
+            sql_dates, sql_closes = sql.read_matrix(db, symbols, start, end)
+            col_dates, col_closes = columnar.read_matrix(db, symbols, start, end)
+            assert np.array_equal(sql_dates, col_dates) and np.allclose(sql_closes, col_closes, equal_nan=True)
+        engine.dispose()
+
+    print(f"best of {args.repeat}        matrix       series (per ticker)")
+    for name, (matrix, series) in results.items():
+        print(f"  {name:<10} {matrix * 1000:10.1f} ms {series * 1000:10.1f} ms "
+              f"({series / args.tickers * 1e6:.0f} us)")
+    print(f"  columnar, cold mappings  {cold * 1000:8.1f} ms matrix")
+    print(f"  columnar records() slices {zero_copy * 1000:7.1f} ms for all tickers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark: concurrent read/write throughput per SQLite storage profile.
+
+For each profile a fresh database file is created and seeded, then writer
+threads insert price batches (like chart backfills) while reader threads run
+price range queries (like chart requests) for a fixed duration. Reports
+operations per second and how many operations failed with
+"database is locked".
+
+Usage:
+
+    python -m benchmarks.bench_sqlite_profile --seconds 10 --writers 4 --readers 8
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, PriceHistory, SQLITE_PROFILES, create_sqlite_engine
+from app.price_history_service import PriceHistoryService
+
+TICKERS = [f"T{i:03d}" for i in range(50)]
+SEED_DAYS = 500
+
+
+def _dates(start: date, count: int):
+    return [start + timedelta(days=i) for i in range(count)]
+
+
+def _seed(Session, service: PriceHistoryService) -> None:
+    db = Session()
+    try:
+        dates = _dates(date(2015, 1, 1), SEED_DAYS)
+        for ticker in TICKERS:
+            service.store_prices(db, ticker, {"date": dates, "close": [100.0] * len(dates)})
+    finally:
+        db.close()
+
+
+def _writer(Session, service, stop, counters, seed):
+    rng = random.Random(seed)
+    db = Session()
+    try:
+        while not stop.is_set():
+            ticker = rng.choice(TICKERS)
+            start = date(2017, 1, 1) + timedelta(days=rng.randrange(3000))
+            dates = _dates(start, 20)
+            try:
+                service.store_prices(db, ticker, {"date": dates, "close": [101.0] * len(dates)})
+                counters["writes"] += 1
+            except OperationalError:
+                counters["write_errors"] += 1
+    finally:
+        db.close()
+
+
+def _reader(Session, service, stop, counters, seed):
+    rng = random.Random(seed)
+    db = Session()
+    try:
+        while not stop.is_set():
+            ticker = rng.choice(TICKERS)
+            start = date(2015, 1, 1) + timedelta(days=rng.randrange(SEED_DAYS - 120))
+            end = start + timedelta(days=120)
+            try:
+                db.execute(
+                    select(PriceHistory.date, PriceHistory.close_price).where(
+                        PriceHistory.ticker == ticker,
+                        PriceHistory.date >= start,
+                        PriceHistory.date <= end,
+                    )
+                ).fetchall()
+                db.commit()
+                counters["reads"] += 1
+            except OperationalError:
+                db.rollback()
+                counters["read_errors"] += 1
+    finally:
+        db.close()
+
+
+def run_profile(profile: str, seconds: float, writers: int, readers: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", profile=profile)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        service = PriceHistoryService()
+        _seed(Session, service)
+
+        # One counter dict per thread, summed at the end
+        per_thread = [
+            {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+            for _ in range(writers + readers)
+        ]
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=_writer, args=(Session, service, stop, per_thread[i], i))
+            for i in range(writers)
+        ] + [
+            threading.Thread(target=_reader, args=(Session, service, stop, per_thread[writers + i], 1000 + i))
+            for i in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    totals = {key: sum(counters[key] for counters in per_thread) for key in per_thread[0]}
+    return {key: value if key.endswith("errors") else value / seconds for key, value in totals.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--profiles", nargs="*", default=sorted(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile")
+    print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read err':>10}{'write err':>10}")
+    for profile in args.profiles:
+        result = run_profile(profile, args.seconds, args.writers, args.readers)
+        print(
+            f"{profile:<12}{result['reads']:>10.0f}{result['writes']:>10.0f}"
+            f"{result['read_errors']:>10}{result['write_errors']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
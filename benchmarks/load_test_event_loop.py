@@ -0,0 +1,91 @@
+"""Load test: /api/tickers latency while /api/ticker-info calls are slow.
+
+Simulates a slow Yahoo Finance by putting a LocalProvider with the given
+latency behind the provider gateway (no network needed), fires a burst of
+/api/ticker-info requests and, at the same time, measures the latency of
+/api/tickers. With blocking work offloaded to the provider thread pool the
+p99 of /api/tickers stays flat; if provider calls ran on the event loop it
+would grow to roughly the provider delay.
+
+Requires httpx (pip install -r requirements-dev.txt). Usage:
+
+    python -m benchmarks.load_test_event_loop --provider-delay 2 --slow-requests 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app import main
+from app.concurrency import configure_thread_pools
+from app.database import engine
+from app.migrations import run_migrations
+from app.provider_gateway import provider_gateway
+from app.providers import LocalProvider
+
+
+def _percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _measure_tickers(client: httpx.AsyncClient, count: int, interval: float):
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        response = await client.get("/api/tickers")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def run(provider_delay: float, slow_requests: int, samples: int, interval: float) -> int:
+    provider_gateway.provider = LocalProvider(latency=provider_delay)
+    run_migrations(engine)
+    configure_thread_pools()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        baseline = await _measure_tickers(client, samples, interval)
+
+        slow = [
+            asyncio.create_task(client.get(f"/api/ticker-info/SYM{i}"))
+            for i in range(slow_requests)
+        ]
+        await asyncio.sleep(0.05)
+        under_load = await _measure_tickers(client, samples, interval)
+        await asyncio.gather(*slow)
+
+    print(f"provider delay: {provider_delay:.2f}s, concurrent slow requests: {slow_requests}")
+    print(f"{'':<12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, data in (("baseline", baseline), ("under load", under_load)):
+        print(
+            f"{label:<12}{statistics.median(data):>10.1f}"
+            f"{_percentile(data, 99):>10.1f}{max(data):>10.1f}"
+        )
+
+    # Latency under load must stay well below the provider delay
+    if _percentile(under_load, 99) > provider_delay * 1000 / 4:
+        print("FAIL: /api/tickers latency tracks the slow provider")
+        return 1
+    print("OK: /api/tickers latency is independent of provider latency")
+    return 0
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--provider-delay", type=float, default=2.0, help="Seconds per provider request")
+    parser.add_argument("--slow-requests", type=int, default=50, help="Concurrent /api/ticker-info requests")
+    parser.add_argument("--samples", type=int, default=100, help="/api/tickers requests per phase")
+    parser.add_argument("--interval", type=float, default=0.01, help="Pause between /api/tickers requests")
+    args = parser.parse_args()
+    return asyncio.run(run(args.provider_delay, args.slow_requests, args.samples, args.interval))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main_cli())
@@ -0,0 +1,52 @@
+"""
+Check the stored realized P&L of closed positions.
+
+Profit, profit percent and holding days are stored on each position when it
+is closed. This recomputes them from the entry/exit values and dates and
+reports rows that disagree:
+
+    python check_pnl.py            # report mismatches
+    python check_pnl.py --repair   # also overwrite them with recomputed values
+
+Exits with status 1 when mismatches were found and not repaired.
+"""
+import argparse
+import logging
+import sys
+
+from app.database import SessionLocal, engine
+from app.migrations import run_migrations
+from app.position_service import PositionService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check stored realized P&L of closed positions.")
+    parser.add_argument("--repair", action="store_true", help="Overwrite mismatching rows")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        mismatches = PositionService().check_realized_pnl(db, repair=args.repair)
+    finally:
+        db.close()
+
+    for mismatch in mismatches:
+        print(f"  ! position {mismatch['id']} ({mismatch['ticker']}): "
+              f"stored {mismatch['stored']}, expected {mismatch['expected']}")
+    if not mismatches:
+        print("All closed positions are consistent.")
+    elif args.repair:
+        print(f"Repaired {len(mismatches)} positions.")
+    else:
+        print(f"{len(mismatches)} positions are inconsistent; run with --repair to fix them.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
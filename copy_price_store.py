@@ -0,0 +1,60 @@
+"""
+Copy cached price bars from the price_history table into the columnar store.
+
+Run once before switching a deployment to FINSITE_PRICE_STORE=columnar:
+
+    python copy_price_store.py                     # into data/prices
+    python copy_price_store.py --path /srv/prices  # or FINSITE_PRICE_STORE_PATH
+
+Coverage and non-trading days stay in the database and are shared by both
+stores. Safe to re-run: bars already in the columnar store are overwritten
+with the database values.
+"""
+import argparse
+import logging
+
+from sqlalchemy import select
+
+from app.database import PriceHistory, SessionLocal, engine
+from app.migrations import run_migrations
+from app.price_store import BAR_FIELDS, create_price_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy price_history into the columnar price store.")
+    parser.add_argument("--path", help="Columnar store directory (default: FINSITE_PRICE_STORE_PATH or data/prices)")
+    parser.add_argument("--tickers", nargs="*", help="Only these symbols instead of every cached ticker")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    run_migrations(engine)
+    store = create_price_store("columnar", args.path)
+    bar_columns = [getattr(PriceHistory, column) for _, column in BAR_FIELDS.values()]
+    db = SessionLocal()
+    try:
+        tickers = args.tickers or db.scalars(select(PriceHistory.ticker).distinct()).all()
+        total = 0
+        for ticker in sorted(ticker.upper().strip() for ticker in tickers):
+            rows = db.execute(
+                select(PriceHistory.date, PriceHistory.close_price, *bar_columns)
+                .where(PriceHistory.ticker == ticker)
+                .order_by(PriceHistory.date)
+            ).all()
+            if not rows:
+                continue
+            dates, closes, *values = zip(*rows)
+            store.write(db, ticker, list(dates), list(closes), dict(zip(BAR_FIELDS, values)), update=True)
+            total += len(rows)
+            print(f"  {ticker}: {len(rows)} bars")
+    finally:
+        db.close()
+
+    print(f"\nCopied {total} bars for {len(tickers)} tickers to {store.root}")
+
+
+if __name__ == "__main__":
+    main()
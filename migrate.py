@@ -0,0 +1,44 @@
+"""
+Apply pending database schema migrations.
+
+The application also migrates on startup; run this to upgrade a database
+ahead of a deploy or to check its current version:
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # show the current and latest version
+"""
+import argparse
+import logging
+
+from app.database import engine
+from app.migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, run_migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending Finsite schema migrations.")
+    parser.add_argument("--status", action="store_true", help="Only show the schema version")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"Schema version: {current} (latest: {LATEST_VERSION})")
+
+    if args.status:
+        for migration in MIGRATIONS:
+            state = "applied" if migration.version <= current else "pending"
+            print(f"  {migration.version:>3}  {state:<8} {migration.description}")
+        return
+
+    version = run_migrations(engine)
+    print(f"\nMigration completed successfully! Schema version: {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 """
 Migration script for v1.1 - Add price_history table
+
+Superseded by the versioned migrations in app/migrations.py; kept so that
+existing upgrade instructions keep working. Use migrate.py instead.
 """
-from app.database import Base, engine
-from sqlalchemy import text
+from app.database import engine
+from app.migrations import run_migrations
 
 def migrate():
-    """Run migration to add price_history table."""
+    """Run all pending schema migrations (includes the price_history table)."""
     print("Starting migration for v1.1 - Chart feature...")
     
-    # Create price_history table
-    Base.metadata.create_all(engine)
-    print("✓ price_history table created")
+    version = run_migrations(engine)
+    print(f"✓ Database schema at version {version}")
     
     print("\nMigration completed successfully!")
     print("You can now use the chart feature for closed positions.")
@@ -0,0 +1,79 @@
+"""
+Record market data fixtures for the offline provider.
+
+Saves the daily history (<SYMBOL>.csv) and `.info` payload (<SYMBOL>.json)
+of each ticker from Yahoo Finance, so benchmarks and load tests can replay
+them without network access:
+
+    python record_fixtures.py --years 10 --path data/fixtures
+    FINSITE_PROVIDER=local FINSITE_PROVIDER_FIXTURES=data/fixtures python -m uvicorn app.main:app
+
+Without --tickers every ticker in the watchlist and in positions is recorded.
+Existing fixture files are overwritten.
+"""
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from app.backfill_service import BackfillService
+from app.database import SessionLocal, engine
+from app.migrations import run_migrations
+from app.providers import LocalProvider, YFinanceProvider
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record market data fixtures for FINSITE_PROVIDER=local.")
+    parser.add_argument("--path", default="data/fixtures", help="Fixture directory (default: data/fixtures)")
+    parser.add_argument("--years", type=float, default=10, help="Years of history to record (default: 10)")
+    parser.add_argument("--tickers", nargs="*", help="Only these symbols instead of all known tickers")
+    parser.add_argument("--no-info", action="store_true", help="Skip the .info payloads")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    tickers = args.tickers
+    if not tickers:
+        run_migrations(engine)
+        db = SessionLocal()
+        try:
+            tickers = BackfillService().collect_tickers(db)
+        finally:
+            db.close()
+
+    os.makedirs(args.path, exist_ok=True)
+    provider = YFinanceProvider()
+    # Same file names the local provider looks for
+    paths = LocalProvider(fixtures_dir=args.path)
+    start = (datetime.now() - timedelta(days=int(args.years * 365))).strftime('%Y-%m-%d')
+    end = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    recorded = 0
+    for ticker in sorted({ticker.upper().strip() for ticker in tickers}):
+        try:
+            hist = provider.history(ticker, start=start, end=end)
+            if hist.empty:
+                print(f"  ! {ticker}: no history")
+                continue
+            hist.index = hist.index.strftime('%Y-%m-%d')
+            hist.index.name = 'Date'
+            hist.to_csv(paths.fixture_path(ticker, '.csv'))
+
+            if not args.no_info:
+                with open(paths.fixture_path(ticker, '.json'), 'w') as handle:
+                    json.dump(provider.info(ticker), handle, indent=1, default=str)
+        except Exception as e:
+            print(f"  ! {ticker}: {e}")
+            continue
+        recorded += 1
+        print(f"  {ticker}: {len(hist)} bars")
+
+    print(f"\nRecorded {recorded} of {len(tickers)} tickers to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
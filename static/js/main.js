@@ -9,6 +9,10 @@ let selectedTicker = null;
 let isValidated = false;
 let currentView = 'watchlist';
 let selectedPosition = null;
+let closedNextCursor = null;
+
+// Price line points per chart; longer histories are downsampled server-side
+const CHART_MAX_POINTS = 800;
 
 // API endpoints
 const API = {
@@ -18,7 +22,8 @@ const API = {
     positionsOpen: '/api/positions/open',
     positionsClosed: '/api/positions/closed',
     positionClose: (id) => `/api/positions/${id}/close`,
-    positionChartData: (id) => `/api/positions/${id}/chart-data`
+    quoteStream: '/api/stream/quotes',
+    positionChartData: (id) => `/api/positions/${id}/chart-data?format=columnar&max_points=${CHART_MAX_POINTS}`
 };
 
 // DOM elements
@@ -47,6 +52,16 @@ const elements = {
     openPositionsList: document.getElementById('openPositionsList'),
     closedPositionsList: document.getElementById('closedPositionsList'),
     
+    // Closed position filters
+    closedFilters: document.getElementById('closedFilters'),
+    closedFilterTicker: document.getElementById('closedFilterTicker'),
+    closedFilterFrom: document.getElementById('closedFilterFrom'),
+    closedFilterTo: document.getElementById('closedFilterTo'),
+    closedFilterPnl: document.getElementById('closedFilterPnl'),
+    closedSort: document.getElementById('closedSort'),
+    closedOrder: document.getElementById('closedOrder'),
+    closedLoadMore: document.getElementById('closedLoadMore'),
+    
     // Modals
     buyModal: document.getElementById('buyModal'),
     buyModalTicker: document.getElementById('buyModalTicker'),
@@ -86,6 +101,7 @@ const elements = {
 document.addEventListener('DOMContentLoaded', () => {
     initializeEventListeners();
     loadTickers();
+    startQuoteStream();
 });
 
 // Event Listeners
@@ -133,6 +149,13 @@ function initializeEventListeners() {
         if (e.target === elements.chartModal) closeChartModal();
     });
     
+    // Closed position filters and paging
+    elements.closedFilters.addEventListener('submit', (e) => {
+        e.preventDefault();
+        loadClosedPositions();
+    });
+    elements.closedLoadMore.addEventListener('click', () => loadClosedPositions(true));
+    
     // Set default date to today
     const today = new Date().toISOString().split('T')[0];
     elements.buyDate.value = today;
@@ -364,7 +387,7 @@ function renderTickerInfo(info) {
         </div>
         
         <div class="price-section">
-            <div class="current-price">
+            <div class="current-price" data-live-symbol="${info.symbol}" data-currency="${info.currency || '$'}">
                 ${info.currency || '$'}${formatNumber(info.current_price, 2)}
             </div>
             ${info.change !== null ? `
@@ -559,20 +582,14 @@ function renderOpenPositions(positions) {
             </thead>
             <tbody>
                 ${positions.map(pos => `
-                    <tr>
+                    <tr data-position-id="${pos.id}" data-currency="${pos.entry_currency}">
                         <td><strong>${pos.ticker}</strong></td>
                         <td>${pos.entry_date}</td>
                         <td>€${formatNumber(pos.entry_value_eur, 2)}</td>
                         <td>${pos.entry_price_per_share} ${pos.entry_currency}</td>
-                        <td>${pos.current_price_per_share ? formatNumber(pos.current_price_per_share, 2) + ' ' + pos.entry_currency : 'N/A'}</td>
-                        <td>${pos.current_value_eur ? '€' + formatNumber(pos.current_value_eur, 2) : 'N/A'}</td>
-                        <td>
-                            ${pos.unrealized_profit_eur !== null ? `
-                                <span class="${pos.unrealized_profit_eur >= 0 ? 'profit-positive' : 'profit-negative'}">
-                                    €${formatNumber(pos.unrealized_profit_eur, 2)} (${formatNumber(pos.unrealized_profit_percent, 2)}%)
-                                </span>
-                            ` : 'N/A'}
-                        </td>
+                        <td data-field="price">${currentPriceCell(pos.current_price_per_share, pos.entry_currency)}</td>
+                        <td data-field="value">${currentValueCell(pos.current_value_eur)}</td>
+                        <td data-field="pnl">${unrealizedPnlCell(pos.unrealized_profit_eur, pos.unrealized_profit_percent)}</td>
                         <td>
                             <button class="btn btn-secondary btn-chart" onclick="openChartModal(${pos.id}, '${pos.ticker}')">
                                 Chart
@@ -588,6 +605,60 @@ function renderOpenPositions(positions) {
     `;
 }
 
+function currentPriceCell(price, currency) {
+    return price ? formatNumber(price, 2) + ' ' + currency : 'N/A';
+}
+
+function currentValueCell(value) {
+    return value ? '€' + formatNumber(value, 2) : 'N/A';
+}
+
+function unrealizedPnlCell(profit, percent) {
+    if (profit === null || profit === undefined) return 'N/A';
+    return `
+        <span class="${profit >= 0 ? 'profit-positive' : 'profit-negative'}">
+            €${formatNumber(profit, 2)} (${formatNumber(percent, 2)}%)
+        </span>
+    `;
+}
+
+// Live Quotes: the server pushes a full snapshot on connect and then only
+// changed quotes and open position valuations; EventSource reconnects itself
+function startQuoteStream() {
+    if (!window.EventSource) return;
+    
+    const stream = new EventSource(API.quoteStream);
+    const onMessage = (e) => applyQuoteDelta(JSON.parse(e.data));
+    stream.addEventListener('snapshot', onMessage);
+    stream.addEventListener('quotes', onMessage);
+}
+
+function applyQuoteDelta(delta) {
+    Object.entries(delta.quotes).forEach(([symbol, price]) => {
+        document.querySelectorAll(`.current-price[data-live-symbol="${symbol}"]`).forEach(el => {
+            if (price) el.textContent = `${el.dataset.currency}${formatNumber(price, 2)}`;
+        });
+    });
+    
+    Object.entries(delta.positions).forEach(([id, values]) => {
+        const row = elements.openPositionsList.querySelector(`tr[data-position-id="${id}"]`);
+        if (!row) return;
+        row.querySelector('[data-field="price"]').innerHTML = currentPriceCell(values.current_price_per_share, row.dataset.currency);
+        row.querySelector('[data-field="value"]').innerHTML = currentValueCell(values.current_value_eur);
+        row.querySelector('[data-field="pnl"]').innerHTML = unrealizedPnlCell(values.unrealized_profit_eur, values.unrealized_profit_percent);
+    });
+
+    // Closed or deleted elsewhere (e.g. in another tab)
+    const removed = delta.removed_positions || [];
+    removed.forEach(id => {
+        const row = elements.openPositionsList.querySelector(`tr[data-position-id="${id}"]`);
+        if (row) row.remove();
+    });
+    if (removed.length && !elements.openPositionsList.querySelector('tr[data-position-id]')) {
+        renderOpenPositions([]);
+    }
+}
+
 // Sell Modal Functions
 window.openSellModal = function(positionId, ticker, entryDate, entryValue, entryPrice, entryCurrency) {
     selectedPosition = positionId;
@@ -646,13 +717,41 @@ async function handleSellSubmit(e) {
 }
 
 // Load Closed Positions
-async function loadClosedPositions() {
+function closedPositionsQuery(cursor) {
+    const params = new URLSearchParams({
+        sort: elements.closedSort.value,
+        order: elements.closedOrder.value
+    });
+    const filters = {
+        ticker: elements.closedFilterTicker.value.trim(),
+        from_date: elements.closedFilterFrom.value,
+        to_date: elements.closedFilterTo.value,
+        pnl: elements.closedFilterPnl.value
+    };
+    Object.entries(filters).forEach(([key, value]) => {
+        if (value) params.set(key, value);
+    });
+    if (cursor) params.set('cursor', cursor);
+    return `${API.positionsClosed}?${params}`;
+}
+
+async function loadClosedPositions(append = false) {
     showLoading();
     
     try {
-        const response = await fetch(API.positionsClosed);
-        const positions = await response.json();
-        renderClosedPositions(positions);
+        const response = await fetch(closedPositionsQuery(append ? closedNextCursor : null));
+        const page = await response.json();
+        if (!response.ok) {
+            showError(page.detail || 'Failed to load closed positions');
+            return;
+        }
+        closedNextCursor = page.next_cursor;
+        if (append) {
+            appendClosedPositions(page.items);
+        } else {
+            renderClosedPositions(page.items);
+        }
+        elements.closedLoadMore.classList.toggle('hidden', !closedNextCursor);
     } catch (error) {
         showError('Failed to load closed positions');
         elements.closedPositionsList.innerHTML = `
@@ -667,7 +766,7 @@ function renderClosedPositions(positions) {
     if (positions.length === 0) {
         elements.closedPositionsList.innerHTML = `
             <div class="no-positions">
-                No closed positions yet.
+                No closed positions found.
             </div>
         `;
         return;
@@ -689,39 +788,52 @@ function renderClosedPositions(positions) {
                 </tr>
             </thead>
             <tbody>
-                ${positions.map(pos => `
-                    <tr>
-                        <td><strong>${pos.ticker}</strong></td>
-                        <td>${pos.entry_date}</td>
-                        <td>€${formatNumber(pos.entry_value_eur, 2)}</td>
-                        <td>${pos.exit_date}</td>
-                        <td>€${formatNumber(pos.exit_value_eur, 2)}</td>
-                        <td>
-                            <span class="${pos.profit_eur >= 0 ? 'profit-positive' : 'profit-negative'}">
-                                €${formatNumber(pos.profit_eur, 2)}
-                            </span>
-                        </td>
-                        <td>
-                            <span class="${pos.profit_percent >= 0 ? 'profit-positive' : 'profit-negative'}">
-                                ${formatNumber(pos.profit_percent, 2)}%
-                            </span>
-                        </td>
-                        <td>${pos.holding_period_days}</td>
-                        <td>
-                            <button class="btn btn-secondary btn-chart" onclick="openChartModal(${pos.id}, '${pos.ticker}')">
-                                Chart
-                            </button>
-                            <button class="btn btn-danger" onclick="deleteClosedPosition(${pos.id}, '${pos.ticker}')">
-                                Delete
-                            </button>
-                        </td>
-                    </tr>
-                `).join('')}
+                ${positions.map(closedPositionRow).join('')}
             </tbody>
         </table>
     `;
 }
 
+function appendClosedPositions(positions) {
+    const tbody = elements.closedPositionsList.querySelector('tbody');
+    if (!tbody) {
+        renderClosedPositions(positions);
+        return;
+    }
+    tbody.insertAdjacentHTML('beforeend', positions.map(closedPositionRow).join(''));
+}
+
+function closedPositionRow(pos) {
+    return `
+        <tr>
+            <td><strong>${pos.ticker}</strong></td>
+            <td>${pos.entry_date}</td>
+            <td>€${formatNumber(pos.entry_value_eur, 2)}</td>
+            <td>${pos.exit_date}</td>
+            <td>€${formatNumber(pos.exit_value_eur, 2)}</td>
+            <td>
+                <span class="${pos.profit_eur >= 0 ? 'profit-positive' : 'profit-negative'}">
+                    €${formatNumber(pos.profit_eur, 2)}
+                </span>
+            </td>
+            <td>
+                <span class="${pos.profit_percent >= 0 ? 'profit-positive' : 'profit-negative'}">
+                    ${formatNumber(pos.profit_percent, 2)}%
+                </span>
+            </td>
+            <td>${pos.holding_period_days}</td>
+            <td>
+                <button class="btn btn-secondary btn-chart" onclick="openChartModal(${pos.id}, '${pos.ticker}')">
+                    Chart
+                </button>
+                <button class="btn btn-danger" onclick="deleteClosedPosition(${pos.id}, '${pos.ticker}')">
+                    Delete
+                </button>
+            </td>
+        </tr>
+    `;
+}
+
 // Delete Closed Position
 window.deleteClosedPosition = async function(positionId, ticker) {
     if (!confirm(`Delete closed position for ${ticker}?`)) {
@@ -791,8 +903,8 @@ function renderChart(data) {
     elements.chartContainer.classList.remove('hidden');
     
     // Prepare data for Plotly
-    const dates = data.prices.map(p => p.date);
-    const prices = data.prices.map(p => p.close);
+    const dates = data.dates;
+    const prices = data.closes;
     
     // Main price line
     const priceTrace = {
@@ -0,0 +1,34 @@
+"""Shared fixtures: tests run against a throwaway SQLite database and the offline provider."""
+
+import os
+import tempfile
+
+# Read when app.config / app.database are imported, so set before any app import
+_DATA_DIR = tempfile.mkdtemp(prefix="finsite-tests-")
+os.environ["FINSITE_DATABASE_URL"] = f"sqlite:///{os.path.join(_DATA_DIR, 'finsite.db')}"
+os.environ["FINSITE_PROVIDER"] = "local"
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from app.database import engine
+    from app.migrations import run_migrations
+    run_migrations(engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    """A session on the test database; every table is emptied afterwards."""
+    from app.database import Base, SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
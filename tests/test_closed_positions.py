@@ -0,0 +1,129 @@
+"""Tests for keyset pagination of closed positions."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.database import Position
+from app.position_service import PositionService
+
+
+@pytest.fixture
+def service():
+    return PositionService()
+
+
+def add_closed(db, ticker, exit_day, profit, profit_percent=None, holding_days=None, entry_value=1000.0):
+    exit_date = date(2024, 1, 1) + timedelta(days=exit_day)
+    position = Position(
+        ticker=ticker,
+        status='CLOSED',
+        entry_date=exit_date - timedelta(days=holding_days or 10),
+        entry_value_eur=entry_value,
+        entry_price_per_share=100.0,
+        entry_currency='EUR',
+        exit_date=exit_date,
+        exit_value_eur=entry_value + profit,
+        exit_currency='EUR',
+        profit_eur=profit,
+        profit_percent=profit_percent,
+        holding_period_days=holding_days,
+    )
+    db.add(position)
+    db.commit()
+    return position.id
+
+
+def all_pages(service, db, limit, **kwargs):
+    """Follow next_cursor to the end; returns the id pages."""
+    pages = []
+    cursor = None
+    while True:
+        page = service.get_closed_positions(db, limit=limit, cursor=cursor, **kwargs)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+        assert len(pages) < 50
+
+
+def test_ties_on_the_sort_key_are_paged_by_id(service, db):
+    # Five positions closed on the same day, two on another
+    same_day = [add_closed(db, "AAPL", 5, 10.0, 1.0, 10) for _ in range(5)]
+    other_day = [add_closed(db, "MSFT", 3, 10.0, 1.0, 10) for _ in range(2)]
+
+    pages = all_pages(service, db, limit=2, sort='exit_date', order='desc')
+
+    assert pages == [same_day[::-1][0:2], same_day[::-1][2:4], [same_day[0], other_day[1]], [other_day[0]]]
+
+    pages = all_pages(service, db, limit=3, sort='exit_date', order='asc')
+    assert pages == [other_day + same_day[:1], same_day[1:4], same_day[4:]]
+
+
+def test_descending_order(service, db):
+    ids = {profit: add_closed(db, "AAPL", day, profit, profit / 10, 10) for day, profit in enumerate([5.0, -20.0, 30.0, 0.0])}
+
+    pages = all_pages(service, db, limit=3, sort='profit', order='desc')
+    assert pages == [[ids[30.0], ids[5.0], ids[0.0]], [ids[-20.0]]]
+
+    items = service.get_closed_positions(db, limit=10, sort='profit', order='desc')["items"]
+    profits = [item["profit_eur"] for item in items]
+    assert profits == sorted(profits, reverse=True)
+
+
+@pytest.mark.parametrize("order", ['asc', 'desc'])
+@pytest.mark.parametrize("sort,field", [('profit_percent', 'profit_percent'), ('holding_days', 'holding_period_days')])
+def test_nulls_come_last_and_are_paged(service, db, sort, field, order):
+    values = [2, None, 1, None, 2, None, 3]
+    ids = []
+    for day, value in enumerate(values):
+        kwargs = {'profit_percent': 1.0, 'holding_days': 10}
+        kwargs['profit_percent' if sort == 'profit_percent' else 'holding_days'] = value
+        ids.append(add_closed(db, "AAPL", day, 10.0, **kwargs))
+
+    pages = all_pages(service, db, limit=2, sort=sort, order=order)
+    seen = [position_id for page in pages for position_id in page]
+
+    by_value = sorted(
+        ((value, position_id) for value, position_id in zip(values, ids) if value is not None),
+        reverse=order == 'desc'
+    )
+    nulls = sorted((position_id for value, position_id in zip(values, ids) if value is None), reverse=order == 'desc')
+    assert seen == [position_id for _, position_id in by_value] + nulls
+
+    items = service.get_closed_positions(db, limit=10, sort=sort, order=order)["items"]
+    assert [item[field] for item in items][-3:] == [None, None, None]
+
+
+def test_last_page_has_no_cursor(service, db):
+    for day in range(4):
+        add_closed(db, "AAPL", day, 10.0, 1.0, 10)
+
+    first = service.get_closed_positions(db, limit=2)
+    assert first["next_cursor"]
+    second = service.get_closed_positions(db, limit=2, cursor=first["next_cursor"])
+    assert len(second["items"]) == 2
+    assert second["next_cursor"] is None
+
+    # A page that exactly fits everything needs no cursor either
+    assert service.get_closed_positions(db, limit=4)["next_cursor"] is None
+    assert service.get_closed_positions(db, limit=5)["next_cursor"] is None
+
+
+def test_open_positions_and_filters_are_excluded_from_pages(service, db):
+    add_closed(db, "AAPL", 0, 10.0, 1.0, 10)
+    loss = add_closed(db, "AAPL", 1, -10.0, -1.0, 10)
+    add_closed(db, "MSFT", 2, -5.0, -0.5, 10)
+    db.add(Position(
+        ticker="AAPL", status='OPEN', entry_date=date(2024, 1, 1), entry_value_eur=1000.0,
+        entry_price_per_share=100.0, entry_currency='EUR'
+    ))
+    db.commit()
+
+    pages = all_pages(service, db, limit=1, ticker="aapl", pnl='loss')
+    assert pages == [[loss]]
+
+
+def test_invalid_cursor_is_rejected(service, db):
+    with pytest.raises(ValueError):
+        service.get_closed_positions(db, cursor="not-a-cursor")
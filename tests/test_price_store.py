@@ -0,0 +1,182 @@
+"""Tests for the columnar price store: appends, merges, range reads and the copy from SQL."""
+
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.price_store import RECORD_DTYPE, ColumnarPriceStore, SqlPriceStore
+
+D = date(2024, 1, 1)
+
+
+def days(*offsets):
+    return [D + timedelta(days=offset) for offset in offsets]
+
+
+def bars_for(dates, open_price=1.0):
+    return {"open": [open_price] * len(dates), "volume": [100] * len(dates)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ColumnarPriceStore(str(tmp_path / "prices"))
+
+
+def stored_days(store, ticker):
+    return store.records(ticker)["date"].astype('datetime64[D]').tolist()
+
+
+def test_write_after_last_date_appends_in_place(store):
+    store.write(None, "AAPL", days(0, 1, 2), [1.0, 2.0, 3.0], bars_for(days(0, 1, 2)))
+    inode = os.stat(store.path("AAPL")).st_ino
+
+    store.write(None, "AAPL", days(4, 3), [5.0, 4.0], bars_for(days(4, 3)))
+
+    assert os.stat(store.path("AAPL")).st_ino == inode
+    assert os.path.getsize(store.path("AAPL")) == 5 * RECORD_DTYPE.itemsize
+    assert stored_days(store, "AAPL") == days(0, 1, 2, 3, 4)
+    assert store.records("AAPL")["close"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_append_drops_partial_record_from_interrupted_write(store):
+    store.write(None, "AAPL", days(0), [1.0], bars_for(days(0)))
+    with open(store.path("AAPL"), 'ab') as handle:
+        handle.write(b"\x01\x02\x03")
+    assert len(store.records("AAPL")) == 1
+
+    store.write(None, "AAPL", days(1), [2.0], bars_for(days(1)))
+    assert stored_days(store, "AAPL") == days(0, 1)
+    assert store.records("AAPL")["close"].tolist() == [1.0, 2.0]
+
+
+def test_backdated_write_merges_and_keeps_existing_closes(store):
+    store.write(None, "AAPL", days(2, 3, 4), [3.0, 4.0, 5.0], bars_for(days(2, 3, 4)))
+    inode = os.stat(store.path("AAPL")).st_ino
+
+    # Overlaps day 3, adds days 0 and 1 before the stored range
+    store.write(None, "AAPL", days(0, 1, 3), [1.0, 2.0, 40.0], bars_for(days(0, 1, 3), open_price=9.0))
+
+    assert os.stat(store.path("AAPL")).st_ino != inode
+    assert stored_days(store, "AAPL") == days(0, 1, 2, 3, 4)
+    records = store.records("AAPL")
+    assert records["close"].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert records["open"].tolist() == [9.0, 9.0, 1.0, 1.0, 1.0]
+    assert not [name for name in os.listdir(store.root) if name.endswith('.tmp')]
+
+
+def test_merge_fills_bars_of_close_only_records(store):
+    store.write(None, "AAPL", days(0, 1), [1.0, 2.0], {})
+    closes, incomplete = store.read(None, "AAPL", D, D + timedelta(days=1))
+    assert incomplete == set(days(0, 1))
+
+    store.write(None, "AAPL", days(1), [20.0], bars_for(days(1), open_price=2.5))
+
+    closes, incomplete = store.read(None, "AAPL", D, D + timedelta(days=1))
+    assert closes == {days(0)[0]: 1.0, days(1)[0]: 2.0}
+    assert incomplete == set(days(0))
+    assert store.records("AAPL")["open"][1] == 2.5
+
+
+def test_update_overwrites_existing_records(store):
+    store.write(None, "AAPL", days(0, 1, 2), [1.0, 2.0, 3.0], bars_for(days(0, 1, 2)))
+    store.write(None, "AAPL", days(1, 2), [20.0, 30.0], bars_for(days(1, 2), open_price=7.0), update=True)
+
+    records = store.records("AAPL")
+    assert records["close"].tolist() == [1.0, 20.0, 30.0]
+    assert records["open"].tolist() == [1.0, 7.0, 7.0]
+
+
+def test_repeated_date_in_one_write_keeps_the_last_bar(store):
+    store.write(None, "AAPL", days(0, 1, 1), [1.0, 2.0, 2.5], bars_for(days(0, 1, 1)))
+    assert stored_days(store, "AAPL") == days(0, 1)
+    assert store.records("AAPL")["close"].tolist() == [1.0, 2.5]
+
+
+def test_range_reads_include_both_bounds(store):
+    # Weekdays only: 2024-01-06 and 2024-01-07 are not stored
+    store.write(None, "AAPL", days(1, 2, 3, 4, 7, 8), [2.0, 3.0, 4.0, 5.0, 8.0, 9.0], bars_for(days(1, 2, 3, 4, 7, 8)))
+
+    def read_days(start, end):
+        return sorted(store.read(None, "AAPL", start, end)[0])
+
+    assert read_days(*days(1, 8)) == days(1, 2, 3, 4, 7, 8)
+    assert read_days(*days(2, 2)) == days(2)
+    assert read_days(*days(4, 7)) == days(4, 7)
+    # Bounds on days without a record
+    assert read_days(*days(5, 6)) == []
+    assert read_days(*days(0, 1)) == days(1)
+    assert read_days(*days(6, 30)) == days(7, 8)
+    # Entirely outside the stored range
+    assert read_days(D - timedelta(days=30), D) == []
+    assert read_days(*days(9, 30)) == []
+    assert store.read(None, "MSFT", *days(0, 30)) == ({}, set())
+
+
+def test_read_matrix_aligns_tickers_with_different_calendars(store):
+    # AAPL misses day 1 (US holiday), SAP.DE misses day 3, MSFT has nothing
+    store.write(None, "AAPL", days(0, 2, 3), [10.0, 12.0, 13.0], {})
+    store.write(None, "SAP.DE", days(0, 1, 2, 4), [20.0, 21.0, 22.0, 24.0], {})
+
+    dates, closes = store.read_matrix(None, ["SAP.DE", "MSFT", "AAPL"], *days(1, 4))
+
+    assert dates.tolist() == days(1, 2, 3, 4)
+    assert dates.dtype == np.dtype('datetime64[D]')
+    np.testing.assert_array_equal(closes, [
+        [21.0, np.nan, np.nan],
+        [22.0, np.nan, 12.0],
+        [np.nan, np.nan, 13.0],
+        [24.0, np.nan, np.nan],
+    ])
+
+
+def test_read_matrix_without_data_is_empty(store):
+    dates, closes = store.read_matrix(None, ["AAPL", "MSFT"], *days(0, 10))
+    assert len(dates) == 0
+    assert closes.shape == (0, 2)
+
+
+def test_read_matrix_matches_sql_store(store, db):
+    sql = SqlPriceStore()
+    for target in (store, sql):
+        target.write(db, "AAPL", days(0, 2, 3), [10.0, 12.0, 13.0], bars_for(days(0, 2, 3)))
+        target.write(db, "SAP.DE", days(0, 1, 2), [20.0, 21.0, 22.0], {})
+
+    columnar_dates, columnar_closes = store.read_matrix(db, ["AAPL", "SAP.DE"], *days(0, 3))
+    sql_dates, sql_closes = sql.read_matrix(db, ["AAPL", "SAP.DE"], *days(0, 3))
+    np.testing.assert_array_equal(columnar_dates, sql_dates)
+    np.testing.assert_array_equal(columnar_closes, sql_closes)
+
+
+def test_copy_price_store_round_trip(tmp_path, db, monkeypatch):
+    import copy_price_store
+
+    sql = SqlPriceStore()
+    sql.write(db, "AAPL", days(0, 1, 2), [1.0, 2.0, 3.0], {
+        "open": [0.5, None, 2.5],
+        "high": [1.5, None, 3.5],
+        "low": [0.4, None, 2.4],
+        "volume": [100, None, 300],
+        "dividend": [0.0, None, 0.24],
+        "split": [0.0, None, 4.0],
+    })
+    sql.write(db, "^GSPC", days(0, 3), [4700.0, 4710.0], {})
+
+    path = str(tmp_path / "copied")
+    # A stale bar already in the columnar store is overwritten with the database value
+    ColumnarPriceStore(path).write(db, "AAPL", days(1), [99.0], bars_for(days(1)))
+
+    monkeypatch.setattr(sys, "argv", ["copy_price_store.py", "--path", path])
+    copy_price_store.main()
+
+    copied = ColumnarPriceStore(path)
+    for ticker in ("AAPL", "^GSPC"):
+        assert copied.read(db, ticker, *days(0, 3)) == sql.read(db, ticker, *days(0, 3))
+    records = copied.records("AAPL")
+    assert records["close"].tolist() == [1.0, 2.0, 3.0]
+    assert records["split"].tolist()[::2] == [0.0, 4.0]
+    assert records["dividend"][2] == 0.24
+    assert np.isnan(records["volume"][1])
+    assert os.path.exists(copied.path("^GSPC"))
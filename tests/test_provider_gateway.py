@@ -0,0 +1,203 @@
+"""Tests for the provider gateway: token bucket, circuit breaker and error classification."""
+
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from app.provider_gateway import CLOSED, HALF_OPEN, OPEN, ProviderGateway, ProviderUnavailable, TokenBucket
+from app.providers import MarketDataProvider, ProviderError, SymbolNotFound, YFinanceProvider
+
+
+class FakeProvider(MarketDataProvider):
+    """Provider whose requests fail while `failing` is set (history also for symbols in `down`)."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.failing = False
+        self.down = set()
+        self.calls = 0
+
+    def quote(self, symbol):
+        self.calls += 1
+        if symbol == "TYPO":
+            raise SymbolNotFound(f"{symbol}: no data")
+        if self.failing:
+            raise ProviderError("HTTP 503")
+        return 100.0
+
+    def info(self, symbol):
+        return {"symbol": symbol}
+
+    def history(self, symbol, start=None, end=None, period=None):
+        self.calls += 1
+        if symbol == "TYPO":
+            raise SymbolNotFound(f"{symbol}: no data")
+        if self.failing or symbol in self.down:
+            raise ProviderError("HTTP 503")
+        return pd.DataFrame(
+            {"Close": [1.0, 2.0]},
+            index=pd.DatetimeIndex(["2024-01-02", "2024-01-03"]).tz_localize("America/New_York")
+        )
+
+
+def make_gateway(provider, **kwargs):
+    options = dict(rate=1000.0, burst=1000, retries=0, breaker_threshold=2, breaker_cooldown=0.05)
+    options.update(kwargs)
+    return ProviderGateway(provider=provider, **options)
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_token_bucket_cancel_returns_token():
+    bucket = TokenBucket(rate=1.0, burst=1)
+    bucket.reserve()
+    assert bucket.reserve() > 0
+    bucket.cancel()
+    bucket.cancel()
+    assert bucket.reserve() == pytest.approx(0.0, abs=0.01)
+
+
+def test_gateway_rejects_wait_over_max_wait():
+    gateway = make_gateway(FakeProvider(), rate=0.1, burst=1, max_wait=0.5)
+    assert gateway.quote("AAPL") == 100.0
+    with pytest.raises(ProviderUnavailable):
+        gateway.quote("AAPL")
+    assert gateway.get_stats()["rejected_rate_limit"] == 1
+
+
+def test_breaker_closed_open_half_open_closed():
+    provider = FakeProvider()
+    gateway = make_gateway(provider)
+    provider.failing = True
+
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            gateway.quote("AAPL")
+    assert gateway.get_stats()["state"] == OPEN
+
+    # Open: fails fast without calling the provider
+    calls = provider.calls
+    with pytest.raises(ProviderUnavailable):
+        gateway.quote("AAPL")
+    assert provider.calls == calls
+
+    time.sleep(0.06)
+    assert gateway.get_stats()["state"] == HALF_OPEN
+
+    provider.failing = False
+    assert gateway.quote("AAPL") == 100.0
+    stats = gateway.get_stats()
+    assert stats["state"] == CLOSED
+    assert stats["breaker_opened"] == 1
+
+
+def test_failed_half_open_trial_reopens():
+    provider = FakeProvider()
+    gateway = make_gateway(provider)
+    provider.failing = True
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            gateway.quote("AAPL")
+
+    time.sleep(0.06)
+    with pytest.raises(ProviderError):
+        gateway.quote("AAPL")
+    stats = gateway.get_stats()
+    assert stats["state"] == OPEN
+    assert stats["breaker_opened"] == 2
+
+
+def test_retries_before_counting_a_failure():
+    provider = FakeProvider()
+    provider.failing = True
+    gateway = make_gateway(provider, retries=2, backoff=0.0)
+    with pytest.raises(ProviderError):
+        gateway.quote("AAPL")
+    stats = gateway.get_stats()
+    assert provider.calls == 3
+    assert stats["retries"] == 2
+    assert stats["failures"] == 1
+
+
+def test_unknown_symbol_does_not_open_breaker():
+    provider = FakeProvider()
+    gateway = make_gateway(provider, retries=2)
+    for _ in range(5):
+        assert gateway.quote("TYPO") is None
+    stats = gateway.get_stats()
+    assert stats["state"] == CLOSED
+    assert stats["failures"] == 0
+    assert stats["not_found"] == 5
+    # Not retried either
+    assert provider.calls == 5
+
+
+class FakeTicker:
+    def __init__(self, history_error=None, info=None):
+        self.history_error = history_error
+        self.info = info or {}
+
+    def history(self, raise_errors=False, **kwargs):
+        assert raise_errors
+        if self.history_error:
+            raise self.history_error
+        return pd.DataFrame({"Close": [1.0]}, index=pd.DatetimeIndex(["2024-01-02"]))
+
+
+def yfinance_provider(ticker):
+    provider = YFinanceProvider()
+    provider._yf = SimpleNamespace(Ticker=lambda symbol: ticker)
+    return provider
+
+
+def test_yfinance_missing_prices_is_symbol_not_found():
+    from yfinance.exceptions import YFPricesMissingError
+    provider = yfinance_provider(FakeTicker(YFPricesMissingError("TYPO", ' (Yahoo error = "No data found")')))
+    with pytest.raises(SymbolNotFound):
+        provider.history("TYPO", period="5d")
+
+
+def test_yfinance_http_status_is_provider_error():
+    from yfinance.exceptions import YFPricesMissingError
+    provider = yfinance_provider(FakeTicker(YFPricesMissingError("AAPL", "(Yahoo status_code = 429)")))
+    with pytest.raises(ProviderError) as raised:
+        provider.history("AAPL", period="5d")
+    assert not isinstance(raised.value, SymbolNotFound)
+
+
+def test_yfinance_empty_info_of_known_symbol_is_provider_error():
+    provider = yfinance_provider(FakeTicker(info={"trailingPegRatio": None}))
+    with pytest.raises(ProviderError):
+        provider.info("AAPL")
+
+
+def test_yfinance_timezone_lookup_failure_is_provider_error():
+    from yfinance.exceptions import YFTzMissingError
+    provider = yfinance_provider(FakeTicker(YFTzMissingError("AAPL")))
+    with pytest.raises(ProviderError) as raised:
+        provider.history("AAPL", start="2024-01-01", end="2024-02-01")
+    assert not isinstance(raised.value, SymbolNotFound)
+
+
+def test_batch_history_takes_a_token_per_symbol_and_returns_partial_results():
+    provider = FakeProvider()
+    provider.down = {"MSFT"}
+    gateway = make_gateway(provider, retries=1, backoff=0.0, breaker_threshold=10)
+    data, errors = gateway.batch_history(["AAPL", "MSFT", "TYPO", "SAP.DE"], "2024-01-01", "2024-02-01")
+
+    assert list(errors) == ["MSFT"]
+    assert list(data.columns.get_level_values(0).unique()) == ["AAPL", "SAP.DE"]
+    assert data.index.tz is None
+    stats = gateway.get_stats()
+    # AAPL, SAP.DE and TYPO once; only MSFT is retried
+    assert provider.calls == 5
+    assert stats["attempts"] == 5
+    assert stats["operations"]["history"]["calls"] == 4